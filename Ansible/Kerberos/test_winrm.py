@@ -1,10 +1,11 @@
 import sys
 
-import winrm
+from winrm_commands import WinRMSessionPool
 
-# Implemented for python 2.7+ < python 3.x+
+# Quick connectivity check: python3 test_winrm.py <user> <password> [server]
+# (See winrm_commands.py for executing commands across multiple hosts.)
 
-server = "PCLDEVWEB05.DEVELOPMENT.PCLENDER.LOCAL"
+server = sys.argv[3] if len(sys.argv) > 3 else "PCLDEVWEB05.DEVELOPMENT.PCLENDER.LOCAL"
 transport = "kerberos"
 cert_validation = 'ignore'
 
@@ -12,16 +13,10 @@ user = sys.argv[1]
 pswd = sys.argv[2]
 
 
-print "Using: {user}:{pswd} to connect to: {svr}".format(user=user, pswd=pswd, svr=server)
+print("Using: {user}:{pswd} to connect to: {svr}".format(user=user, pswd='*' * len(pswd), svr=server))
 
-s = winrm.Session(
-    server,
-    transport=transport,
-    auth=(user, pswd),
-    server_cert_validation=cert_validation)
+pool = WinRMSessionPool(username=user, password=pswd, transport=transport, cert_validation=cert_validation)
 
-print "Session: {0}".format(s)
+r = pool.run_cmd(server, 'ipconfig', ['/all'])
 
-r = s.run_cmd('ipconfig', ['/all'])
-
-print "Response: {resp}".format(resp=r)
+print("Response: {resp}".format(resp=r))
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import threading
+import time
+import typing
+
+
+class CLIArgs:
+    DEFAULT_TRANSPORT = 'kerberos'
+    DEFAULT_CERT_VALIDATION = 'ignore'
+    DEFAULT_WORKERS = 10
+    DEFAULT_COMMAND = 'ipconfig'
+
+    def __init__(self):
+        self.parser = argparse.ArgumentParser()
+        self.parser.add_argument("user", help="Name to use when authenticating against the Windows hosts.")
+        self.parser.add_argument("password", help="Password to use when authenticating against the Windows hosts.")
+        self.parser.add_argument("-H", "--hosts", default=None, type=str, nargs='+',
+                                 help="Windows hosts (or WinRM endpoint URLs) to run the command against.")
+        self.parser.add_argument("-f", "--hosts_file", default=None, type=str,
+                                 help="File containing the list of hosts (one per line).")
+        self.parser.add_argument("-c", "--command", default=self.DEFAULT_COMMAND, type=str,
+                                 help=f"Command to execute. DEFAULT: {self.DEFAULT_COMMAND}")
+        self.parser.add_argument("-a", "--args", default=[], type=str, nargs='+',
+                                 help="Command arguments.")
+        self.parser.add_argument("-w", "--workers", default=self.DEFAULT_WORKERS, type=int,
+                                 help=f"Maximum number of hosts to execute against concurrently. "
+                                      f"DEFAULT: {self.DEFAULT_WORKERS}")
+        self.parser.add_argument("-t", "--transport", default=self.DEFAULT_TRANSPORT, type=str,
+                                 help=f"WinRM transport. DEFAULT: {self.DEFAULT_TRANSPORT}")
+        self.parser.add_argument("-v", "--cert_validation", default=self.DEFAULT_CERT_VALIDATION, type=str,
+                                 choices=['ignore', 'validate'],
+                                 help=f"Server certificate validation. DEFAULT: {self.DEFAULT_CERT_VALIDATION}")
+        self.args = self.parser.parse_args()
+
+    def get_hosts(self) -> typing.List[str]:
+        """
+        Combine the hosts specified on the command line and in the hosts file (order preserved, no duplicates).
+
+        :return: List of hosts
+
+        """
+        hosts = list(self.args.hosts or [])
+        if self.args.hosts_file is not None:
+            with open(self.args.hosts_file, "r") as HOSTS:
+                hosts.extend([line.strip() for line in HOSTS if line.strip() and not line.strip().startswith('#')])
+        return list(dict.fromkeys(hosts))
+
+
+class CommandResult(typing.NamedTuple):
+    host: str
+    status_code: typing.Optional[int]
+    std_out: str
+    std_err: str
+    latency: float
+    error: typing.Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None and self.status_code == 0
+
+
+class WinRMSessionPool:
+    """
+    Pool of authenticated WinRM sessions, per host. Sessions are created on demand (up to
+    max_sessions_per_host) and reused by subsequent commands against the same host; a session whose command raised
+    is discarded (and replaced on demand), rather than reused.
+
+    """
+
+    def __init__(self, username: str, password: str, transport: str = CLIArgs.DEFAULT_TRANSPORT,
+                 cert_validation: str = CLIArgs.DEFAULT_CERT_VALIDATION, max_sessions_per_host: int = 1,
+                 session_factory: typing.Optional[typing.Callable[[str], typing.Any]] = None) -> None:
+        """
+        WinRM Session Pool Constructor
+
+        :param username: Name to use when authenticating against the hosts
+        :param password: Password to use when authenticating against the hosts
+        :param transport: WinRM transport (kerberos, ntlm, basic, etc.)
+        :param cert_validation: Server certificate validation (ignore, validate)
+        :param max_sessions_per_host: Maximum number of concurrent sessions to a single host
+        :param session_factory: (Optional) Callable(host) --> session; used instead of winrm.Session
+                   (e.g. - to connect to a stand-in endpoint).
+
+        """
+        self.username = username
+        self.password = password
+        self.transport = transport
+        self.cert_validation = cert_validation
+        self.max_sessions_per_host = max_sessions_per_host
+        self.session_factory = session_factory or self._create_session
+        self._available = threading.Condition()
+        self._idle = dict()
+        self._created = dict()
+
+    def _create_session(self, host: str) -> 'winrm.Session':
+        """
+        Create an authenticated WinRM session.
+
+        :param host: Name of host (or WinRM endpoint URL)
+
+        :return: winrm.Session
+
+        """
+        # Deferred: pywinrm is only needed for real sessions (not when a session_factory is specified).
+        import winrm
+
+        return winrm.Session(host, transport=self.transport, auth=(self.username, self.password),
+                             server_cert_validation=self.cert_validation)
+
+    def acquire(self, host: str) -> typing.Any:
+        """
+        Get an idle session for the host; create one if none are idle and the host limit has not been reached,
+        otherwise wait for a session to be released.
+
+        :param host: Name of host
+
+        :return: Session
+
+        """
+        with self._available:
+            idle = self._idle.setdefault(host, [])
+            while not idle and self._created.get(host, 0) >= self.max_sessions_per_host:
+                self._available.wait()
+            if idle:
+                return idle.pop()
+            self._created[host] = self._created.get(host, 0) + 1
+
+        try:
+            return self.session_factory(host)
+        except Exception:
+            self.discard(host)
+            raise
+
+    def release(self, host: str, session: typing.Any) -> None:
+        """
+        Return a session to the pool.
+
+        :param host: Name of host
+        :param session: Session (see acquire)
+
+        :return: None
+
+        """
+        with self._available:
+            self._idle[host].append(session)
+            self._available.notify_all()
+
+    def discard(self, host: str) -> None:
+        """
+        Drop a session (e.g. - its command raised) from the pool, so a new session can be created in its place.
+
+        :param host: Name of host
+
+        :return: None
+
+        """
+        with self._available:
+            self._created[host] -= 1
+            self._available.notify_all()
+
+    def run_cmd(self, host: str, command: str, args: typing.Optional[typing.List[str]] = None) -> CommandResult:
+        """
+        Execute a command on the host, using a pooled session.
+
+        :param host: Name of host
+        :param command: Command to execute
+        :param args: List of command arguments
+
+        :return: CommandResult (errors are recorded in the result, not raised)
+
+        """
+        start = time.monotonic()
+        try:
+            session = self.acquire(host)
+        except Exception as exc:
+            return CommandResult(host=host, status_code=None, std_out='', std_err='',
+                                 latency=time.monotonic() - start, error=f"{exc.__class__.__name__}: {exc}")
+
+        try:
+            resp = session.run_cmd(command, args or [])
+        except Exception as exc:
+            self.discard(host)
+            return CommandResult(host=host, status_code=None, std_out='', std_err='',
+                                 latency=time.monotonic() - start, error=f"{exc.__class__.__name__}: {exc}")
+        self.release(host, session)
+
+        return CommandResult(host=host, status_code=resp.status_code,
+                             std_out=self._decode(resp.std_out), std_err=self._decode(resp.std_err),
+                             latency=time.monotonic() - start)
+
+    def run_on_hosts(self, hosts: typing.List[str], command: str, args: typing.Optional[typing.List[str]] = None,
+                     max_workers: int = CLIArgs.DEFAULT_WORKERS) -> typing.Iterator[CommandResult]:
+        """
+        Execute a command on all hosts concurrently (bounded by max_workers), yielding results as they complete.
+
+        :param hosts: List of hosts
+        :param command: Command to execute
+        :param args: List of command arguments
+        :param max_workers: Maximum number of concurrent executions
+
+        :return: Iterator of CommandResults (in order of completion)
+
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.run_cmd, host, command, args) for host in hosts]
+            for future in concurrent.futures.as_completed(futures):
+                yield future.result()
+
+    @staticmethod
+    def _decode(output: typing.Union[bytes, str]) -> str:
+        return output.decode(errors='replace') if isinstance(output, bytes) else output
+
+
+if __name__ == '__main__':
+    border = "=" * 80
+    cli = CLIArgs()
+    target_hosts = cli.get_hosts()
+    if not target_hosts:
+        cli.parser.error("No hosts specified (use --hosts and/or --hosts_file).")
+
+    pool = WinRMSessionPool(username=cli.args.user, password=cli.args.password, transport=cli.args.transport,
+                            cert_validation=cli.args.cert_validation)
+
+    print(f"Executing '{' '.join([cli.args.command] + cli.args.args)}' on {len(target_hosts)} host(s) "
+          f"(max concurrent: {cli.args.workers})")
+
+    start_time = time.monotonic()
+    results = []
+    for result in pool.run_on_hosts(hosts=target_hosts, command=cli.args.command, args=cli.args.args,
+                                    max_workers=cli.args.workers):
+        results.append(result)
+        print(f"{border}\n{result.host}: STATUS CODE: {result.status_code}  LATENCY: {result.latency:0.3f}s")
+        if result.error is not None:
+            print(f"\tERROR: {result.error}")
+        if result.std_out:
+            print(result.std_out.rstrip())
+        if result.std_err:
+            print(f"STDERR:\n{result.std_err.rstrip()}")
+
+    print(f"{border}\nSUMMARY: ({time.monotonic() - start_time:0.3f}s total)")
+    for result in sorted(results, key=lambda r: r.latency, reverse=True):
+        print(f"\t{result.host}: {'PASS' if result.succeeded else 'FAIL'} ({result.latency:0.3f}s)")
+
+    exit(0 if all(result.succeeded for result in results) else 1)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import gzip
+import hashlib
+import json
+import os
+import time
+import typing
+
+
+DEFAULT_CHUNK_SIZE_MB = 8
+DEFAULT_LEVEL = 6
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+class CLIArgs:
+    CREATE = 'create'
+    EXTRACT = 'extract'
+
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(
+            description="Archive a directory tree into a multi-member (gzip) archive, compressing in parallel.")
+        sub_parser = self.parser.add_subparsers(dest='action', help="Archive operations.")
+        sub_parser.required = True
+
+        create = sub_parser.add_parser(self.CREATE, help="Archive a directory.")
+        create.add_argument('source_dir', help="Directory to archive.")
+        create.add_argument('archive', help=f"Archive file to write (the manifest is written to "
+                                            f"<archive>{MANIFEST_SUFFIX}).")
+        create.add_argument('-b', '--base', default=None,
+                            help="Manifest of a previous archive: only files that changed since are archived "
+                                 "(incremental archive).")
+        create.add_argument('-w', '--workers', default=os.cpu_count(), type=int,
+                            help=f"Number of compression processes. DEFAULT: {os.cpu_count()}")
+        create.add_argument('-l', '--level', default=DEFAULT_LEVEL, type=int, choices=range(1, 10),
+                            help=f"Compression level (1-9). DEFAULT: {DEFAULT_LEVEL}")
+        create.add_argument('-c', '--chunk_size', default=DEFAULT_CHUNK_SIZE_MB, type=int,
+                            help=f"Chunk size (MB): large files are compressed as multiple chunks in parallel. "
+                                 f"DEFAULT: {DEFAULT_CHUNK_SIZE_MB}")
+
+        extract = sub_parser.add_parser(self.EXTRACT, help="Restore the files recorded in a manifest.")
+        extract.add_argument('manifest', help="Manifest of the archive to restore.")
+        extract.add_argument('dest_dir', help="Directory to restore the files to.")
+
+        self.args = self.parser.parse_args()
+
+
+class ChunkResult(typing.NamedTuple):
+    path: str
+    index: int
+    size: int
+    digest: str
+    data: typing.Optional[bytes]
+
+
+class ArchiveStats(typing.NamedTuple):
+    files: int
+    archived_files: int
+    skipped_files: int
+    bytes_in: int
+    bytes_out: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """
+        :return: Input bytes archived per second (MB/s)
+        """
+        return self.bytes_in / (1024.0 * 1024.0) / max(self.elapsed, 1e-9)
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+
+
+def scan_tree(root: str, relative_dir: str = '') -> typing.Iterator[typing.Tuple[str, os.stat_result]]:
+    """
+    Walk the directory tree (os.scandir: the directory entry stat information is reused, where available).
+    Symbolic links are not followed.
+
+    :param root: Directory to walk
+    :param relative_dir: (Internal) Directory, relative to root, being scanned
+
+    :return: Iterator of tuples: (path relative to root ('/' separated), stat result), in sorted order
+
+    """
+    with os.scandir(os.path.join(root, relative_dir)) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_tree(root, relative_path)
+            elif entry.is_file(follow_symlinks=False):
+                yield relative_path, entry.stat(follow_symlinks=False)
+
+
+def compress_chunk(root: str, path: str, index: int, chunk_size: int, level: int,
+                   previous_digest: typing.Optional[str] = None) -> ChunkResult:
+    """
+    Read, hash and compress a single chunk of a file (executed in the process pool).
+
+    :param root: Root directory
+    :param path: Path of the file, relative to root
+    :param index: Chunk number (offset = index * chunk_size)
+    :param chunk_size: Chunk size (bytes)
+    :param level: Compression level
+    :param previous_digest: (Optional) Digest of the chunk in the base archive: if unchanged, it is not compressed.
+
+    :return: ChunkResult (data is None if the chunk is unchanged)
+
+    """
+    with open(os.path.join(root, path), "rb") as SOURCE:
+        SOURCE.seek(index * chunk_size)
+        data = SOURCE.read(chunk_size)
+
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == previous_digest:
+        return ChunkResult(path=path, index=index, size=len(data), digest=digest, data=None)
+    return ChunkResult(path=path, index=index, size=len(data), digest=digest,
+                       data=gzip.compress(data, compresslevel=level, mtime=0))
+
+
+class ParallelArchiver:
+    """
+    Archives a directory tree as a multi-member gzip file: each file chunk is compressed (in a process pool) as an
+    independent gzip member, and the manifest (JSON) records each file's size, mtime and digest, plus the archive,
+    offset and length of each of its chunks.
+
+    Incremental archives (base manifest): files with the same size and mtime are not read; other files are hashed
+    per chunk, and only chunks whose digest changed are compressed. The manifest lists ALL files; unchanged chunks
+    reference the archive they were stored in originally.
+
+    """
+
+    def __init__(self, workers: typing.Optional[int] = None, level: int = DEFAULT_LEVEL,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE_MB * 1024 * 1024) -> None:
+        """
+        Parallel Archiver Constructor
+
+        :param workers: Number of compression processes. DEFAULT: os.cpu_count()
+        :param level: Compression level (1-9)
+        :param chunk_size: Chunk size (bytes)
+
+        """
+        self.workers = workers or os.cpu_count()
+        self.level = level
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def get_manifest_name(archive: str) -> str:
+        return f"{archive}{MANIFEST_SUFFIX}"
+
+    @staticmethod
+    def read_manifest(manifest_file: str) -> typing.Dict[str, typing.Any]:
+        """
+        Read a manifest; chunk archive names are resolved relative to the manifest's directory.
+
+        :param manifest_file: Name of the manifest
+
+        :return: Manifest dictionary
+
+        """
+        with open(manifest_file, "r") as MANIFEST:
+            manifest = json.load(MANIFEST)
+        manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+        for entry in manifest['files'].values():
+            for chunk in entry['chunks']:
+                chunk['archive'] = os.path.join(manifest_dir, chunk['archive'])
+        return manifest
+
+    def create(self, source_dir: str, archive: str, base_manifest: typing.Optional[str] = None) -> ArchiveStats:
+        """
+        Archive the directory tree.
+
+        :param source_dir: Directory to archive
+        :param archive: Archive file to write (the manifest is written alongside: see get_manifest_name)
+        :param base_manifest: (Optional) Manifest of a previous archive (incremental archive)
+
+        :return: ArchiveStats
+
+        """
+        start = time.perf_counter()
+        base_files = self.read_manifest(base_manifest)['files'] if base_manifest is not None else {}
+        manifest_dir = os.path.dirname(os.path.abspath(archive))
+
+        files, pending = dict(), []
+        changed_files, archived_files = set(), set()
+        skipped = 0
+        for path, stat in scan_tree(source_dir):
+            previous = base_files.get(path)
+            if previous is not None and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+                files[path] = previous
+                skipped += 1
+                continue
+
+            chunk_count = -(-stat.st_size // self.chunk_size)
+            changed_files.add(path)
+            if chunk_count == 0:
+                archived_files.add(path)
+            previous_chunks = previous['chunks'] if previous is not None else []
+            files[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': None,
+                           'chunks': [None] * chunk_count}
+            pending.extend([(path, index, previous_chunks[index] if index < len(previous_chunks) else None)
+                            for index in range(chunk_count)])
+
+        bytes_in, bytes_out = 0, 0
+        with open(archive, "wb") as ARCHIVE, concurrent.futures.ProcessPoolExecutor(self.workers) as executor:
+            for result, previous_chunk in self._compress(executor, source_dir, pending):
+                entry = files[result.path]
+                bytes_in += result.size
+                if result.data is None:
+                    entry['chunks'][result.index] = previous_chunk
+                    continue
+
+                archived_files.add(result.path)
+                entry['chunks'][result.index] = {'archive': archive, 'offset': ARCHIVE.tell(),
+                                                 'length': len(result.data), 'size': result.size,
+                                                 'digest': result.digest}
+                ARCHIVE.write(result.data)
+                bytes_out += len(result.data)
+
+        for path, entry in files.items():
+            if entry['digest'] is None:
+                entry['digest'] = hashlib.sha256(''.join([chunk['digest'] for chunk in entry['chunks']]).encode()
+                                                 ).hexdigest()
+        # Changed files (size/mtime) whose chunks all matched the base digests are unchanged.
+        skipped += len(changed_files - archived_files)
+
+        manifest = {
+            'root': os.path.abspath(source_dir),
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'chunk_size': self.chunk_size,
+            'files': dict([(path, dict(entry, chunks=[
+                dict(chunk, archive=os.path.relpath(chunk['archive'], manifest_dir)) for chunk in entry['chunks']]))
+                for path, entry in files.items()]),
+        }
+        with open(self.get_manifest_name(archive), "w") as MANIFEST:
+            json.dump(manifest, MANIFEST, indent=1)
+
+        return ArchiveStats(files=len(files), archived_files=len(archived_files), skipped_files=skipped,
+                            bytes_in=bytes_in, bytes_out=bytes_out, elapsed=time.perf_counter() - start)
+
+    def _compress(self, executor: concurrent.futures.Executor, root: str,
+                  pending: typing.List[typing.Tuple[str, int, typing.Optional[dict]]]
+                  ) -> typing.Iterator[typing.Tuple[ChunkResult, typing.Optional[dict]]]:
+        """
+        Compress the chunks in the process pool, yielding the results in order. The number of chunks in flight is
+        bounded, so memory use is proportional to the number of workers (not the size of the tree).
+
+        :param executor: Process pool
+        :param root: Root directory
+        :param pending: List of tuples: (path, chunk index, chunk entry in the base manifest (or None))
+
+        :return: Iterator of tuples: (ChunkResult, chunk entry in the base manifest)
+
+        """
+        window = self.workers * 4
+        in_flight = []
+        for path, index, previous_chunk in pending:
+            previous_digest = previous_chunk['digest'] if previous_chunk is not None else None
+            in_flight.append((executor.submit(compress_chunk, root, path, index, self.chunk_size, self.level,
+                                              previous_digest), previous_chunk))
+            if len(in_flight) >= window:
+                future, previous_chunk = in_flight.pop(0)
+                yield future.result(), previous_chunk
+
+        for future, previous_chunk in in_flight:
+            yield future.result(), previous_chunk
+
+    def extract(self, manifest_file: str, dest_dir: str) -> int:
+        """
+        Restore the files recorded in a manifest (from the archive(s) holding each chunk).
+
+        :param manifest_file: Name of the manifest
+        :param dest_dir: Directory to restore the files to
+
+        :return: Number of files restored
+
+        """
+        manifest = self.read_manifest(manifest_file)
+        handles = dict()
+        try:
+            for path, entry in manifest['files'].items():
+                filespec = os.path.join(dest_dir, *path.split('/'))
+                os.makedirs(os.path.dirname(filespec), exist_ok=True)
+                with open(filespec, "wb") as TARGET:
+                    for chunk in entry['chunks']:
+                        if chunk['archive'] not in handles:
+                            handles[chunk['archive']] = open(chunk['archive'], "rb")
+                        source = handles[chunk['archive']]
+                        source.seek(chunk['offset'])
+                        TARGET.write(gzip.decompress(source.read(chunk['length'])))
+                os.utime(filespec, ns=(entry['mtime_ns'], entry['mtime_ns']))
+        finally:
+            for handle in handles.values():
+                handle.close()
+        return len(manifest['files'])
+
+
+def main() -> None:
+    cli = CLIArgs()
+
+    if cli.args.action == cli.CREATE:
+        archiver = ParallelArchiver(workers=cli.args.workers, level=cli.args.level,
+                                    chunk_size=cli.args.chunk_size * 1024 * 1024)
+        stats = archiver.create(source_dir=cli.args.source_dir, archive=cli.args.archive,
+                                base_manifest=cli.args.base)
+        print(f"Archived {stats.archived_files} of {stats.files} files ({stats.skipped_files} unchanged) "
+              f"to {os.path.abspath(cli.args.archive)}")
+        print(f"Read {stats.bytes_in / (1024.0 * 1024.0):.1f} MB, wrote {stats.bytes_out / (1024.0 * 1024.0):.1f} MB "
+              f"(ratio: {stats.ratio:.2f}) in {stats.elapsed:.2f} s: {stats.throughput:.1f} MB/s "
+              f"({archiver.workers} workers)")
+
+    elif cli.args.action == cli.EXTRACT:
+        count = ParallelArchiver().extract(manifest_file=cli.args.manifest, dest_dir=cli.args.dest_dir)
+        print(f"Restored {count} files to {os.path.abspath(cli.args.dest_dir)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(UTILS_DIR, 'target'))
+from compact_target_ini import CompactTargetIni, SectionTemplate  # noqa: E402
+from target_store_benchmark import build_synthetic_ini  # noqa: E402
+from update_target_ini import TargetIniFile  # noqa: E402
+
+
+class CLIArgs:
+    DEFAULT_SECTIONS = [100, 1000, 10000]
+
+    def __init__(self):
+        self.parser = argparse.ArgumentParser(
+            description="Compare the memory used by the configparser and compact (template + overrides) "
+                        "representations of the target INI file.")
+        self.parser.add_argument("-s", "--sections", default=self.DEFAULT_SECTIONS, type=int, nargs='+',
+                                 help=f"Number of (synthetic) sections to benchmark. DEFAULT: {self.DEFAULT_SECTIONS}")
+        self.args = self.parser.parse_args()
+
+
+def measure_memory(loader: typing.Callable[[], typing.Any]) -> typing.Tuple[typing.Any, float, float, float]:
+    """
+    Load a representation while tracing allocations.
+
+    :param loader: Function that builds (and returns) the representation
+
+    :return: Tuple of (representation, retained KB, peak KB, load time (ms))
+
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = loader()
+    elapsed = (time.perf_counter() - start) * 1000.0
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1024.0, peak / 1024.0, elapsed
+
+
+def main() -> None:
+    cli = CLIArgs()
+    template = SectionTemplate.from_yaml()
+    print(f"{'Sections':>8}  {'Representation':<14} {'Retained (KB)':>14} {'Peak (KB)':>11} {'Load (ms)':>10} "
+          f"{'Retained ratio':>15}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for number_of_sections in cli.args.sections:
+            ini_file = os.path.join(work_dir, f"target_{number_of_sections}.ini")
+            sections = build_synthetic_ini(ini_file, number_of_sections)
+
+            ini, ini_kb, ini_peak, ini_ms = measure_memory(lambda: TargetIniFile(filespec=ini_file))
+            compact, compact_kb, compact_peak, compact_ms = measure_memory(
+                lambda: CompactTargetIni(filespec=ini_file, template=template))
+
+            # Sanity check: the compact representation materializes the same sections.
+            for section in sections[::max(len(sections) // 50, 1)]:
+                expected = dict([(option.upper(), value) for option, value in ini.config._sections[section].items()])
+                if compact[section] != expected:
+                    raise ValueError(f"Compact representation of '{section}' does not match the INI file.")
+
+            print(f"{number_of_sections:>8}  {'configparser':<14} {ini_kb:14.1f} {ini_peak:11.1f} {ini_ms:10.2f} "
+                  f"{'1.00':>15}")
+            print(f"{number_of_sections:>8}  {'compact':<14} {compact_kb:14.1f} {compact_peak:11.1f} "
+                  f"{compact_ms:10.2f} {compact_kb / ini_kb:15.2f}")
+
+            statistics = compact.get_statistics()
+            print(f"{'':>8}  Templated sections: {statistics['templated_sections']}/{statistics['sections']}, "
+                  f"average overrides per section: {statistics['average_overrides']:.1f}")
+            del ini, compact
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+import argparse
+import configparser
+import contextlib
+import difflib
+import importlib
+import importlib.util
+import io
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import typing
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_INI = os.path.join(UTILS_DIR, 'target', 'target.update.ini')
+
+sys.path.insert(0, os.path.join(UTILS_DIR, 'target'))
+sys.path.insert(0, os.path.join(UTILS_DIR, 'build'))
+from build_to_text import ConvertToText  # noqa: E402
+from sharded_target_ini import ShardedTargetIniFile  # noqa: E402
+from sqlite_target_ini import SqliteTargetIniFile  # noqa: E402
+from update_target_ini import TargetIniFile  # noqa: E402
+
+# Functions (engines) that can be shadow tested
+TARGET_INI_FILE = 'target_ini'
+SORT_VERSION = 'sort_version'
+CONVERT_VERSION_TO_NUMBER = 'convert_version_to_number'
+CONVERT_TO_TEXT = 'convert_to_text'
+FUNCTIONS = [TARGET_INI_FILE, SORT_VERSION, CONVERT_VERSION_TO_NUMBER, CONVERT_TO_TEXT]
+
+# Alternate target stores (in this repo) compared against TargetIniFile
+SQLITE = 'sqlite'
+SHARDED = 'sharded'
+BACKENDS = [SQLITE, SHARDED]
+
+# Random input vocabulary (mixed case and colliding names are intentional: the results must match for those too)
+ENVIRONMENTS = ['dev', 'qa', 'uat', 'perf', 'Dev', 'QA']
+NAMES = ['trunk', 'test', 'hotfix', 'trunk2', 'r2', 'staging', 'demo', 'Sandbox']
+MAJORS = ['nineteen', 'twenty', 'thirty', 'forty', 'fifty', 'sixty']
+MINORS = ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten', 'eleven', 'twelve']
+DOMAINS = ['mdcicd.local', 'corp.example.com', 'qa.example.net']
+EXTRA_OPTIONS = ['PRICE_FOLDER2', 'LOG_FOLDER3', 'EXTRA_OPTION']
+
+MAX_REPORTED_MISMATCHES = 5
+MAX_DIFF_LINES = 12
+
+
+class CLIArgs:
+    DEFAULT_CASES = 5000
+    DEFAULT_INI_FILES = 5
+    DEFAULT_SECTIONS = 300
+    DEFAULT_OPERATIONS = 50
+    DEFAULT_RUNS = 5
+
+    def __init__(self):
+        self.parser = argparse.ArgumentParser(
+            description="Differential (shadow) test: run the legacy and candidate implementations of the target INI "
+                        "and version functions on the same randomized inputs, verify the results (and written INI "
+                        "files) are identical, and report the speedup.")
+        self.parser.add_argument("-f", "--functions", default=FUNCTIONS, nargs='+', choices=FUNCTIONS,
+                                 help=f"Functions to test. DEFAULT: {' '.join(FUNCTIONS)}")
+        self.parser.add_argument("-c", "--candidate", default=[], nargs='+', metavar="FUNCTION=MODULE:ATTRIBUTE",
+                                 help=f"Candidate implementation, imported from a module (or a .py file): "
+                                      f"{TARGET_INI_FILE}=fast_ini:FastTargetIniFile (TargetIniFile API), "
+                                      f"{SORT_VERSION}=module:func (list of sections -> list), "
+                                      f"{CONVERT_VERSION_TO_NUMBER}=module:func (str -> str), "
+                                      f"{CONVERT_TO_TEXT}=module:Class (ConvertToText API)")
+        self.parser.add_argument("-b", "--backends", default=BACKENDS, nargs='*', choices=BACKENDS,
+                                 help=f"Target stores to compare against TargetIniFile. DEFAULT: {' '.join(BACKENDS)}")
+        self.parser.add_argument("-n", "--cases", default=self.DEFAULT_CASES, type=int,
+                                 help=f"Number of random inputs per function. DEFAULT: {self.DEFAULT_CASES}")
+        self.parser.add_argument("-i", "--ini_files", default=self.DEFAULT_INI_FILES, type=int,
+                                 help=f"Number of random target INI files. DEFAULT: {self.DEFAULT_INI_FILES}")
+        self.parser.add_argument("-s", "--sections", default=self.DEFAULT_SECTIONS, type=int,
+                                 help=f"Number of sections per random INI file. DEFAULT: {self.DEFAULT_SECTIONS}")
+        self.parser.add_argument("-o", "--operations", default=self.DEFAULT_OPERATIONS, type=int,
+                                 help=f"Number of operations (add/update/remove/query) per random INI file. "
+                                      f"DEFAULT: {self.DEFAULT_OPERATIONS}")
+        self.parser.add_argument("-r", "--runs", default=self.DEFAULT_RUNS, type=int,
+                                 help=f"Number of timed runs per function (the median is reported). "
+                                      f"DEFAULT: {self.DEFAULT_RUNS}")
+        self.parser.add_argument("--seed", default=None, type=int,
+                                 help="Random seed (reported on each run, to reproduce a failure). DEFAULT: random")
+        self.args = self.parser.parse_args()
+
+
+class Comparison(typing.NamedTuple):
+    function: str
+    candidate: str
+    cases: int
+    legacy_ms: float
+    candidate_ms: typing.Optional[float] = None
+    mismatches: typing.List[typing.Tuple[typing.Any, typing.Any, typing.Any]] = []
+    status: typing.Optional[str] = None
+
+
+def load_candidate(spec: str) -> typing.Any:
+    """
+    Import a candidate implementation.
+
+    :param spec: 'module:attribute' (module on the python path) or 'path/to/file.py:attribute'
+
+    :return: The attribute (function or class)
+
+    """
+    module_name, _, attribute = spec.rpartition(':')
+    if not module_name or not attribute:
+        raise ValueError(f"Candidate must be specified as MODULE:ATTRIBUTE (got '{spec}').")
+
+    if module_name.endswith('.py'):
+        module_spec = importlib.util.spec_from_file_location(
+            os.path.splitext(os.path.basename(module_name))[0], module_name)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, attribute)
+
+
+def get_outcome(func: typing.Callable, *args) -> typing.Tuple[str, typing.Any]:
+    """
+    Call a function, capturing the result or the exception (exceptions must match too).
+
+    :return: Tuple: ('ok', result) or ('error', exception type)
+
+    """
+    try:
+        return 'ok', func(*args)
+    except Exception as exc:
+        return 'error', exc.__class__.__name__
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Random inputs
+# ---------------------------------------------------------------------------------------------------------------------
+def random_version(rng: random.Random) -> str:
+    major, minor = rng.randint(17, 25), rng.randint(0, 12)
+    return rng.choice([f"{major}.{minor:02d}", f"{major}.{minor}", f"{major}",
+                       f"{major}.{minor:02d}.{rng.randint(0, 9)}"])
+
+
+def random_section_name(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.6:
+        return f"{rng.choice(ENVIRONMENTS)}_{random_version(rng)}"
+    if kind < 0.85:
+        return f"{rng.choice(ENVIRONMENTS)}_{rng.choice(NAMES)}"
+    if kind < 0.95:
+        return rng.choice(NAMES)
+    return f"{rng.choice(ENVIRONMENTS)}_{random_version(rng)}_{rng.choice(NAMES)}"
+
+
+def random_version_label(rng: random.Random) -> str:
+    """
+    :return: Version label (first label of an FQDN): twentyone, thirtythreeseven, TwentyTwelve, qa_test, ...
+    """
+    kind = rng.random()
+    if kind < 0.7:
+        words = [rng.choice(MAJORS)] + [rng.choice(MINORS) for _ in range(rng.choice([0, 1, 1, 2, 3]))]
+    elif kind < 0.85:
+        words = [rng.choice(MINORS + NAMES) for _ in range(rng.randint(1, 3))]
+    else:
+        words = [rng.choice(ENVIRONMENTS), rng.choice(['_', '-', '']), rng.choice(NAMES + MAJORS)]
+    label = "".join(words)
+    return rng.choice([label, label.capitalize(), label.upper(), "".join([word.capitalize() for word in words])])
+
+
+def random_fqdn(rng: random.Random) -> str:
+    return f"{random_version_label(rng)}.{rng.choice(ENVIRONMENTS).lower()}.{rng.choice(DOMAINS)}"
+
+
+def random_value(rng: random.Random) -> str:
+    host = f"pcl{rng.choice(ENVIRONMENTS).lower()}app{rng.randint(1, 20):02d}.{rng.choice(DOMAINS)}"
+    return rng.choice([
+        str(rng.randint(1024, 65535)),
+        host,
+        random_fqdn(rng),
+        f"\\\\{host}\\d$\\{rng.choice(NAMES)}\\{random_version(rng)}",
+        f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+        rng.choice(NAMES + MAJORS),
+        '',
+    ])
+
+
+def random_build_number(rng: random.Random) -> typing.Tuple[str, str, str, int]:
+    delimiter = rng.choice(['.', '.', '-', '_'])
+    parts = [str(rng.randint(0, 120)) if rng.random() < 0.95 else rng.choice(['', 'x', ' 7', '007'])
+             for _ in range(rng.randint(1, 4))]
+    return 'build_number', delimiter.join(parts), delimiter, rng.randint(1, 4)
+
+
+def get_option_names() -> typing.List[str]:
+    """
+    :return: Option names of the target INI file's template section (and a few numbered/extra options)
+    """
+    config = configparser.ConfigParser()
+    config.read(TARGET_INI)
+    return [option.upper() for option in config.options(TargetIniFile.TEMPLATE_SECTION)] + EXTRA_OPTIONS
+
+
+def write_random_ini(filename: str, rng: random.Random, number_of_sections: int,
+                     option_names: typing.List[str]) -> typing.List[str]:
+    """
+    Write a random target INI file: random section names (versions, names, mixed case), option sets and values.
+
+    :param filename: Output file
+    :param rng: Random number generator
+    :param number_of_sections: Number of sections to generate
+    :param option_names: Option names to choose from
+
+    :return: List of section names (in file order)
+
+    """
+    output = configparser.RawConfigParser()
+    output.optionxform = str
+    output[TargetIniFile.CORE] = {}
+    sections = []
+    while len(sections) < number_of_sections:
+        section = random_section_name(rng)
+        if output.has_section(section):
+            continue
+        output[section] = dict([(option, random_value(rng)) for option in
+                                rng.sample(option_names, rng.randint(len(option_names) // 2, len(option_names)))])
+        sections.append(section)
+
+    targets = list(sections)
+    rng.shuffle(targets)
+    output.set(TargetIniFile.CORE, TargetIniFile.TARGETS, ", ".join(targets))
+    with open(filename, "w") as INI:
+        output.write(INI)
+    return sections
+
+
+def random_operations(rng: random.Random, sections: typing.List[str], option_names: typing.List[str],
+                      number_of_operations: int) -> typing.List[tuple]:
+    """
+    Generate a random sequence of target INI operations (applied, in order, to every implementation).
+
+    :return: List of tuples: (method name, args...)
+
+    """
+    operations = []
+    for _ in range(number_of_operations):
+        kind = rng.random()
+        if kind < 0.5:
+            operations.append(('update_section', rng.choice(sections), rng.choice(option_names), random_value(rng)))
+        elif kind < 0.6:
+            operations.append(('remove_section', rng.choice(sections + ['not_defined'])))
+        elif kind < 0.7:
+            version_text = "".join([word.capitalize() for word in [rng.choice(MAJORS), rng.choice(MINORS)]])
+            operations.append(('add_section', version_text, rng.choice(ENVIRONMENTS), str(rng.randint(2000, 60000))))
+        elif kind < 0.85:
+            operations.append(('query_sections', None, random_value(rng).split('.')[0] or 'none'))
+        else:
+            low, high = sorted([random_version(rng), random_version(rng)], key=TargetIniFile._parse_version)
+            operations.append(('get_sections_in_version_range', low, high,
+                               rng.choice([None, rng.choice(ENVIRONMENTS)])))
+    return operations
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Target INI file (TargetIniFile and the alternate target stores)
+# ---------------------------------------------------------------------------------------------------------------------
+def setup_backend(backend: str, ini_file: str, work_dir: str) -> typing.Callable[[], TargetIniFile]:
+    """
+    Convert the INI file to the backend's store (not timed).
+
+    :param backend: Name of the backend (see BACKENDS)
+    :param ini_file: Target INI file
+    :param work_dir: Directory for the backend's store
+
+    :return: Callable() --> opened target (TargetIniFile API)
+
+    """
+    if backend == SQLITE:
+        db_file = os.path.join(work_dir, 'target.db')
+        if os.path.exists(db_file):
+            os.remove(db_file)
+        SqliteTargetIniFile(filespec=db_file).import_ini(ini_file)
+        return lambda: SqliteTargetIniFile(filespec=db_file)
+
+    shard_dir = os.path.join(work_dir, 'shards')
+    ShardedTargetIniFile.split(ini_file, shard_dir)
+    return lambda: ShardedTargetIniFile(filespec=shard_dir)
+
+
+def exercise_target(open_target: typing.Callable[[], TargetIniFile], operations: typing.List[tuple],
+                    outfile: str) -> typing.Tuple[typing.List[tuple], bytes, float]:
+    """
+    Open the target, apply the operations, and write the INI file.
+
+    :param open_target: Callable() --> opened target (TargetIniFile API)
+    :param operations: Operations (see random_operations)
+    :param outfile: INI file to write
+
+    :return: Tuple: (list of (operation, outcome), INI file contents, elapsed time (ms))
+
+    """
+    observations = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        target = open_target()
+        observations.append((('get_target_sections', True), get_outcome(target.get_target_sections, True)))
+        for operation in operations:
+            observations.append((operation, get_outcome(getattr(target, operation[0]), *operation[1:])))
+        target.write_file(outfile)
+    elapsed = (time.perf_counter() - start) * 1000.0
+
+    with open(outfile, "rb") as INI:
+        return observations, INI.read(), elapsed
+
+
+def compare_target_ini(candidates: typing.Dict[str, typing.Callable[[str, str], typing.Callable[[], TargetIniFile]]],
+                       rng: random.Random, ini_files: int, number_of_sections: int,
+                       number_of_operations: int) -> typing.List[Comparison]:
+    """
+    Shadow test the target INI implementations: same random INI files and operations; the outcomes of every
+    operation, and the written INI files (bytes), must be identical.
+
+    :param candidates: Dictionary of candidate name --> Callable(ini_file, work_dir) --> Callable() --> opened target
+    :param rng: Random number generator
+    :param ini_files: Number of random INI files
+    :param number_of_sections: Number of sections per INI file
+    :param number_of_operations: Number of operations per INI file
+
+    :return: List of Comparisons (one per candidate)
+
+    """
+    option_names = get_option_names()
+    legacy_ms = 0.0
+    candidate_ms = dict([(name, 0.0) for name in candidates])
+    mismatches = dict([(name, []) for name in candidates])
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for index in range(ini_files):
+            ini_file = os.path.join(work_dir, f"random_{index}.ini")
+            sections = write_random_ini(ini_file, rng, number_of_sections, option_names)
+            operations = random_operations(rng, sections, option_names, number_of_operations)
+
+            legacy_observations, legacy_bytes, elapsed = exercise_target(
+                lambda: TargetIniFile(filespec=ini_file), operations, os.path.join(work_dir, 'legacy.ini'))
+            legacy_ms += elapsed
+
+            for name, setup in candidates.items():
+                candidate_dir = os.path.join(work_dir, name)
+                os.makedirs(candidate_dir, exist_ok=True)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    open_target = setup(ini_file, candidate_dir)
+                observations, content, elapsed = exercise_target(
+                    open_target, operations, os.path.join(candidate_dir, 'candidate.ini'))
+                candidate_ms[name] += elapsed
+
+                for (operation, legacy), (_, candidate) in zip(legacy_observations, observations):
+                    if legacy != candidate:
+                        mismatches[name].append((f"{os.path.basename(ini_file)}: {operation}", legacy, candidate))
+                if content != legacy_bytes:
+                    diff = list(difflib.unified_diff(legacy_bytes.decode().splitlines(), content.decode().splitlines(),
+                                                     'legacy', name, n=0, lineterm=''))
+                    mismatches[name].append((f"{os.path.basename(ini_file)}: written INI file (bytes)",
+                                             f"{len(legacy_bytes)} bytes",
+                                             f"{len(content)} bytes\n" + "\n".join(diff[:MAX_DIFF_LINES])))
+
+    cases = ini_files * (number_of_operations + 2)
+    return [Comparison(function=TARGET_INI_FILE, candidate=name, cases=cases, legacy_ms=legacy_ms,
+                       candidate_ms=candidate_ms[name], mismatches=mismatches[name]) for name in candidates]
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Functions (pure: input --> output)
+# ---------------------------------------------------------------------------------------------------------------------
+def load_convert_version_to_number() -> typing.Callable[[str], str]:
+    # Deferred: get_nginx_domains imports the Nginx API client (requests), which is only needed by this function.
+    sys.path.insert(0, os.path.join(UTILS_DIR, 'nginx'))
+    from get_nginx_domains import convert_version_to_number
+    return convert_version_to_number
+
+
+def run_sort_version(implementation: typing.Any, case: typing.List[str]) -> typing.List[str]:
+    # TargetIniFile._sort_version only uses self.CORE: the class is passed as self (no INI file is read).
+    if isinstance(implementation, type):
+        return implementation._sort_version(implementation, list(case))
+    return implementation(list(case))
+
+
+def run_convert_to_text(implementation: typing.Any, case: tuple) -> str:
+    return getattr(implementation, case[0])(*case[1:])
+
+
+# Function --> (legacy loader, case generator, runner(implementation, case))
+FUNCTION_SPECS = {
+    SORT_VERSION: (lambda: TargetIniFile,
+                   lambda rng: [random_section_name(rng) for _ in range(rng.randint(0, 60))] +
+                   ([TargetIniFile.CORE] if rng.random() < 0.5 else []),
+                   run_sort_version),
+    CONVERT_VERSION_TO_NUMBER: (load_convert_version_to_number,
+                                lambda rng: random_fqdn(rng).split('.')[0],
+                                lambda implementation, case: implementation(case)),
+    CONVERT_TO_TEXT: (lambda: ConvertToText,
+                      lambda rng: random_build_number(rng) if rng.random() < 0.7 else
+                      ('convert_to_text', rng.randint(-10, 110)),
+                      run_convert_to_text),
+}
+
+
+def time_cases(implementation: typing.Any, runner: typing.Callable, cases: typing.List[typing.Any],
+               runs: int) -> typing.Tuple[typing.List[tuple], float]:
+    """
+    Run the implementation on all cases, repeatedly.
+
+    :return: Tuple: (list of outcomes (first run), median elapsed time (ms) for all cases)
+
+    """
+    timings = []
+    outcomes = None
+    for _ in range(max(runs, 1)):
+        start = time.perf_counter()
+        results = [get_outcome(runner, implementation, case) for case in cases]
+        timings.append((time.perf_counter() - start) * 1000.0)
+        outcomes = outcomes or results
+    return outcomes, statistics.median(timings)
+
+
+def compare_function(function: str, candidate_spec: typing.Optional[str], rng: random.Random, number_of_cases: int,
+                     runs: int) -> Comparison:
+    """
+    Shadow test a function: same random inputs; the results (or exception types) must be identical.
+
+    :param function: Name of the function (see FUNCTION_SPECS)
+    :param candidate_spec: (Optional) Candidate implementation (see load_candidate). If not specified, only the
+                           legacy implementation is timed.
+    :param rng: Random number generator
+    :param number_of_cases: Number of random inputs
+    :param runs: Number of timed runs (the median is reported)
+
+    :return: Comparison
+
+    """
+    load_legacy, generate, runner = FUNCTION_SPECS[function]
+    try:
+        legacy = load_legacy()
+    except ImportError as exc:
+        return Comparison(function=function, candidate=candidate_spec or '-', cases=0, legacy_ms=0.0,
+                          status=f"SKIPPED (legacy: {exc})")
+
+    cases = [generate(rng) for _ in range(number_of_cases)]
+    legacy_outcomes, legacy_ms = time_cases(legacy, runner, cases, runs)
+    if candidate_spec is None:
+        return Comparison(function=function, candidate='-', cases=len(cases), legacy_ms=legacy_ms,
+                          status=f"NO CANDIDATE (-c {function}=MODULE:ATTRIBUTE)")
+
+    candidate_outcomes, candidate_ms = time_cases(load_candidate(candidate_spec), runner, cases, runs)
+    mismatches = [(case, legacy, candidate) for case, legacy, candidate in
+                  zip(cases, legacy_outcomes, candidate_outcomes) if legacy != candidate]
+    return Comparison(function=function, candidate=candidate_spec, cases=len(cases), legacy_ms=legacy_ms,
+                      candidate_ms=candidate_ms, mismatches=mismatches)
+
+
+def main() -> None:
+    cli = CLIArgs()
+
+    candidates = dict()
+    for candidate in cli.args.candidate:
+        function, _, spec = candidate.partition('=')
+        if function not in FUNCTIONS or not spec:
+            cli.parser.error(f"Candidate must be specified as FUNCTION=MODULE:ATTRIBUTE, FUNCTION: {FUNCTIONS} "
+                             f"(got '{candidate}')")
+        candidates[function] = spec
+
+    # The implementations log (and warn, e.g. - removing an undefined section): not relevant to the comparison.
+    logging.disable(logging.CRITICAL)
+
+    # Imported up front, so the (deferred) yaml import is not timed as part of the first add_section.
+    import yaml  # noqa: F401
+
+    seed = cli.args.seed if cli.args.seed is not None else random.randrange(2 ** 32)
+    print(f"Seed: {seed}")
+
+    comparisons = []
+    for function in cli.args.functions:
+        rng = random.Random(f"{seed}:{function}")
+        if function == TARGET_INI_FILE:
+            target_candidates = dict([(backend, lambda ini_file, work_dir, backend=backend:
+                                       setup_backend(backend, ini_file, work_dir)) for backend in cli.args.backends])
+            if function in candidates:
+                target_class = load_candidate(candidates[function])
+                target_candidates[candidates[function]] = lambda ini_file, work_dir: (
+                    lambda: target_class(filespec=ini_file))
+            if not target_candidates:
+                continue
+            comparisons.extend(compare_target_ini(candidates=target_candidates, rng=rng,
+                                                  ini_files=cli.args.ini_files,
+                                                  number_of_sections=cli.args.sections,
+                                                  number_of_operations=cli.args.operations))
+        else:
+            comparisons.append(compare_function(function=function, candidate_spec=candidates.get(function), rng=rng,
+                                                number_of_cases=cli.args.cases, runs=cli.args.runs))
+
+    print(f"{'Function':<26} {'Candidate':<28} {'Cases':>7} {'Legacy (ms)':>12} {'Candidate (ms)':>15} "
+          f"{'Speedup':>8}  Result")
+    for comparison in comparisons:
+        candidate_ms = f"{comparison.candidate_ms:15.2f}" if comparison.candidate_ms is not None else f"{'-':>15}"
+        speedup = (f"{comparison.legacy_ms / comparison.candidate_ms:7.2f}x" if comparison.candidate_ms
+                   else f"{'-':>8}")
+        status = comparison.status or ("IDENTICAL" if not comparison.mismatches else
+                                       f"MISMATCH ({len(comparison.mismatches)})")
+        print(f"{comparison.function:<26} {comparison.candidate:<28} {comparison.cases:>7} "
+              f"{comparison.legacy_ms:12.2f} {candidate_ms} {speedup}  {status}")
+
+    failed = [comparison for comparison in comparisons if comparison.mismatches]
+    for comparison in failed:
+        print(f"\n{comparison.function} ({comparison.candidate}): {len(comparison.mismatches)} mismatches "
+              f"(first {min(len(comparison.mismatches), MAX_REPORTED_MISMATCHES)}; reproduce with --seed {seed}):")
+        for case, legacy, candidate in comparison.mismatches[:MAX_REPORTED_MISMATCHES]:
+            # (The written INI file mismatch is reported as a diff.)
+            candidate = candidate if isinstance(candidate, str) else repr(candidate)
+            print(f"  Input:     {case!r}\n  Legacy:    {legacy!r}\n  Candidate: {candidate}")
+
+    if failed:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import typing
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_INI = os.path.join(UTILS_DIR, 'target', 'target.update.ini')
+
+# Modules that must NOT be imported by the fast (--help/--list) code paths.
+HEAVY_MODULES = ['requests', 'urllib3', 'yaml', 'winrm', 'jinja2', 'sqlite3']
+
+
+class CLIArgs:
+    DEFAULT_RUNS = 5
+    DEFAULT_THRESHOLD_MS = 100.0
+
+    def __init__(self):
+        self.parser = argparse.ArgumentParser(
+            description="Measure the cold start (import) time of the Utils CLIs using 'python -X importtime'.")
+        self.parser.add_argument("-r", "--runs", default=self.DEFAULT_RUNS, type=int,
+                                 help=f"Number of runs per command (the median is reported). "
+                                      f"DEFAULT: {self.DEFAULT_RUNS}")
+        self.parser.add_argument("-t", "--threshold", default=self.DEFAULT_THRESHOLD_MS, type=float,
+                                 help=f"Maximum median import time per command (ms). "
+                                      f"DEFAULT: {self.DEFAULT_THRESHOLD_MS}")
+        self.parser.add_argument("-v", "--verbose", action='store_true',
+                                 help="List the slowest top-level imports for each command.")
+        self.args = self.parser.parse_args()
+
+
+class ImportTimeProfile(typing.NamedTuple):
+    total_us: int
+    modules: typing.Dict[str, int]
+    imported: typing.Set[str]
+
+
+def get_commands(work_dir: str) -> typing.Dict[str, typing.List[str]]:
+    """
+    Define the fast-path command lines to measure.
+
+    :param work_dir: Scratch directory (the INI is copied here, since update_target_ini.py writes a log file
+                     next to the source file).
+
+    :return: Dictionary of command description --> argument list (relative to UTILS_DIR)
+
+    """
+    ini_file = os.path.join(work_dir, os.path.basename(TARGET_INI))
+    shutil.copy(TARGET_INI, ini_file)
+    return {
+        'build_to_port.py --help': [os.path.join('build', 'build_to_port.py'), '--help'],
+        'build_to_text.py --help': [os.path.join('build', 'build_to_text.py'), '--help'],
+        'db_initialization_scripts.py --help': [os.path.join('build', 'db_initialization_scripts.py'), '--help'],
+        'get_nginx_domains.py --help': [os.path.join('nginx', 'get_nginx_domains.py'), '--help'],
+        'nginx_services.py --help': [os.path.join('nginx', 'nginx_services.py'), '--help'],
+        'update_target_ini.py --help': [os.path.join('target', 'update_target_ini.py'), '--help'],
+        'update_target_ini.py --list': [os.path.join('target', 'update_target_ini.py'), ini_file, '--list'],
+    }
+
+
+def profile_command(args: typing.List[str]) -> ImportTimeProfile:
+    """
+    Execute the command under 'python -X importtime' and parse the import timings (written to stderr).
+
+    :param args: Script (relative to UTILS_DIR) and arguments
+
+    :return: ImportTimeProfile: total cumulative import time (us), cumulative time per top-level import,
+             and the set of all imported modules.
+
+    """
+    import_line = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+    script = os.path.join(UTILS_DIR, args[0])
+    proc = subprocess.run([sys.executable, '-X', 'importtime', script] + args[1:], cwd=os.path.dirname(script),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"'{' '.join(args)}' failed (exit code: {proc.returncode}):\n{proc.stderr[-2000:]}")
+
+    modules = dict()
+    imported = set()
+    for line in proc.stderr.splitlines():
+        match = import_line.match(line)
+        if match is None:
+            continue
+        imported.add(match.group(4).split('.')[0])
+
+        # Only top-level imports (one leading space) are timed; nested imports are included in their cumulative
+        if len(match.group(3)) == 1:
+            modules[match.group(4)] = int(match.group(2))
+
+    return ImportTimeProfile(total_us=sum(modules.values()), modules=modules, imported=imported)
+
+
+def main() -> None:
+    cli = CLIArgs()
+    failures = []
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for description, args in get_commands(work_dir).items():
+            profiles = [profile_command(args) for _ in range(cli.args.runs)]
+            median_ms = statistics.median([profile.total_us for profile in profiles]) / 1000.0
+            heavy = [module for module in HEAVY_MODULES if module in profiles[0].imported]
+
+            status = 'PASS' if median_ms <= cli.args.threshold and not heavy else 'FAIL'
+            print(f"{status}: {description:<40} {median_ms:8.2f} ms (threshold: {cli.args.threshold:0.2f} ms)")
+            if heavy:
+                print(f"\tERROR: Heavy module(s) imported on the fast path: {', '.join(heavy)}")
+            if status == 'FAIL':
+                failures.append(description)
+
+            if cli.args.verbose:
+                for module, cumulative in sorted(profiles[0].modules.items(), key=lambda x: x[1], reverse=True)[:10]:
+                    print(f"\t{cumulative / 1000.0:8.2f} ms  {module}")
+
+    if failures:
+        print(f"\nStartup time regression in {len(failures)} command(s): {', '.join(failures)}")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+import argparse
+import configparser
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import typing
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_INI = os.path.join(UTILS_DIR, 'target', 'target.update.ini')
+
+sys.path.insert(0, os.path.join(UTILS_DIR, 'target'))
+from sqlite_target_ini import SqliteTargetIniFile  # noqa: E402
+from update_target_ini import TargetIniFile  # noqa: E402
+
+
+class CLIArgs:
+    DEFAULT_SECTIONS = [100, 1000, 5000]
+    DEFAULT_RUNS = 20
+
+    def __init__(self):
+        self.parser = argparse.ArgumentParser(
+            description="Compare lookup/update latency of the INI (configparser) and SQLite target stores.")
+        self.parser.add_argument("-s", "--sections", default=self.DEFAULT_SECTIONS, type=int, nargs='+',
+                                 help=f"Number of (synthetic) sections to benchmark. DEFAULT: {self.DEFAULT_SECTIONS}")
+        self.parser.add_argument("-r", "--runs", default=self.DEFAULT_RUNS, type=int,
+                                 help=f"Number of runs per measurement (the median is reported). "
+                                      f"DEFAULT: {self.DEFAULT_RUNS}")
+        self.args = self.parser.parse_args()
+
+
+def build_synthetic_ini(filename: str, number_of_sections: int) -> typing.List[str]:
+    """
+    Write a synthetic target INI file, cloning the sections of the real target INI file under new version names.
+
+    :param filename: Output file
+    :param number_of_sections: Number of sections to generate
+
+    :return: List of generated section names
+
+    """
+    source = configparser.ConfigParser()
+    source.read(TARGET_INI)
+    templates = [section for section in source.sections() if section != TargetIniFile.CORE]
+
+    output = configparser.RawConfigParser()
+    output.optionxform = str
+    output[TargetIniFile.CORE] = {}
+    sections = []
+    for index in range(number_of_sections):
+        env = ['dev', 'qa'][index % 2]
+        section = f"{env}_{10 + index // 200}.{(index // 2) % 100:02d}"
+        template = source._sections[templates[index % len(templates)]]
+        output[section] = dict([(name.upper(), value) for name, value in template.items()])
+        sections.append(section)
+    output.set(TargetIniFile.CORE, TargetIniFile.TARGETS, ", ".join(sections))
+
+    with open(filename, "w") as INI:
+        output.write(INI)
+    return sections
+
+
+def measure(func: typing.Callable[[], typing.Any], runs: int) -> float:
+    """
+    Execute the function repeatedly, and report the median latency (ms).
+
+    :param func: Function to measure
+    :param runs: Number of executions
+
+    :return: Median latency (ms)
+
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    cli = CLIArgs()
+    print(f"{'Sections':>8}  {'Operation':<32} {'INI (ms)':>10} {'SQLite (ms)':>12} {'Speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for number_of_sections in cli.args.sections:
+            ini_file = os.path.join(work_dir, f"target_{number_of_sections}.ini")
+            db_file = os.path.join(work_dir, f"target_{number_of_sections}.db")
+            sections = build_synthetic_ini(ini_file, number_of_sections)
+            SqliteTargetIniFile(filespec=db_file).import_ini(ini_file)
+            ini = TargetIniFile(filespec=ini_file)
+            db = SqliteTargetIniFile(filespec=db_file)
+
+            def ini_update():
+                target = TargetIniFile(filespec=ini_file)
+                target.update_section(random.choice(sections), 'PORT', str(random.randint(10000, 60000)))
+                target.write_file()
+
+            def db_multi_update():
+                db.update_sections(dict([(section, {'PORT': str(random.randint(10000, 60000))})
+                                         for section in random.sample(sections, 10)]))
+
+            results = [
+                ("Open + lookup 1 value",
+                 lambda: TargetIniFile(filespec=ini_file).config.get(random.choice(sections), 'PORT'),
+                 lambda: SqliteTargetIniFile(filespec=db_file).get_value(random.choice(sections), 'PORT')),
+                ("Lookup 1 value (already open)",
+                 lambda: ini.config.get(random.choice(sections), 'PORT'),
+                 lambda: db.get_value(random.choice(sections), 'PORT')),
+                ("Open + update 1 value + write", ini_update,
+                 lambda: SqliteTargetIniFile(filespec=db_file).update_section(
+                     random.choice(sections), 'PORT', str(random.randint(10000, 60000)))),
+                ("Update 10 sections (1 txn)", None, db_multi_update),
+            ]
+
+            for description, ini_func, db_func in results:
+                ini_ms = measure(ini_func, cli.args.runs) if ini_func is not None else None
+                db_ms = measure(db_func, cli.args.runs)
+                ini_text = f"{ini_ms:10.3f}" if ini_ms is not None else f"{'-':>10}"
+                speedup = f"{ini_ms / db_ms:7.1f}x" if ini_ms else f"{'-':>8}"
+                print(f"{number_of_sections:>8}  {description:<32} {ini_text} {db_ms:12.3f} {speedup}")
+
+
+if __name__ == '__main__':
+    main()
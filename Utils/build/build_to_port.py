@@ -9,8 +9,24 @@ class CLI:
         self.args = self.parser.parse_args()
 
 
-if __name__ == "__main__":
-    build_nums = CLI().args.build_number.split('.')
+def version_to_port(build_number: str) -> str:
+    """
+    Convert a build version to the environment's primary port: X.Y.Z.a --> XXYYZ (e.g. - 20.2.3.1 --> 20023)
+
+    :param build_number: Build Version number: X.Y.Z.a
+
+    :return: (str) Port number
+
+    """
+    build_nums = build_number.split('.')
     port = f"{build_nums[0]:0>2}{build_nums[1]:0>2}"
     port += build_nums[2] if len(build_nums) > 2 else "0"
-    print(port)
+    return port
+
+
+def main() -> None:
+    print(version_to_port(CLI().args.build_number))
+
+
+if __name__ == "__main__":
+    main()
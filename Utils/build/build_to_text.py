@@ -1,6 +1,11 @@
 #!/usr/bin/env python
 import argparse
 
+try:
+    from ..profiling import RunProfiler, add_profile_arguments, get_profile_file
+except ImportError:
+    from md_cicd_utils.profiling import RunProfiler, add_profile_arguments, get_profile_file
+
 number_to_text_definitions = {
     0: "zero",
     1: "one",
@@ -45,6 +50,7 @@ class CLIOptions:
         self.parser.add_argument("-d", "--delimiter", help="Build Number Delimiter", default='.')
         self.parser.add_argument("-b", "--build_num", help="Number of build numbers to use: Year=1, Major=2, Minor=3",
                                  default=3, type=int)
+        add_profile_arguments(self.parser)
         self.args = self.parser.parse_args()
 
 
@@ -70,7 +76,12 @@ class ConvertToText:
                         in build_num.split(build_delimiter)[0:build_numbers]])
 
 
-if __name__ == '__main__':
+def main() -> None:
     args = CLIOptions().args
-    print(f"{args.var}={ConvertToText.build_number(args.build_number, args.delimiter, args.build_num)}")
+    with RunProfiler(profile_file=get_profile_file('build_to_text.log'), enabled=args.profile, top=args.profile_top):
+        print(f"{args.var}={ConvertToText.build_number(args.build_number, args.delimiter, args.build_num)}")
+
+
+if __name__ == '__main__':
+    main()
 
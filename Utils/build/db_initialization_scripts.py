@@ -2,6 +2,11 @@
 import argparse
 import os
 
+try:
+    from ..profiling import RunProfiler, add_profile_arguments, get_profile_file
+except ImportError:
+    from md_cicd_utils.profiling import RunProfiler, add_profile_arguments, get_profile_file
+
 
 class Templates:
 
@@ -118,11 +123,15 @@ UPDATE {CurrentVersion}.[printdo] SET [Last_Used] = null;
 """
 
     @classmethod
-    def build_file(cls, template_name, version_name, directory="."):
-        filename = os.path.sep.join([directory, f"{template_name}_{args.version}.txt"])
+    def render(cls, template_name, version_name):
         template_doc = getattr(cls, f"{template_name}_template")
+        return template_doc.format(CurrentVersion=version_name)
+
+    @classmethod
+    def build_file(cls, template_name, version_name, directory="."):
+        filename = os.path.sep.join([directory, f"{template_name}_{version_name}.txt"])
         with open(filename, "w") as TEMPLATE_FILE:
-            TEMPLATE_FILE.write(template_doc.format(CurrentVersion=version_name))
+            TEMPLATE_FILE.write(cls.render(template_name=template_name, version_name=version_name))
             print(f"Wrote: {filename}")
 
 
@@ -134,13 +143,20 @@ class CLIArgs:
             "-t", "--template", default=Templates.ALL, choices=Templates.TEMPLATES,
             help=f"Name of template to use; default = '{Templates.ALL}'")
         self.parser.add_argument("-d", "--dir", help="Location to store output files. Default = '.'", default='.')
+        add_profile_arguments(self.parser)
         self.args = self.parser.parse_args()
 
 
-if __name__ == '__main__':
+def main() -> None:
     args = CLIArgs().args
-    if args.template.lower() == Templates.ALL:
-        for template_name in [t for t in Templates.TEMPLATES if not t == Templates.ALL]:
-            Templates.build_file(template_name=template_name, version_name=args.version, directory=args.dir)
-    else:
-        Templates.build_file(template_name=args.template, version_name=args.version, directory=args.dir)
+    profile_file = get_profile_file(os.path.join(args.dir, 'db_initialization_scripts.log'))
+    with RunProfiler(profile_file=profile_file, enabled=args.profile, top=args.profile_top):
+        if args.template.lower() == Templates.ALL:
+            for template_name in [t for t in Templates.TEMPLATES if not t == Templates.ALL]:
+                Templates.build_file(template_name=template_name, version_name=args.version, directory=args.dir)
+        else:
+            Templates.build_file(template_name=args.template, version_name=args.version, directory=args.dir)
+
+
+if __name__ == '__main__':
+    main()
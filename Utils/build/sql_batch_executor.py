@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import contextlib
+import importlib
+import io
+import os
+import queue
+import re
+import threading
+import time
+import typing
+
+try:
+    from .db_initialization_scripts import Templates
+except ImportError:
+    from db_initialization_scripts import Templates
+
+
+class CLIArgs:
+    DEFAULT_DRIVER = 'pyodbc'
+    DEFAULT_WORKERS = 4
+
+    def __init__(self):
+        self.parser = argparse.ArgumentParser(
+            description="Split the DB initialization scripts into batches (GO separators), and execute them.")
+        self.parser.add_argument("-v", "--versions", default=[], type=str, nargs='+',
+                                 help="Version Names (spelled out: TwentyOne): render the templates in memory.")
+        self.parser.add_argument("-t", "--template", default=Templates.ALL, choices=Templates.TEMPLATES,
+                                 help=f"Name of template to render for each version; default = '{Templates.ALL}'")
+        self.parser.add_argument("-f", "--files", default=[], type=str, nargs='+',
+                                 help="Script files (written by db_initialization_scripts.py: "
+                                      "{template}_{version}.txt)")
+        self.parser.add_argument("-c", "--connect", default=None, type=str,
+                                 help="Connection string passed to the driver's connect().")
+        self.parser.add_argument("--driver", default=self.DEFAULT_DRIVER, type=str,
+                                 help=f"DB-API driver module. DEFAULT: {self.DEFAULT_DRIVER}")
+        self.parser.add_argument("-w", "--workers", default=self.DEFAULT_WORKERS, type=int,
+                                 help=f"Maximum number of versions/databases to execute concurrently "
+                                      f"(and size of the connection pool). DEFAULT: {self.DEFAULT_WORKERS}")
+        self.parser.add_argument("--continue_on_error", action='store_true',
+                                 help="Continue with the remaining batches after a batch fails. "
+                                      "DEFAULT: stop all execution on the first error.")
+        self.parser.add_argument("-n", "--dry_run", action='store_true',
+                                 help="List the batches, without connecting to the database.")
+        self.args = self.parser.parse_args()
+        if not self.args.versions and not self.args.files:
+            self.parser.error("At least one version (-v) or script file (-f) is required.")
+        if not self.args.dry_run and self.args.connect is None:
+            self.parser.error("A connection string (-c) is required (unless --dry_run).")
+
+
+class SqlBatch(typing.NamedTuple):
+    source: str
+    number: int
+    line: int
+    text: str
+    repeat: int = 1
+
+
+class BatchResult(typing.NamedTuple):
+    group: str
+    source: str
+    number: int
+    line: int
+    elapsed: float
+    rowcount: typing.Optional[int] = None
+    error: typing.Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+# Batch separator: 'GO' alone on a line, with an optional repeat count (GO 5) and trailing comment.
+GO_PATTERN = re.compile(r'^\s*GO(?:\s+(?P<count>\d+))?\s*(?:--.*)?$', re.IGNORECASE)
+
+
+def split_batches(lines: typing.Iterable[str], source: str = '<stream>') -> typing.Iterator[SqlBatch]:
+    """
+    Split a SQL script into batches at the GO separators. Lines are consumed one at a time, so only the current
+    batch is held in memory. Empty batches (consecutive separators, blank lines) are skipped.
+
+    :param lines: Iterable of script lines (e.g. - an open file)
+    :param source: Name of the script (used for reporting)
+
+    :return: Iterator of SqlBatches
+
+    """
+    buffer, start_line, number = [], None, 0
+    for line_number, line in enumerate(lines, start=1):
+        match = GO_PATTERN.match(line)
+        if match is None:
+            if start_line is None and line.strip():
+                start_line = line_number
+            if start_line is not None:
+                buffer.append(line)
+            continue
+
+        if start_line is not None:
+            number += 1
+            yield SqlBatch(source=source, number=number, line=start_line, text=''.join(buffer).rstrip(),
+                           repeat=int(match.group('count') or 1))
+        buffer, start_line = [], None
+
+    if start_line is not None:
+        yield SqlBatch(source=source, number=number + 1, line=start_line, text=''.join(buffer).rstrip())
+
+
+def file_batches(filename: str) -> typing.Iterator[SqlBatch]:
+    """
+    Stream the batches of a script file.
+
+    :param filename: Name of the script file
+
+    :return: Iterator of SqlBatches
+
+    """
+    with open(filename, "r") as SCRIPT:
+        yield from split_batches(SCRIPT, source=filename)
+
+
+def template_batches(template_name: str, version_name: str) -> typing.Iterator[SqlBatch]:
+    """
+    Render a DB initialization template (see Templates), and stream its batches.
+
+    :param template_name: Name of the template
+    :param version_name: Version Name (spelled out: TwentyOne)
+
+    :return: Iterator of SqlBatches
+
+    """
+    text = Templates.render(template_name=template_name, version_name=version_name)
+    yield from split_batches(io.StringIO(text), source=f"{template_name}_{version_name}")
+
+
+class ConnectionPool:
+    """
+    Pool of DB-API connections: connections are created on demand (up to max_connections) and reused.
+
+    """
+
+    def __init__(self, connect: typing.Callable[[], typing.Any],
+                 max_connections: int = CLIArgs.DEFAULT_WORKERS) -> None:
+        """
+        Connection Pool Constructor
+
+        :param connect: Callable() --> DB-API connection (e.g. - lambda: pyodbc.connect(connection_string))
+        :param max_connections: Maximum number of open connections
+
+        """
+        self.connect = connect
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._created = 0
+        self._connections = []
+
+    def acquire(self) -> typing.Any:
+        """
+        Get an idle connection; create one if none are idle and the limit has not been reached,
+        otherwise wait for a connection to be released.
+
+        :return: DB-API connection
+
+        """
+        with self._lock:
+            create = self._idle.empty() and self._created < self.max_connections
+            if create:
+                self._created += 1
+
+        if not create:
+            return self._idle.get()
+
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def release(self, connection: typing.Any) -> None:
+        self._idle.put(connection)
+
+    @contextlib.contextmanager
+    def connection(self) -> typing.Iterator[typing.Any]:
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self) -> None:
+        """
+        Close all connections created by the pool.
+
+        :return: None
+
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+class SqlBatchExecutor:
+    """
+    Executes groups of scripts: the scripts (and batches) within a group run in order on a single pooled connection
+    (so 'USE <database>' carries over between batches); independent groups (versions/databases) run concurrently.
+
+    """
+
+    def __init__(self, pool: ConnectionPool, max_workers: int = CLIArgs.DEFAULT_WORKERS,
+                 stop_on_error: bool = True,
+                 callback: typing.Optional[typing.Callable[[BatchResult], None]] = None) -> None:
+        """
+        SQL Batch Executor Constructor
+
+        :param pool: Connection pool
+        :param max_workers: Maximum number of groups to execute concurrently
+        :param stop_on_error: Stop all groups on the first failed batch (otherwise continue with the next batch)
+        :param callback: (Optional) Callable(BatchResult) invoked as each batch completes (e.g. - for reporting)
+
+        """
+        self.pool = pool
+        self.max_workers = max_workers
+        self.stop_on_error = stop_on_error
+        self.callback = callback
+        self._stop = threading.Event()
+
+    def execute_batch(self, group: str, batch: SqlBatch, connection: typing.Any) -> BatchResult:
+        """
+        Execute a single batch (repeated per its GO count), and commit it.
+
+        :param group: Name of the group (used for reporting)
+        :param batch: Batch to execute
+        :param connection: DB-API connection
+
+        :return: BatchResult (errors are recorded in the result, not raised)
+
+        """
+        start = time.perf_counter()
+        rowcount = None
+        try:
+            for _ in range(batch.repeat):
+                cursor = connection.cursor()
+                try:
+                    # sqlite3 (the local stand-in) only executes a single statement per execute(), and a batch can
+                    # hold several: use its executescript().
+                    execute = getattr(cursor, 'executescript', cursor.execute)
+                    execute(batch.text)
+                    rowcount = cursor.rowcount
+                finally:
+                    cursor.close()
+            connection.commit()
+        except Exception as exc:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            return BatchResult(group=group, source=batch.source, number=batch.number, line=batch.line,
+                               elapsed=time.perf_counter() - start, error=f"{exc.__class__.__name__}: {exc}")
+
+        return BatchResult(group=group, source=batch.source, number=batch.number, line=batch.line,
+                           elapsed=time.perf_counter() - start, rowcount=rowcount)
+
+    def run_group(self, group: str,
+                  scripts: typing.List[typing.Callable[[], typing.Iterator[SqlBatch]]]) -> typing.List[BatchResult]:
+        """
+        Execute the scripts of a group in order, on a single pooled connection.
+
+        :param group: Name of the group (version/database)
+        :param scripts: List of callables returning each script's batches (e.g. - lambda: file_batches(filename))
+
+        :return: List of BatchResults (stops at the first failure if stop_on_error)
+
+        """
+        results = []
+        if self._stop.is_set():
+            return results
+
+        with self.pool.connection() as connection:
+            for script in scripts:
+                for batch in script():
+                    if self._stop.is_set():
+                        return results
+
+                    result = self.execute_batch(group=group, batch=batch, connection=connection)
+                    results.append(result)
+                    if self.callback is not None:
+                        self.callback(result)
+                    if not result.succeeded and self.stop_on_error:
+                        self._stop.set()
+                        return results
+        return results
+
+    def run_groups(self, groups: typing.Dict[str, typing.List[typing.Callable[[], typing.Iterator[SqlBatch]]]]
+                   ) -> typing.Dict[str, typing.List[BatchResult]]:
+        """
+        Execute the groups concurrently (bounded by max_workers).
+
+        :param groups: Dictionary of group name --> list of scripts (see run_group)
+
+        :return: Dictionary of group name --> list of BatchResults
+
+        """
+        self._stop.clear()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = dict([(group, executor.submit(self.run_group, group, scripts))
+                            for group, scripts in groups.items()])
+        return dict([(group, future.result()) for group, future in futures.items()])
+
+
+def parse_script_name(filename: str) -> typing.Tuple[typing.Optional[str], str]:
+    """
+    Determine the template and version of a script file written by db_initialization_scripts.py:
+    {template}_{version}.txt
+
+    :param filename: Name of the script file
+
+    :return: Tuple: (template name (None if not recognized), version (or the file's base name))
+
+    """
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    for template_name in Templates.TEMPLATES:
+        if base_name.startswith(f"{template_name}_"):
+            return template_name, base_name[len(template_name) + 1:]
+    return None, base_name
+
+
+def build_groups(versions: typing.List[str], template: str, files: typing.List[str]
+                 ) -> typing.Dict[str, typing.List[typing.Callable[[], typing.Iterator[SqlBatch]]]]:
+    """
+    Group the scripts by version: the scripts of a version are ordered as Templates.TEMPLATES.
+
+    :param versions: Versions to render the templates for
+    :param template: Name of template to render (or Templates.ALL)
+    :param files: Script files
+
+    :return: Dictionary of version --> list of scripts (see SqlBatchExecutor.run_group)
+
+    """
+    template_names = [t for t in Templates.TEMPLATES if t != Templates.ALL] if template == Templates.ALL else [template]
+    ordered = dict()
+    for version in versions:
+        for template_name in template_names:
+            ordered.setdefault(version, []).append(
+                (Templates.TEMPLATES.index(template_name),
+                 lambda t=template_name, v=version: template_batches(template_name=t, version_name=v)))
+
+    for index, filename in enumerate(files):
+        template_name, version = parse_script_name(filename)
+        position = Templates.TEMPLATES.index(template_name) if template_name is not None \
+            else len(Templates.TEMPLATES) + index
+        ordered.setdefault(version, []).append((position, lambda f=filename: file_batches(f)))
+
+    return dict([(version, [script for _, script in sorted(scripts, key=lambda s: s[0])])
+                 for version, scripts in ordered.items()])
+
+
+def main() -> None:
+    cli = CLIArgs()
+    groups = build_groups(versions=cli.args.versions, template=cli.args.template, files=cli.args.files)
+
+    if cli.args.dry_run:
+        for group, scripts in groups.items():
+            print(f"{group}:")
+            for script in scripts:
+                for batch in script():
+                    repeat = f" (x{batch.repeat})" if batch.repeat > 1 else ""
+                    first_line = batch.text.splitlines()[0].strip()
+                    print(f"\t{batch.source} #{batch.number} (line {batch.line}){repeat}: {first_line}")
+        return
+
+    driver = importlib.import_module(cli.args.driver)
+    kwargs = {'check_same_thread': False} if cli.args.driver == 'sqlite3' else {}
+    pool = ConnectionPool(connect=lambda: driver.connect(cli.args.connect, **kwargs),
+                          max_connections=cli.args.workers)
+
+    def report(result: BatchResult) -> None:
+        status = "OK" if result.succeeded else f"ERROR: {result.error}"
+        print(f"[{result.group}] {result.source} #{result.number} (line {result.line}): "
+              f"{result.elapsed * 1000.0:.1f} ms - {status}")
+
+    executor = SqlBatchExecutor(pool=pool, max_workers=cli.args.workers,
+                                stop_on_error=not cli.args.continue_on_error, callback=report)
+    start = time.perf_counter()
+    try:
+        results = executor.run_groups(groups)
+    finally:
+        pool.close()
+
+    all_results = [result for group_results in results.values() for result in group_results]
+    failed = [result for result in all_results if not result.succeeded]
+    print(f"\nExecuted {len(all_results)} batches in {len(results)} groups "
+          f"({time.perf_counter() - start:.2f} s): {len(failed)} failed.")
+    if failed:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import typing
+
+try:
+    from ..build.build_to_port import version_to_port
+    from ..build.build_to_text import ConvertToText
+    from ..build.db_initialization_scripts import Templates
+except ImportError:
+    from md_cicd_utils.build.build_to_port import version_to_port
+    from md_cicd_utils.build.build_to_text import ConvertToText
+    from md_cicd_utils.build.db_initialization_scripts import Templates
+
+
+DEFAULT_WORKERS = 4
+DEFAULT_SVN = os.environ.get('SVN', '')
+DEFAULT_URL_TEMPLATE = "application.{env_name}.pclender.com"
+
+
+def version_arg(value: str) -> str:
+    """
+    argparse type: validate a build version (X.Y.Z.a, e.g. - 21.3.4.1; at least X.Y).
+
+    :param value: Version string
+
+    :return: The version string (argparse.ArgumentTypeError is raised if the version is not a build version)
+
+    """
+    parts = value.split('.')
+    if len(parts) < 2 or not all([part.isdigit() for part in parts]):
+        raise argparse.ArgumentTypeError(f"invalid version: '{value}' (expected a build version: 21.3.4.1)")
+    return value
+
+
+class CLIArgs:
+    DEFAULT_CACHE_FILE = os.path.join('~', '.deploy_orchestrator_cache.json')
+    DEFAULT_TRACE_FILE = 'deploy_trace.json'
+
+    def __init__(self):
+        self.parser = argparse.ArgumentParser(
+            description="Run the MD deployment steps (see deployMD.gvy) as a dependency graph: independent steps run "
+                        "concurrently, and steps whose inputs have not changed are skipped (cached).")
+        self.parser.add_argument("version", type=version_arg, help="Build version to deploy (BUILD_VERSION): e.g. - 21.3.4.1")
+        self.parser.add_argument("-e", "--env", default='dev', type=str,
+                                 help="Environment name (ENV_NAME); 'custom' requires --custom_env. DEFAULT: dev")
+        self.parser.add_argument("--custom_env", default='', type=str,
+                                 help="Custom environment name (CUSTOM_ENV), when --env is 'custom'.")
+        self.parser.add_argument("-p", "--port", default=0, type=int,
+                                 help="Primary port (PORT). DEFAULT: 0 = derive the port from the version.")
+        self.parser.add_argument("-b", "--build", default=None, type=str,
+                                 help="Build (image) identifier; part of the cache key of the steps that use it.")
+        self.parser.add_argument("-u", "--use_existing_build", action='store_true',
+                                 help="Use the existing build (image), rather than kicking off a new build.")
+        self.parser.add_argument("--svn", default=DEFAULT_SVN, type=str,
+                                 help="SVN repository root. DEFAULT: $SVN")
+        self.parser.add_argument("-o", "--output_dir", default='.', type=str,
+                                 help="Location to store the generated files (DB scripts, etc.). DEFAULT: '.'")
+        self.parser.add_argument("-s", "--steps", default=None, type=str, nargs='+',
+                                 help="Only run these steps (and the steps they depend on). DEFAULT: all steps")
+        self.parser.add_argument("-w", "--workers", default=DEFAULT_WORKERS, type=int,
+                                 help=f"Maximum number of steps executed concurrently. DEFAULT: {DEFAULT_WORKERS}")
+        self.parser.add_argument("-c", "--cache_file", default=self.DEFAULT_CACHE_FILE, type=str,
+                                 help=f"Name of the step output cache file. DEFAULT: {self.DEFAULT_CACHE_FILE}")
+        self.parser.add_argument("-n", "--no_cache", action='store_true',
+                                 help="Do not use the step output cache; run every step.")
+        self.parser.add_argument("-t", "--trace_file", default=self.DEFAULT_TRACE_FILE, type=str,
+                                 help=f"Name of the per-step timing trace (Chrome trace event format; open in "
+                                      f"chrome://tracing or Perfetto). DEFAULT: {self.DEFAULT_TRACE_FILE}")
+        self.parser.add_argument("--plan", action='store_true',
+                                 help="List the steps (grouped by the stage in which they can run) without running.")
+        self.parser.add_argument("-d", "--debug", action='store_true', help="Enable debug logging.")
+        self.args = self.parser.parse_args()
+
+
+class DeployStep(typing.NamedTuple):
+    """
+    A single deployment step:
+        name: Name of the step
+        action: Callable(inputs, dependency outputs) --> output (JSON serializable dictionary)
+        requires: Names of the steps that must complete first (their outputs are passed to the action)
+        inputs: Names of the deployment inputs used by the step (part of the cache key)
+        description: Description of the step (deployMD.gvy stage)
+        validate: (Optional) Callable(cached output) --> True if the cached output is still usable
+                  (e.g. - the generated files still exist)
+    """
+    name: str
+    action: typing.Callable[[dict, dict], dict]
+    requires: typing.Tuple[str, ...] = ()
+    inputs: typing.Tuple[str, ...] = ()
+    description: str = ''
+    validate: typing.Optional[typing.Callable[[dict], bool]] = None
+
+
+class StepResult(typing.NamedTuple):
+    name: str
+    status: str
+    output: typing.Optional[dict]
+    start: float
+    end: float
+    thread: str
+    error: typing.Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class DeployDAG:
+    """
+    Dependency graph of deployment steps.
+
+    """
+
+    def __init__(self, steps: typing.List[DeployStep]) -> None:
+        """
+        Deploy DAG Constructor
+
+        :param steps: List of DeploySteps (in preferred execution order)
+
+        """
+        self.steps = dict([(step.name, step) for step in steps])
+        self.get_stages()
+
+    def get_stages(self) -> typing.List[typing.List[str]]:
+        """
+        Group the steps into stages: each step runs after all steps in the previous stages it depends on
+        (all steps within a stage are independent of each other).
+
+        :return: List of stages (list of step names); ValueError is raised for unknown dependencies or cycles.
+
+        """
+        for step in self.steps.values():
+            unknown = [name for name in step.requires if name not in self.steps]
+            if unknown:
+                raise ValueError(f"Step '{step.name}' requires unknown step(s): {unknown}")
+
+        stages = []
+        done = set()
+        while len(done) < len(self.steps):
+            stage = [name for name, step in self.steps.items()
+                     if name not in done and all([required in done for required in step.requires])]
+            if not stage:
+                raise ValueError(f"Circular step dependencies: {sorted(set(self.steps) - done)}")
+            stages.append(stage)
+            done.update(stage)
+        return stages
+
+    def select(self, names: typing.List[str]) -> 'DeployDAG':
+        """
+        Build the sub-graph of the specified steps (and the steps they depend on).
+
+        :param names: List of step names
+
+        :return: DeployDAG
+
+        """
+        unknown = [name for name in names if name not in self.steps]
+        if unknown:
+            raise ValueError(f"Unknown step(s): {unknown}. Steps: {list(self.steps)}")
+
+        selected = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.steps[name].requires)
+        return DeployDAG([step for name, step in self.steps.items() if name in selected])
+
+
+class StepCache:
+    """
+    On-disk cache of step outputs, keyed by a digest of the step's name, inputs and dependency outputs.
+    A step is only re-run when its inputs (e.g. - version, environment, build) or upstream outputs change.
+
+    """
+
+    OUTPUT = 'output'
+    STEP = 'step'
+    TIMESTAMP = 'timestamp'
+
+    def __init__(self, filespec: str) -> None:
+        """
+        Step Cache Constructor
+
+        :param filespec: Name of the cache file
+
+        """
+        self.filespec = os.path.expanduser(filespec)
+        self.log = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self.cache = self.read_file()
+
+    def read_file(self) -> typing.Dict[str, dict]:
+        if not os.path.exists(self.filespec):
+            return {}
+        try:
+            with open(self.filespec, "r") as CACHE:
+                return json.load(CACHE)
+        except (OSError, ValueError) as exc:
+            self.log.warning(f"Unable to read the step cache ({self.filespec}): {exc}. Ignoring the cache.")
+            return {}
+
+    def write_file(self) -> None:
+        # The whole serialize/write/replace sequence is locked: otherwise a step finishing concurrently could replace
+        # the file with an older snapshot.
+        with self._lock:
+            tmp_file = f"{self.filespec}.{threading.get_ident()}.tmp"
+            with open(tmp_file, "w") as CACHE:
+                json.dump(self.cache, CACHE, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.filespec)
+
+    @staticmethod
+    def get_key(step: DeployStep, inputs: dict, dependency_outputs: dict) -> str:
+        data = {'step': step.name, 'inputs': inputs, 'requires': dependency_outputs}
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> typing.Optional[dict]:
+        with self._lock:
+            entry = self.cache.get(key)
+        return None if entry is None else entry[self.OUTPUT]
+
+    def set(self, key: str, step: DeployStep, output: dict) -> None:
+        with self._lock:
+            self.cache[key] = {self.STEP: step.name, self.TIMESTAMP: time.time(), self.OUTPUT: output}
+        self.write_file()
+
+
+class DeployOrchestrator:
+    """
+    Runs the steps of a DeployDAG: each step is submitted to the worker pool as soon as the steps it requires have
+    completed (so independent steps run concurrently). Steps with cached outputs are skipped; the dependents of a
+    failed step are not run.
+
+    """
+
+    DONE = 'done'
+    CACHED = 'cached'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+
+    def __init__(self, dag: DeployDAG, context: typing.Dict[str, typing.Any], workers: int = DEFAULT_WORKERS,
+                 cache: typing.Optional[StepCache] = None) -> None:
+        """
+        Deploy Orchestrator Constructor
+
+        :param dag: DeployDAG of the steps to run
+        :param context: Dictionary of deployment inputs (version, env_name, build, etc.)
+        :param workers: Maximum number of steps executed concurrently
+        :param cache: (Optional) StepCache. If not specified, every step is run.
+
+        """
+        self.dag = dag
+        self.context = context
+        self.workers = workers
+        self.cache = cache
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    def run(self) -> typing.Dict[str, StepResult]:
+        """
+        Run all steps.
+
+        :return: Dictionary of step name --> StepResult (in completion order)
+
+        """
+        results = dict()
+        pending = dict(self.dag.steps)
+        running = dict()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                for name, step in list(pending.items()):
+                    statuses = [results[required].status if required in results else None
+                                for required in step.requires]
+                    if any([status in [self.FAILED, self.SKIPPED] for status in statuses]):
+                        now = time.monotonic()
+                        results[name] = StepResult(name=name, status=self.SKIPPED, output=None, start=now, end=now,
+                                                   thread='', error="A required step did not complete.")
+                        del pending[name]
+                    elif all([status in [self.DONE, self.CACHED] for status in statuses]):
+                        dependency_outputs = dict([(required, results[required].output)
+                                                   for required in step.requires])
+                        running[executor.submit(self._run_step, step, dependency_outputs)] = name
+                        del pending[name]
+
+                if not running:
+                    continue
+
+                completed, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in completed:
+                    result = future.result()
+                    results[running.pop(future)] = result
+                    self.log.info(f"{result.name}: {result.status} ({result.duration:.3f} seconds)")
+
+        return results
+
+    def _run_step(self, step: DeployStep, dependency_outputs: dict) -> StepResult:
+        """
+        Run a single step (or reuse its cached output).
+
+        :param step: DeployStep
+        :param dependency_outputs: Dictionary of required step name --> output
+
+        :return: StepResult
+
+        """
+        thread = threading.current_thread().name
+        start = time.monotonic()
+        inputs = dict([(name, self.context.get(name)) for name in step.inputs])
+
+        key = None
+        if self.cache is not None:
+            key = self.cache.get_key(step=step, inputs=inputs, dependency_outputs=dependency_outputs)
+            output = self.cache.get(key)
+            if output is not None and (step.validate is None or step.validate(output)):
+                return StepResult(name=step.name, status=self.CACHED, output=output, start=start,
+                                  end=time.monotonic(), thread=thread)
+
+        try:
+            output = step.action(inputs, dependency_outputs)
+        except Exception as exc:
+            self.log.exception(f"Step '{step.name}' failed.")
+            return StepResult(name=step.name, status=self.FAILED, output=None, start=start, end=time.monotonic(),
+                              thread=thread, error=f"{exc.__class__.__name__}: {exc}")
+
+        if key is not None:
+            self.cache.set(key=key, step=step, output=output)
+        return StepResult(name=step.name, status=self.DONE, output=output, start=start, end=time.monotonic(),
+                          thread=thread)
+
+    @staticmethod
+    def write_trace(results: typing.Dict[str, StepResult], filespec: str) -> None:
+        """
+        Write the per-step timing trace (Chrome trace event format: one complete event per step, one row per worker).
+
+        :param results: Dictionary of step name --> StepResult (see run)
+        :param filespec: Name of the trace file
+
+        :return: None
+
+        """
+        origin = min([result.start for result in results.values()], default=0.0)
+        threads = sorted(set([result.thread for result in results.values()]))
+        events = [{'name': result.name, 'cat': result.status, 'ph': 'X', 'pid': os.getpid(),
+                   'tid': threads.index(result.thread), 'ts': round((result.start - origin) * 1e6),
+                   'dur': round(result.duration * 1e6),
+                   'args': {'status': result.status, 'error': result.error}} for result in results.values()]
+        with open(filespec, "w") as TRACE:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, TRACE, indent=2)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Deployment steps (deployMD.gvy stages)
+# ---------------------------------------------------------------------------------------------------------------------
+def define_environment(inputs: dict, requires: dict) -> dict:
+    """
+    Stage: Define the Deployment Environment
+    """
+    version = inputs['version']
+    if inputs['env_name'] == 'custom':
+        if not inputs['custom_env']:
+            raise ValueError("No custom name was provided, but a custom env was selected.")
+        env_name = inputs['custom_env']
+    else:
+        env_name = inputs['env_name']
+
+    return {
+        'version': version,
+        'build_text': ConvertToText.build_number(version),
+        'port': str(inputs['port']) if inputs['port'] else version_to_port(version),
+        'env_name': env_name,
+        'env_url': DEFAULT_URL_TEMPLATE.format(env_name=env_name),
+        'los_repository': f"{inputs['svn']}/LOS/branches/Maintenance/{version}",
+    }
+
+
+def get_or_build_image(inputs: dict, requires: dict) -> dict:
+    """
+    Stage: Get or Build Requested Image
+    """
+    actions = ["Use existing build" if inputs['use_existing_build'] else "Kick off new build",
+               "Set Build Triggers", "Update ServiceDeployer", "Update Patch Manager",
+               "Set Jira Integration parameters"]
+    for action in actions:
+        logging.getLogger('get_or_build_image').info(action)
+    return {'build': inputs['build'], 'actions': actions}
+
+
+def define_build_parameters(inputs: dict, requires: dict) -> dict:
+    """
+    Stage: Define Build Parameters
+    """
+    environment = requires['define_environment']
+    return {'BUILD_VERSION': environment['version'], 'VERSION_TEXT': environment['build_text'],
+            'PORT': environment['port'], 'ENV_NAME': environment['env_name'], 'ENV_URL': environment['env_url']}
+
+
+def register_service(inputs: dict, requires: dict) -> dict:
+    """
+    Stage: Define the MS Win Service for MD instance
+    """
+    parameters = requires['define_build_parameters']
+    service = f"MD_{parameters['VERSION_TEXT']}_{parameters['ENV_NAME']}"
+    logging.getLogger('register_service').info(f"Registering and Tweaking the Service: {service}")
+    return {'service': service, 'port': parameters['PORT'], 'build': requires['get_or_build_image']['build']}
+
+
+def setup_database(inputs: dict, requires: dict) -> dict:
+    """
+    Stage: Setup Database (generate the DB initialization scripts, see db_initialization_scripts.py)
+    """
+    build_text = requires['define_environment']['build_text']
+    os.makedirs(inputs['output_dir'], exist_ok=True)
+    files = []
+    for template_name in [t for t in Templates.TEMPLATES if not t == Templates.ALL]:
+        Templates.build_file(template_name=template_name, version_name=build_text, directory=inputs['output_dir'])
+        files.append(os.path.abspath(os.path.sep.join([inputs['output_dir'], f"{template_name}_{build_text}.txt"])))
+    return {'scripts': files}
+
+
+def automate_patch_manager(inputs: dict, requires: dict) -> dict:
+    """
+    Stage: Automate Patch Manager
+    """
+    environment = requires['define_environment']
+    filespec = os.path.abspath(os.path.join(inputs['output_dir'], f"patch_manager_{environment['build_text']}.txt"))
+    with open(filespec, "w") as SCRIPT:
+        SCRIPT.write(f"REM Patch Manager: {environment['version']} ({environment['env_name']})\n")
+        for script in requires['setup_database']['scripts']:
+            SCRIPT.write(f"REM DB script: {script}\n")
+    return {'script': filespec}
+
+
+def files_exist(key: str) -> typing.Callable[[dict], bool]:
+    """
+    Build a cached output validator: the file(s) listed in the output (under the key) must still exist.
+
+    :param key: Output key of the file (or list of files)
+
+    :return: Callable(output) --> bool
+
+    """
+    def validate(output: dict) -> bool:
+        files = output[key] if isinstance(output[key], list) else [output[key]]
+        return all([os.path.exists(filespec) for filespec in files])
+    return validate
+
+
+DEPLOY_STEPS = [
+    DeployStep(name='define_environment', action=define_environment,
+               inputs=('version', 'env_name', 'custom_env', 'port', 'svn'),
+               description="Define the Deployment Environment"),
+    DeployStep(name='get_or_build_image', action=get_or_build_image, requires=('define_environment',),
+               inputs=('build', 'use_existing_build'), description="Get or Build Requested Image"),
+    DeployStep(name='define_build_parameters', action=define_build_parameters, requires=('define_environment',),
+               description="Define Build Parameters"),
+    DeployStep(name='setup_database', action=setup_database, requires=('define_environment',),
+               inputs=('output_dir',), description="Setup Database", validate=files_exist('scripts')),
+    DeployStep(name='register_service', action=register_service,
+               requires=('get_or_build_image', 'define_build_parameters'),
+               description="Define the MS Win Service for MD instance"),
+    DeployStep(name='automate_patch_manager', action=automate_patch_manager,
+               requires=('define_environment', 'get_or_build_image', 'setup_database'), inputs=('output_dir',),
+               description="Automate Patch Manager", validate=files_exist('script')),
+]
+
+
+def main() -> None:
+    cli = CLIArgs()
+    logging.basicConfig(level=logging.DEBUG if cli.args.debug else logging.WARNING,
+                        format='[%(asctime)s.%(msecs)03d]:[%(levelname)-7s]:[%(name)s.%(funcName)s]: %(message)s',
+                        datefmt="%m/%d/%YT%H:%M:%S")
+
+    dag = DeployDAG(DEPLOY_STEPS)
+    if cli.args.steps is not None:
+        try:
+            dag = dag.select(cli.args.steps)
+        except ValueError as exc:
+            cli.parser.error(str(exc))
+
+    if cli.args.plan:
+        for index, stage in enumerate(dag.get_stages()):
+            print(f"Stage {index + 1}: " + ", ".join([f"{name} ({dag.steps[name].description})" for name in stage]))
+        return
+
+    context = {'version': cli.args.version, 'env_name': cli.args.env, 'custom_env': cli.args.custom_env,
+               'port': cli.args.port, 'svn': cli.args.svn, 'build': cli.args.build,
+               'use_existing_build': cli.args.use_existing_build, 'output_dir': os.path.abspath(cli.args.output_dir)}
+    cache = None if cli.args.no_cache else StepCache(filespec=cli.args.cache_file)
+
+    orchestrator = DeployOrchestrator(dag=dag, context=context, workers=cli.args.workers, cache=cache)
+    start = time.monotonic()
+    results = orchestrator.run()
+    elapsed = time.monotonic() - start
+    orchestrator.write_trace(results=results, filespec=cli.args.trace_file)
+
+    for name in dag.steps:
+        result = results[name]
+        error = f" --> {result.error}" if result.error else ''
+        print(f"{name:<25} {result.status:<8} {result.duration:8.3f} seconds{error}")
+    serial = sum([result.duration for result in results.values()])
+    print(f"Total: {elapsed:.3f} seconds (sum of steps: {serial:.3f} seconds). Trace: {cli.args.trace_file}")
+
+    if any([result.status in [orchestrator.FAILED, orchestrator.SKIPPED] for result in results.values()]):
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,24 @@
 
 import argparse
 import re
-import sys
 import typing
 
-sys.path.append('.')
-from nginx_apis import NginxKeyVals
+try:
+    from ..profiling import RunProfiler, add_profile_arguments, get_profile_file
+except ImportError:
+    from md_cicd_utils.profiling import RunProfiler, add_profile_arguments, get_profile_file
+
+try:
+    from .nginx_apis import NginxKeyVals
+    from .nginx_flow_control import NginxDeviceUnavailable
+except ImportError:
+    from nginx_apis import NginxKeyVals
+    from nginx_flow_control import NginxDeviceUnavailable
+
+
+DEFAULT_IPS = ['10.9.20.10', '10.9.20.70']
+DEFAULT_PORT = 8989
+ZONE_NAME = 'los'
 
 
 class CliArgs:
@@ -18,6 +31,7 @@ class CliArgs:
                                  help=f"Nginx API Server Port. DEFAULT: {DEFAULT_PORT}")
         self.parser.add_argument("-y", "--yaml", default=None, type=str,
                                  help="Name of yaml file to write FQDN (for use in configuring through JJB)")
+        add_profile_arguments(self.parser)
         self.args = self.parser.parse_args()
 
 
@@ -138,34 +152,41 @@ def check_for_duplicates(fqdns_list: typing.List[str], device_ip: str) -> bool:
     return True
 
 
-if __name__ == '__main__':
-    DEFAULT_IPS = ['10.9.20.10', '10.9.20.70']
-    DEFAULT_PORT = 8989
-    ZONE_NAME = 'los'
+def main() -> None:
     (user, pswd) = ('*' * 8, '*' * 8)
 
     cli = CliArgs()
 
-    api_base_url = f'http://{{ip_address}}:{cli.args.port}/api/6'
-    ip_addresses = DEFAULT_IPS if cli.args.ip_addrs is None else cli.args.ip_addrs
-
-    fqdn_list = []
-    for ip in ip_addresses:
-        nginx = NginxKeyVals(username=user, password=pswd, base_url=api_base_url.format(ip_address=ip))
-        fqdns = nginx.get_stream_keyvals(zone_name=ZONE_NAME)
-        check_for_duplicates(fqdns, ip)
-
-        for target, port in sorted(fqdns.items(), key=lambda x: x[1]):
-
-            # Only add FQDNs that have a port defined.
-            if port is not None and port != '':
-                print(f"{build_target_name(target)}:{port} <== {target}")
-                fqdn_list.append(target)
-
-    # If requested to write to a YAML file.
-    if cli.args.yaml is not None:
-        fqdn_list = sort_fqdns(fqdn_list)
-        with open(cli.args.yaml, "w") as YAML:
-            for fqdn in fqdn_list:
-                YAML.write(f"- {fqdn.lower()}\n")
-        print(f"Wrote FQDNs to YAML file: {cli.args.yaml}")
+    with RunProfiler(profile_file=get_profile_file('get_nginx_domains.log'), enabled=cli.args.profile,
+                     top=cli.args.profile_top):
+        api_base_url = f'http://{{ip_address}}:{cli.args.port}/api/6'
+        ip_addresses = DEFAULT_IPS if cli.args.ip_addrs is None else cli.args.ip_addrs
+
+        fqdn_list = []
+        for ip in ip_addresses:
+            nginx = NginxKeyVals(username=user, password=pswd, base_url=api_base_url.format(ip_address=ip))
+            try:
+                fqdns = nginx.get_stream_keyvals(zone_name=ZONE_NAME)
+            except NginxDeviceUnavailable as exc:
+                print(f"***ERROR*** Unable to query {ip}: {exc}")
+                continue
+            check_for_duplicates(fqdns, ip)
+
+            for target, port in sorted(fqdns.items(), key=lambda x: x[1]):
+
+                # Only add FQDNs that have a port defined.
+                if port is not None and port != '':
+                    print(f"{build_target_name(target)}:{port} <== {target}")
+                    fqdn_list.append(target)
+
+        # If requested to write to a YAML file.
+        if cli.args.yaml is not None:
+            fqdn_list = sort_fqdns(fqdn_list)
+            with open(cli.args.yaml, "w") as YAML:
+                for fqdn in fqdn_list:
+                    YAML.write(f"- {fqdn.lower()}\n")
+            print(f"Wrote FQDNs to YAML file: {cli.args.yaml}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,63 @@
+import operator
 import typing
 
-import requests
-from requests.auth import HTTPBasicAuth
+try:
+    from .nginx_flow_control import DeviceFlowControl, NginxDeviceUnavailable
+except ImportError:
+    from nginx_flow_control import DeviceFlowControl, NginxDeviceUnavailable
+
+# (connect, read) timeouts, in seconds, for every API request
+DEFAULT_TIMEOUT = (3.05, 10)
 
 
 class BaseNginxAPIClient:
-    def __init__(self, username: str, password: str, base_url: str) -> None:
+    def __init__(self, username: str, password: str, base_url: str,
+                 timeout: typing.Tuple[float, float] = DEFAULT_TIMEOUT) -> None:
         """
         Nginx Server Info Constructor
 
         :param username: Name to use when authenticate against the API
         :param password: Password to use when authenticate against the API
         :param base_url: Primary API URL
+        :param timeout: (connect, read) timeouts, in seconds, for every API request. DEFAULT: DEFAULT_TIMEOUT
 
         """
+        # Deferred: requests is only needed once a client is instantiated (not for --help or argument errors).
+        import requests
+        from requests.auth import HTTPBasicAuth
+
         self.username = username
         self.password = password
         self.base_url = base_url
         self.auth = HTTPBasicAuth(self.username, self.password)
 
+        # Single pooled (keep-alive) HTTP session, reused for every request made by this client.
+        self.session = requests.Session()
+        self.session.auth = self.auth
+        self.timeout = timeout
+        self._request_errors = requests.RequestException
+
+        # Adaptive concurrency limit + circuit breaker, shared by all clients of the same device.
+        self.flow = DeviceFlowControl.for_device(self.base_url)
+
+    def _request(self, method: str, url: str, **kwargs) -> typing.Any:
+        """
+        Send a request to the device, under the device's circuit breaker and adaptive concurrency limit.
+        Connection errors, timeouts and 5xx responses are recorded as device failures.
+
+        :param method: HTTP method (e.g. - 'GET', 'PATCH')
+        :param url: Request URL
+        :param kwargs: Additional request arguments (e.g. - json)
+
+        :return: Response (NginxDeviceUnavailable is raised if the request was not sent, or the device did not respond)
+
+        """
+        try:
+            return self.flow.call(lambda: self.session.request(method, url, timeout=self.timeout, **kwargs),
+                                  is_failure=lambda resp: int(resp.status_code) >= 500)
+        except self._request_errors as exc:
+            raise NginxDeviceUnavailable(f"{method} {url} failed: {exc.__class__.__name__}: {exc}") from exc
+
 
 class NginxServerInfo(BaseNginxAPIClient):
     """
@@ -37,29 +76,100 @@ class NginxServerInfo(BaseNginxAPIClient):
     MAX_FAILS = 'max_fails'
     PEERS = 'peers'
     SERVER = 'server'
+    STATE = 'state'
     WEIGHT = 'weight'
     OPTIONS = [BACKUP, DOWN, FAIL_TIMEOUT, ID, MAX_CONNS, MAX_FAILS, SERVER, WEIGHT]
 
+    # Peer attributes tracked when watching for state transitions
+    WATCH_FIELDS = [STATE, DOWN, WEIGHT]
+
     def get_upstream_info(self) -> dict:
         """
         Gets basic upstream info: name of services, servers per services, and metadata describing each server
 
-        :return: JSON formatted API response
+        :return: JSON formatted API response (empty if the query failed)
+
+        """
+        data = self._get_upstream_info()
+        return data if data is not None else {}
+
+    def _get_upstream_info(self) -> typing.Optional[dict]:
+        """
+        Gets basic upstream info (see get_upstream_info), distinguishing a failed query from a device without upstreams.
+
+        :return: JSON formatted API response, or None if the query failed (the error is reported)
 
         """
         url_resource = "/stream/upstreams/"
 
         url = self.base_url + url_resource
-        resp = requests.get(url, auth=self.auth)
+        resp = self._request('GET', url)
 
         if int(resp.status_code) == 200:
             data = resp.json()
         else:
-            data = {}
+            data = None
             print(f"\tERROR: Unexpected response from GET {url}: STATUS CODE: {resp.status_code}")
 
         return data
 
+    def get_peer_snapshot(
+            self, services: typing.Optional[typing.List[str]] = None,
+            fields: typing.Optional[typing.List[str]] = None) -> typing.Optional[typing.Dict[tuple, dict]]:
+        """
+        Get the current attributes of every peer, using a single upstream query (one request per device).
+
+        :param services: (Optional) List of services to include. If not specified, all services are included.
+        :param fields: (Optional) List of peer fields to capture; defaults to WATCH_FIELDS.
+
+        :return: Dictionary of peer attributes: [(service, server_id)][field1: attribute1, field2: attribute2],
+                 or None if the query failed (an empty dictionary is a device without (matching) peers).
+
+        """
+        fields = fields or self.WATCH_FIELDS
+
+        upstreams = self._get_upstream_info()
+        if upstreams is None:
+            return None
+
+        snapshot = dict()
+        for service, upstream in upstreams.items():
+            if services is not None and service not in services:
+                continue
+            for peer in upstream.get(self.PEERS, []):
+                snapshot[(service, peer[self.ID])] = dict(
+                    [(key, peer.get(key)) for key in [self.SERVER] + fields])
+        return snapshot
+
+    @staticmethod
+    def diff_peer_snapshots(previous: typing.Dict[tuple, dict],
+                            current: typing.Dict[tuple, dict]) -> typing.List[str]:
+        """
+        Compare two peer snapshots (see get_peer_snapshot) and describe the transitions between them.
+
+        :param previous: Previous peer snapshot
+        :param current: Current peer snapshot
+
+        :return: List of transition descriptions; empty if nothing changed.
+
+        """
+        changes = []
+        for key in sorted(set(previous) | set(current)):
+            service, server_id = key
+            old, new = previous.get(key), current.get(key)
+            if old == new:
+                continue
+
+            if old is None:
+                changes.append(f"{service} --> server #{server_id} ({new[NginxServerInfo.SERVER]}): ADDED")
+            elif new is None:
+                changes.append(f"{service} --> server #{server_id} ({old[NginxServerInfo.SERVER]}): REMOVED")
+            else:
+                for field in [field for field in new if old.get(field) != new[field]]:
+                    changes.append(f"{service} --> server #{server_id} ({new[NginxServerInfo.SERVER]}): "
+                                   f"'{field}' changed from '{old.get(field)}' to '{new[field]}'")
+        return changes
+
     def get_list_of_services(self) -> typing.List[str]:
         """
         Returns list of configured services
@@ -80,7 +190,7 @@ class NginxServerInfo(BaseNginxAPIClient):
 
     def get_server_status_info(
             self, service: typing.Optional[list] = None, server_index: typing.Optional[int] = None,
-            fields: typing.Optional[list] = None) -> dict:
+            fields: typing.Optional[list] = None, as_dict: bool = True) -> dict:
         """
         Get status information for each server, based on server id.
 
@@ -88,8 +198,12 @@ class NginxServerInfo(BaseNginxAPIClient):
         :param server_index: For a single service, specify the server index. If multiple servers, all indexes will
                    be returned.
         :param fields: List of server fields to retrieve; if not specified, defaults to SERVER IP and DOWN status.
+                   Fields not reported by the API are returned as None.
+        :param as_dict: True (default) = return each server's fields as a dictionary,
+                   False = return each server's fields as a compact tuple, in the order of the requested fields.
 
         :return: Dictionary of server information: [server][server_id][ [field1: attribute1]. [field2, attribute2] ]
+                 or, if not as_dict: [server][server_id](attribute1, attribute2)
 
         """
 
@@ -98,33 +212,65 @@ class NginxServerInfo(BaseNginxAPIClient):
         fields = fields or [self.SERVER, self.DOWN]
         service = service or self.get_list_of_services()
 
+        # Determined once per call, rather than per server
+        project = self._build_projection(fields)
+        single_index = server_index if len(service) == 1 else None
+
         server_info = dict()
         for server in service:
 
             # Get upstream server info
             url = self.base_url + url_resource.format(streamUpstreamName=server)
-            resp = requests.get(url, auth=self.auth)
+            resp = self._request('GET', url)
             if resp.status_code != 200:
                 print(f"\tERROR: Unexpected response from GET {url}: STATUS CODE: {resp.status_code}")
                 continue
 
-            # Convert to json and parse out desired fields
+            # Convert to json and parse out desired fields (only the requested server, if a single index was given)
             data = resp.json()
-            server_info[server] = dict()
-            for idx, server_dict in enumerate(data):
-                if len(service) == 1 and server_index is not None and idx != server_index:
-                    continue
-                server_info[server][server_dict[self.ID]] = dict([(key, server_dict[key]) for key in fields])
+            if single_index is not None:
+                data = data[single_index:single_index + 1]
+
+            if as_dict:
+                server_info[server] = dict([(server_dict[self.ID], dict(zip(fields, project(server_dict))))
+                                            for server_dict in data])
+            else:
+                server_info[server] = dict([(server_dict[self.ID], project(server_dict)) for server_dict in data])
 
         return server_info
 
-    def set_server_attributes(self, service: str, attribute_dict: dict, server_id: typing.Optional[int] = None) -> bool:
+    @staticmethod
+    def _build_projection(fields: typing.List[str]) -> typing.Callable[[dict], tuple]:
+        """
+        Build a reusable projection of the requested fields from a server's JSON dictionary.
+
+        :param fields: List of server fields to project
+
+        :return: Callable(server_dict) --> tuple of field values (in the order of fields); absent fields are None.
+
+        """
+        getter = operator.itemgetter(*fields)
+        fast_path = getter if len(fields) > 1 else (lambda server_dict: (getter(server_dict),))
+
+        def project(server_dict: dict) -> tuple:
+            try:
+                return fast_path(server_dict)
+            except KeyError:
+                return tuple([server_dict.get(key) for key in fields])
+
+        return project
+
+    def set_server_attributes(self, service: str, attribute_dict: dict, server_id: typing.Optional[int] = None,
+                              server_ids: typing.Optional[typing.List[int]] = None) -> bool:
         """
         Set specific server attributes.
 
         :param service: Name of specific service
         :param attribute_dict: Dictionary of attributes (field1: value1, field2: value2)
         :param server_id: Index of specific upstream server
+        :param server_ids: (Optional) Ids of the servers in the service, if already known (e.g. - from the status
+                   query just made). If not specified (and server_id is not specified), the number of servers is
+                   retrieved from the device.
 
         :return: True = value(s) set and verified,
                  False = not all values were set successfully.
@@ -132,8 +278,8 @@ class NginxServerInfo(BaseNginxAPIClient):
 
         """
         if server_id is None:
-            number_of_ids = self.get_number_of_servers(service)
-            server_ids = range(self.get_number_of_servers(service))
+            server_ids = list(server_ids) if server_ids is not None else range(self.get_number_of_servers(service))
+            number_of_ids = len(server_ids)
 
         else:
             number_of_ids = 1
@@ -193,7 +339,7 @@ class NginxServerInfo(BaseNginxAPIClient):
             print(f"\t- Setting service '{service}' --> server #{server_id} property '{key}' was set to '{value}':   ",
                   end='')
 
-        resp = requests.patch(url, auth=self.auth, json=attribute_dict)
+        resp = self._request('PATCH', url, json=attribute_dict)
         status = resp.status_code == 200
         if not status:
             print("ERROR")
@@ -217,7 +363,7 @@ class NginxKeyVals(BaseNginxAPIClient):
         url_resource = '/stream/keyvals'
 
         url = self.base_url + url_resource
-        resp = requests.get(url, auth=self.auth)
+        resp = self._request('GET', url)
 
         if int(resp.status_code) == 200:
             data = resp.json()
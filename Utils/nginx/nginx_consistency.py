@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import typing
+
+try:
+    from .nginx_apis import NginxKeyVals, NginxServerInfo
+except ImportError:
+    from nginx_apis import NginxKeyVals, NginxServerInfo
+
+
+DEFAULT_IPS = ['10.9.20.10', '10.9.20.70']
+DEFAULT_PORT = 8989
+
+# Configured peer attributes returned by /stream/upstreams (runtime attributes, e.g. - state, active, requests, are
+# expected to differ; max_fails, fail_timeout and down are not returned for stream peers).
+# Peer ids are assigned per device, so peers are matched by server address.
+CONFIG_FIELDS = [NginxServerInfo.SERVER, NginxServerInfo.WEIGHT, NginxServerInfo.MAX_CONNS, NginxServerInfo.BACKUP]
+
+
+class NginxFetchError(Exception):
+    """
+    A device answered, but did not return the requested data (non-200 response, or an empty payload).
+    """
+    pass
+
+
+class CliArgs:
+    def __init__(self):
+        self.parser = argparse.ArgumentParser(
+            description="Verify that the Nginx devices have identical upstreams (peer attributes) and keyval zones.")
+        self.parser.add_argument("-a", "--ip_addrs", default=DEFAULT_IPS, type=str, nargs='+',
+                                 help=f"IP Addresses of the Nginx devices to compare. DEFAULT: {DEFAULT_IPS}")
+        self.parser.add_argument("-p", "--port", default=DEFAULT_PORT, type=int,
+                                 help=f"Nginx API Server Port. DEFAULT: {DEFAULT_PORT}")
+        self.parser.add_argument("-f", "--fields", default=CONFIG_FIELDS, type=str, nargs='+',
+                                 help=f"Peer attributes to compare. DEFAULT: {CONFIG_FIELDS}")
+        self.parser.add_argument("-j", "--json", action='store_true', help="Report the divergent entries as JSON.")
+        self.args = self.parser.parse_args()
+
+
+class DeviceConfig(typing.NamedTuple):
+    device: str
+    upstreams: typing.Dict[str, typing.List[dict]]
+    keyvals: typing.Dict[str, typing.Dict[str, str]]
+    error: typing.Optional[str] = None
+
+
+class Divergence(typing.NamedTuple):
+    kind: str
+    name: str
+    details: typing.List[str]
+
+
+class NginxConsistencyChecker:
+    """
+    Compares the upstreams and keyval zones of multiple Nginx devices (which should mirror each other).
+    Every upstream/zone is normalized and hashed per device; entries with identical hashes on all devices are
+    consistent, and only the divergent entries are compared in detail.
+
+    """
+
+    UPSTREAM = 'upstream'
+    KEYVAL_ZONE = 'keyval zone'
+
+    def __init__(self, username: str, password: str, base_urls: typing.Dict[str, str],
+                 fields: typing.Optional[typing.List[str]] = None) -> None:
+        """
+        Nginx Consistency Checker Constructor
+
+        :param username: Name to use when authenticate against the API
+        :param password: Password to use when authenticate against the API
+        :param base_urls: Dictionary of device name (e.g. - IP address) --> Primary API URL
+        :param fields: Peer attributes to compare. DEFAULT: CONFIG_FIELDS
+
+        """
+        self.username = username
+        self.password = password
+        self.base_urls = base_urls
+        self.fields = fields or CONFIG_FIELDS
+
+    def normalize_upstream(self, upstream: dict) -> typing.List[dict]:
+        """
+        Normalize an upstream: the compared attributes of each peer, sorted by server address.
+
+        :param upstream: Upstream (see NginxServerInfo.get_upstream_info)
+
+        :return: List of peer dictionaries
+
+        """
+        peers = [dict([(field, peer.get(field)) for field in self.fields])
+                 for peer in upstream.get(NginxServerInfo.PEERS, [])]
+        return sorted(peers, key=lambda peer: (str(peer.get(NginxServerInfo.SERVER)), json.dumps(peer, sort_keys=True)))
+
+    @staticmethod
+    def get_digest(data: typing.Any) -> str:
+        return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+    # The API helpers return {} on a non-200 response: an empty payload is a fetch error, otherwise every entry
+    # would be reported as "Not defined" on the device.
+    def fetch_upstreams(self, device: str) -> typing.Dict[str, typing.List[dict]]:
+        client = NginxServerInfo(username=self.username, password=self.password, base_url=self.base_urls[device])
+        upstreams = client.get_upstream_info()
+        if not upstreams:
+            raise NginxFetchError(f"No upstreams returned by {self.base_urls[device]} (non-200 response or empty).")
+        return dict([(service, self.normalize_upstream(upstream)) for service, upstream in upstreams.items()])
+
+    def fetch_keyvals(self, device: str) -> typing.Dict[str, typing.Dict[str, str]]:
+        client = NginxKeyVals(username=self.username, password=self.password, base_url=self.base_urls[device])
+        keyvals = client.get_stream_keyvals()
+        if not keyvals:
+            raise NginxFetchError(f"No keyval zones returned by {self.base_urls[device]} (non-200 response or empty).")
+        return keyvals
+
+    def fetch_all(self) -> typing.List[DeviceConfig]:
+        """
+        Fetch the upstreams and keyval zones of all devices concurrently.
+
+        :return: List of DeviceConfigs (in device order); a device that could not be queried has an error.
+
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2 * len(self.base_urls)) as executor:
+            futures = [(device, executor.submit(self.fetch_upstreams, device),
+                        executor.submit(self.fetch_keyvals, device)) for device in self.base_urls]
+
+            configs = []
+            for device, upstreams, keyvals in futures:
+                try:
+                    configs.append(DeviceConfig(device=device, upstreams=upstreams.result(), keyvals=keyvals.result()))
+                except Exception as exc:
+                    configs.append(DeviceConfig(device=device, upstreams={}, keyvals={},
+                                                error=f"{exc.__class__.__name__}: {exc}"))
+        return configs
+
+    def compare(self, configs: typing.List[DeviceConfig]) -> typing.List[Divergence]:
+        """
+        Compare the devices' upstreams and keyval zones.
+
+        :param configs: List of DeviceConfigs (see fetch_all); devices with errors are not compared.
+
+        :return: List of Divergences (only the divergent upstreams/zones)
+
+        """
+        configs = [config for config in configs if config.error is None]
+        divergences = []
+        for kind, attribute, describe in [(self.UPSTREAM, 'upstreams', self._diff_upstream),
+                                          (self.KEYVAL_ZONE, 'keyvals', self._diff_keyval_zone)]:
+            entries = [getattr(config, attribute) for config in configs]
+            digests = [dict([(name, self.get_digest(data)) for name, data in device_entries.items()])
+                       for device_entries in entries]
+
+            for name in sorted(set([name for device_digests in digests for name in device_digests])):
+                if len(set([device_digests.get(name) for device_digests in digests])) == 1:
+                    continue
+
+                missing = [config.device for config, device_entries in zip(configs, entries)
+                           if name not in device_entries]
+                present = [(config.device, device_entries[name]) for config, device_entries in zip(configs, entries)
+                           if name in device_entries]
+                details = [f"Not defined on: {', '.join(missing)}"] if missing else []
+                if len(set([device_digests[name] for device_digests in digests if name in device_digests])) > 1:
+                    details.extend(describe(present))
+                divergences.append(Divergence(kind=kind, name=name, details=details))
+        return divergences
+
+    @staticmethod
+    def _diff_values(name: str, values: typing.List[typing.Tuple[str, typing.Any]]) -> typing.List[str]:
+        """
+        Describe the difference of a single value across the devices.
+
+        :param name: Description of the value
+        :param values: List of tuples: (device, value (None if not defined))
+
+        :return: List with the description (empty if the value is identical on all devices)
+
+        """
+        if len(set([json.dumps(value, sort_keys=True) for _, value in values])) <= 1:
+            return []
+        missing = [device for device, value in values if value is None]
+        if missing:
+            return [f"{name}: not defined on {', '.join(missing)}"]
+        return [f"{name}: " + ", ".join([f"{device}='{value}'" for device, value in values])]
+
+    def _diff_upstream(self, present: typing.List[typing.Tuple[str, typing.List[dict]]]) -> typing.List[str]:
+        details = []
+        peers_by_device = []
+        for device, peers in present:
+            by_server = dict()
+            for peer in peers:
+                server = str(peer.get(NginxServerInfo.SERVER))
+                occurrence = len([key for key in by_server if key[0] == server])
+                by_server[(server, occurrence)] = peer
+            peers_by_device.append((device, by_server))
+
+        for key in sorted(set([key for _, by_server in peers_by_device for key in by_server])):
+            server = key[0] if key[1] == 0 else f"{key[0]} (#{key[1] + 1})"
+            peers = [(device, by_server.get(key)) for device, by_server in peers_by_device]
+            if any([peer is None for _, peer in peers]):
+                details.extend(self._diff_values(f"server {server}", peers))
+                continue
+            for field in self.fields:
+                details.extend(self._diff_values(f"server {server} '{field}'",
+                                                 [(device, peer.get(field)) for device, peer in peers]))
+        return details
+
+    def _diff_keyval_zone(self, present: typing.List[typing.Tuple[str, typing.Dict[str, str]]]) -> typing.List[str]:
+        details = []
+        for key in sorted(set([key for _, zone in present for key in zone])):
+            details.extend(self._diff_values(f"key '{key}'", [(device, zone.get(key)) for device, zone in present]))
+        return details
+
+
+def main() -> None:
+    (user, pswd) = ('*' * 8, '*' * 8)
+
+    cli = CliArgs()
+
+    api_base_url = f'http://{{ip_address}}:{cli.args.port}/api/6'
+    base_urls = dict([(ip, api_base_url.format(ip_address=ip)) for ip in cli.args.ip_addrs])
+
+    checker = NginxConsistencyChecker(username=user, password=pswd, base_urls=base_urls, fields=cli.args.fields)
+    configs = checker.fetch_all()
+    errors = [config for config in configs if config.error is not None]
+    for config in errors:
+        print(f"***ERROR*** Unable to query {config.device}: {config.error}")
+
+    divergences = checker.compare(configs)
+    compared = [config.device for config in configs if config.error is None]
+
+    if cli.args.json:
+        print(json.dumps({'devices': compared, 'divergences': [divergence._asdict() for divergence in divergences]},
+                         indent=2))
+    else:
+        for divergence in divergences:
+            print(f"{divergence.kind.upper()} '{divergence.name}':")
+            for detail in divergence.details:
+                print(f"\t- {detail}")
+        checked = sum([len(config.upstreams) + len(config.keyvals) for config in configs if config.error is None])
+        print(f"Compared {', '.join(compared)}: {len(divergences)} divergent entries "
+              f"({checked} upstreams/zones checked).")
+
+    if errors:
+        exit(2)
+    if divergences:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+import threading
+import time
+import typing
+
+
+class NginxDeviceUnavailable(Exception):
+    """
+    The request was not sent (or failed) because the Nginx device is unavailable/overloaded.
+    """
+
+
+class CircuitOpenError(NginxDeviceUnavailable):
+    """
+    The device's circuit breaker is open: the request failed fast, without being sent.
+    """
+
+
+class RequestShed(NginxDeviceUnavailable):
+    """
+    The device's request queue is full: the request was shed, without being sent.
+    """
+
+
+class AdaptiveLimiter:
+    """
+    AIMD (additive increase, multiplicative decrease) concurrency limit for a single device:
+        - Each successful request completing within the latency threshold increases the limit by 1/limit
+          (i.e. - by one for each full window of successful requests).
+        - A failed request, or a request slower than the latency threshold, halves the limit.
+    Requests over the limit wait (queued) for a slot; if max_queue requests are already waiting, the request is shed.
+
+    """
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 16,
+                 latency_threshold: float = 1.0, max_queue: int = 32, queue_timeout: float = 30.0) -> None:
+        """
+        Adaptive Limiter Constructor
+
+        :param initial_limit: Initial number of concurrent requests
+        :param min_limit: Minimum number of concurrent requests
+        :param max_limit: Maximum number of concurrent requests
+        :param latency_threshold: Latency (seconds) above which a successful request is treated as congestion
+        :param max_queue: Maximum number of requests waiting for a slot (additional requests are shed)
+        :param queue_timeout: Maximum number of seconds a request waits for a slot (then it is shed)
+
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+
+        # Metrics
+        self.requests = 0
+        self.failures = 0
+        self.queued = 0
+        self.shed = 0
+        self.max_queue_depth = 0
+        self.total_latency = 0.0
+
+    def acquire(self) -> None:
+        """
+        Wait for a request slot.
+
+        :return: None (RequestShed is raised if the queue is full, or the wait timed out)
+
+        """
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+
+            if self.waiting >= self.max_queue:
+                self.shed += 1
+                raise RequestShed(f"Request queue is full ({self.waiting} requests waiting).")
+
+            self.waiting += 1
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.waiting)
+            try:
+                if not self._condition.wait_for(lambda: self.in_flight < int(self.limit),
+                                                timeout=self.queue_timeout):
+                    self.shed += 1
+                    raise RequestShed(f"No request slot available within {self.queue_timeout} seconds.")
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    def release(self, latency: float, succeeded: bool) -> None:
+        """
+        Release a request slot, and adjust the limit based on the request's outcome.
+
+        :param latency: Request latency (seconds)
+        :param succeeded: True = the device responded successfully
+
+        :return: None
+
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self.requests += 1
+            self.total_latency += latency
+            if not succeeded:
+                self.failures += 1
+
+            if succeeded and latency <= self.latency_threshold:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            else:
+                self.limit = max(float(self.min_limit), self.limit / 2.0)
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for a single device:
+        CLOSED     --> Requests are sent; failure_threshold consecutive failures open the circuit.
+        OPEN       --> Requests fail fast (CircuitOpenError) for reset_timeout seconds.
+        HALF_OPEN  --> A single probe request is sent: success closes the circuit, failure re-opens it.
+
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0) -> None:
+        """
+        Circuit Breaker Constructor
+
+        :param failure_threshold: Number of consecutive failures that open the circuit
+        :param reset_timeout: Number of seconds the circuit stays open before a probe request is allowed
+
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+        # Metrics
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> None:
+        """
+        Determine if a request may be sent.
+
+        :return: None (CircuitOpenError is raised if the circuit is open, or a probe is already in progress)
+
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+
+            self.rejected += 1
+            retry = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            raise CircuitOpenError(f"Circuit is {self.state} after {self.consecutive_failures} consecutive "
+                                   f"failures (next probe in {retry:.0f} seconds).")
+
+    def cancel(self) -> None:
+        """
+        The allowed request was not sent (e.g. - shed); if it was the half-open probe, allow another probe.
+
+        :return: None
+
+        """
+        with self._lock:
+            self._probing = False
+
+    def record(self, succeeded: bool) -> None:
+        """
+        Record the outcome of a request that was sent.
+
+        :param succeeded: True = the device responded successfully
+
+        :return: None
+
+        """
+        with self._lock:
+            self._probing = False
+            if succeeded:
+                self.state = self.CLOSED
+                self.consecutive_failures = 0
+                return
+
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class DeviceFlowControl:
+    """
+    Adaptive concurrency limit + circuit breaker for a single Nginx device (API base URL). Instances are shared by
+    all clients of the same device (see for_device), so every request to a device is accounted for.
+
+    """
+
+    _devices = dict()
+    _lock = threading.Lock()
+
+    def __init__(self, device: str, limiter: typing.Optional[AdaptiveLimiter] = None,
+                 breaker: typing.Optional[CircuitBreaker] = None) -> None:
+        """
+        Device Flow Control Constructor
+
+        :param device: Name of the device (API base URL)
+        :param limiter: (Optional) AdaptiveLimiter. DEFAULT: AdaptiveLimiter()
+        :param breaker: (Optional) CircuitBreaker. DEFAULT: CircuitBreaker()
+
+        """
+        self.device = device
+        self.limiter = limiter or AdaptiveLimiter()
+        self.breaker = breaker or CircuitBreaker()
+
+    @classmethod
+    def for_device(cls, device: str) -> 'DeviceFlowControl':
+        """
+        Get (or create) the shared flow control for a device.
+
+        :param device: Name of the device (API base URL)
+
+        :return: DeviceFlowControl
+
+        """
+        with cls._lock:
+            if device not in cls._devices:
+                cls._devices[device] = cls(device=device)
+            return cls._devices[device]
+
+    @classmethod
+    def get_all_metrics(cls) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        :return: Dictionary of device --> flow control metrics (see get_metrics), for every device used.
+        """
+        with cls._lock:
+            devices = list(cls._devices.values())
+        return dict([(flow.device, flow.get_metrics()) for flow in devices])
+
+    def call(self, func: typing.Callable[[], typing.Any],
+             is_failure: typing.Callable[[typing.Any], bool] = lambda result: False) -> typing.Any:
+        """
+        Execute a request under the device's circuit breaker and concurrency limit.
+
+        :param func: Callable() --> result (e.g. - the HTTP response)
+        :param is_failure: Callable(result) --> True if the result indicates the device is unhealthy (e.g. - 5xx)
+
+        :return: Result of func (CircuitOpenError/RequestShed are raised if the request was not sent;
+                 exceptions raised by func are re-raised after being recorded as failures)
+
+        """
+        self.breaker.allow()
+        try:
+            self.limiter.acquire()
+        except RequestShed:
+            self.breaker.cancel()
+            raise
+
+        start = time.monotonic()
+        succeeded = False
+        try:
+            result = func()
+            succeeded = not is_failure(result)
+            return result
+        finally:
+            self.limiter.release(latency=time.monotonic() - start, succeeded=succeeded)
+            self.breaker.record(succeeded=succeeded)
+
+    def get_metrics(self) -> typing.Dict[str, typing.Any]:
+        """
+        :return: Dictionary of the device's flow control metrics
+        """
+        limiter, breaker = self.limiter, self.breaker
+        return {
+            'requests': limiter.requests,
+            'failures': limiter.failures,
+            'queued': limiter.queued,
+            'shed': limiter.shed,
+            'max_queue_depth': limiter.max_queue_depth,
+            'concurrency_limit': int(limiter.limit),
+            'average_latency': limiter.total_latency / limiter.requests if limiter.requests else 0.0,
+            'circuit_state': breaker.state,
+            'circuit_trips': breaker.trips,
+            'circuit_rejected': breaker.rejected,
+        }
@@ -1,10 +1,27 @@
 #!/usr/bin/env python3
 import argparse
-import pprint
-import sys
+import datetime
+import time
+import typing
 
-sys.path.append('.')
-from nginx_apis import NginxServerInfo
+try:
+    from ..profiling import RunProfiler, add_profile_arguments, get_profile_file
+except ImportError:
+    from md_cicd_utils.profiling import RunProfiler, add_profile_arguments, get_profile_file
+
+try:
+    from .nginx_apis import NginxServerInfo
+    from .nginx_flow_control import DeviceFlowControl, NginxDeviceUnavailable
+    from .nginx_topology_cache import NginxTopologyCache
+except ImportError:
+    from nginx_apis import NginxServerInfo
+    from nginx_flow_control import DeviceFlowControl, NginxDeviceUnavailable
+    from nginx_topology_cache import NginxTopologyCache
+
+
+DEFAULT_IPS = ['10.9.20.10']
+DEFAULT_PORT = 8989
+DEFAULT_FIELDS = [NginxServerInfo.SERVER, NginxServerInfo.DOWN]
 
 
 class CliArgs:
@@ -22,6 +39,22 @@ class CliArgs:
                                       "If multiple services are specified, this argument is ignored.")
         self.parser.add_argument("-f", "--fields", default=None, type=str, nargs='+',
                                  help="Fields to set (name:value).")
+        self.parser.add_argument("-w", "--watch", default=None, type=float, metavar="INTERVAL",
+                                 help="Poll the upstream state of all devices every INTERVAL seconds, and only "
+                                      "report state transitions (e.g. - server went down, weight changed). "
+                                      "Use Ctrl-C to stop.")
+        self.parser.add_argument("-c", "--cache_file", default=NginxTopologyCache.DEFAULT_CACHE_FILE, type=str,
+                                 help=f"Name of the local Nginx topology cache file. "
+                                      f"DEFAULT: {NginxTopologyCache.DEFAULT_CACHE_FILE}")
+        self.parser.add_argument("-t", "--cache_ttl", default=NginxTopologyCache.DEFAULT_TTL, type=float,
+                                 help=f"Number of seconds before the cached topology is refreshed (in the background). "
+                                      f"DEFAULT: {NginxTopologyCache.DEFAULT_TTL}")
+        self.parser.add_argument("-n", "--no_cache", action='store_true',
+                                 help="Do not use the local topology cache; query each device for its services.")
+        self.parser.add_argument("-m", "--metrics", action='store_true',
+                                 help="Report the per-device request metrics (requests, failures, queued/shed requests, "
+                                      "concurrency limit, latency, circuit breaker state) when done.")
+        add_profile_arguments(self.parser)
         self.args = self.parser.parse_args()
         self._check_conditions()
 
@@ -44,50 +77,181 @@ class CliArgs:
                       f"Ignoring unrecognized option(s).")
                 self.args.fields = [arg for arg in self.args.fields if arg.split(':')[0] not in diff]
 
+        if self.args.watch is not None:
+            if self.args.watch <= 0:
+                self.parser.error(f"--watch interval must be a positive number of seconds: '{self.args.watch}'")
+            if self.args.fields is not None:
+                print(f"\n***NOTE***: Watch mode is read-only, ignoring the specified fields: {self.args.fields}\n")
 
-if __name__ == '__main__':
-    DEFAULT_IPS = ['10.9.20.10']
-    DEFAULT_PORT = 8989
-    DEFAULT_FIELDS = [NginxServerInfo.SERVER, NginxServerInfo.DOWN]
 
+def watch_upstreams(devices: typing.Dict[str, NginxServerInfo], interval: float,
+                    services: typing.Optional[typing.List[str]] = None) -> None:
+    """
+    Poll the upstream state of each device, and only report the peer transitions between polls.
+
+    :param devices: Dictionary of device IP --> instantiated NginxServerInfo client
+    :param interval: Number of seconds between polls
+    :param services: (Optional) List of services to watch. If not specified, all services are watched.
+
+    :return: None
+
+    """
+    snapshots = dict()
+    try:
+        while True:
+            start = time.monotonic()
+            timestamp = datetime.datetime.now().strftime("%m/%d/%YT%H:%M:%S")
+
+            for ip, nginx in devices.items():
+                try:
+                    current = nginx.get_peer_snapshot(services=services)
+                except NginxDeviceUnavailable as exc:
+                    print(f"[{timestamp}] {ip}: ***ERROR*** {exc}")
+                    continue
+
+                # Query failed (error already reported): skip the diff and keep the last known state (if any) until
+                # the device responds, so the first successful poll is not reported as every peer being ADDED.
+                # An empty snapshot is diffed: the watched services (or all of their peers) were removed.
+                if current is None:
+                    continue
+
+                if ip not in snapshots:
+                    print(f"[{timestamp}] {ip}: Watching {len(current)} servers across "
+                          f"{len(set(service for service, _ in current))} services.")
+                else:
+                    for change in NginxServerInfo.diff_peer_snapshots(snapshots[ip], current):
+                        print(f"[{timestamp}] {ip}: {change}")
+                snapshots[ip] = current
+
+            time.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+
+def update_device(nginx_apis: NginxServerInfo, ip: str, cache: typing.Optional[NginxTopologyCache],
+                  services: typing.Optional[typing.List[str]], index: typing.Optional[int],
+                  target_fields: typing.Optional[typing.List[str]], attribute_dict: typing.Optional[dict]) -> None:
+    """
+    Report the server statuses of a single device, and apply the requested changes (if any).
+
+    :param nginx_apis: Instantiated NginxServerInfo client for the device
+    :param ip: IP Address of the device
+    :param cache: (Optional) NginxTopologyCache (read-only reports); if not specified, or attribute_dict is specified,
+                  the device is queried for its services.
+    :param services: (Optional) List of services. If not specified, all services are used.
+    :param index: (Optional) Server index
+    :param target_fields: (Optional) List of server fields to report
+    :param attribute_dict: (Optional) Dictionary of attributes to set (field1: value1, field2: value2)
+
+    :return: None (NginxDeviceUnavailable is raised if the device cannot be queried)
+
+    """
+    # Deferred: pprint is only needed to report the server statuses (not for --help).
+    import pprint
+
+    # Determine (and validate) the services using the cached topology, if available. The cached topology can be out of
+    # date, so it is only used for read-only reports: changes are applied to the servers the device reports now.
+    if cache is not None and not attribute_dict:
+        topology = cache.get_topology(nginx_apis)
+        errors = cache.validate(topology=topology, services=services, server_index=index)
+        if errors:
+            print(f"***ERROR***: {ip}:")
+            for error in errors:
+                print(f"\t{error}")
+            print(f"\tSkipping {ip}. (If the topology has changed, rerun with --no_cache.)\n")
+            return
+        device_services = services or list(topology.keys())
+    else:
+        device_services = services or nginx_apis.get_list_of_services()
+
+    # Report server status prior to change
+    server_status = nginx_apis.get_server_status_info(
+        service=device_services, server_index=index, fields=target_fields)
+    print(f"SERVER STATUSES:\n{pprint.pformat(server_status)}\n")
+
+    # Make requested changes
+    if attribute_dict:
+        if index is not None and len(device_services) == 1 and not server_status.get(device_services[0]):
+            print(f"***ERROR***: {ip}:\n\tServer index ({index}) is out of range for '{device_services[0]}'.\n"
+                  f"\tSkipping {ip}.\n")
+            return
+
+        for service in device_services:
+            nginx_apis.set_server_attributes(
+                service=service, server_id=index, attribute_dict=attribute_dict,
+                server_ids=list(server_status.get(service, {}).keys()) if index is None else None)
+            print()
+
+    # Report server status after change
+    server_status = nginx_apis.get_server_status_info(
+        service=device_services, server_index=index, fields=target_fields)
+    print(f"\nSERVER STATUSES:\n{pprint.pformat(server_status)}")
+
+
+def report_metrics() -> None:
+    """
+    Print the request metrics of every device queried (see DeviceFlowControl.get_metrics).
+
+    :return: None
+
+    """
+    print("\nREQUEST METRICS:")
+    for device, metrics in DeviceFlowControl.get_all_metrics().items():
+        print(f"\t{device}: " + ", ".join([f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}"
+                                          for name, value in metrics.items()]))
+
+
+def main() -> None:
     (user, pswd) = ('********', '*********')
 
     # Parse CLI args
     cli = CliArgs()
-    api_base_url = f'http://{{ip_address}}:{cli.args.port}/api/6'
-    nginx_ips = cli.args.ip_addrs if cli.args.ip_addrs is not None else DEFAULT_IPS
-    services = cli.args.services
-    index = cli.args.server_index
-
-    attribute_dict = None
-    target_fields = None
-    if cli.args.fields is not None:
-        attribute_dict = dict([(x.split(":")[0], x.split(":")[1]) for x in cli.args.fields])
-        target_fields = list(attribute_dict.keys())
-
-    # For each Nginx API IP that needs to be queried...
-    for ip in nginx_ips:
-
-        # Instantiate API interaction class (store credentials, base_url, etc.)
-        nginx_apis = NginxServerInfo(
-            username=user, password=pswd, base_url=api_base_url.format(ip_address=ip))
-
-        if services is None:
-            services = nginx_apis.get_list_of_services()
-
-        # Report server status prior to change
-        server_status = nginx_apis.get_server_status_info(
-            service=services, server_index=index, fields=target_fields)
-        print(f"SERVER STATUSES:\n{pprint.pformat(server_status)}\n")
-
-        # Make requested changes
-        if attribute_dict:
-            for service in services:
-                nginx_apis.set_server_attributes(
-                    service=service, server_id=index, attribute_dict=attribute_dict)
-                print()
-
-        # Report server status after change
-        server_status = nginx_apis.get_server_status_info(
-            service=services, server_index=index, fields=target_fields)
-        print(f"\nSERVER STATUSES:\n{pprint.pformat(server_status)}")
+
+    with RunProfiler(profile_file=get_profile_file('nginx_services.log'), enabled=cli.args.profile,
+                     top=cli.args.profile_top):
+        api_base_url = f'http://{{ip_address}}:{cli.args.port}/api/6'
+        nginx_ips = cli.args.ip_addrs if cli.args.ip_addrs is not None else DEFAULT_IPS
+        services = cli.args.services
+        index = cli.args.server_index
+
+        attribute_dict = None
+        target_fields = None
+        if cli.args.fields is not None:
+            attribute_dict = dict([(x.split(":")[0], x.split(":")[1]) for x in cli.args.fields])
+            target_fields = list(attribute_dict.keys())
+
+        if cli.args.watch is not None:
+            watch_upstreams(
+                devices=dict([(ip, NginxServerInfo(username=user, password=pswd,
+                                                   base_url=api_base_url.format(ip_address=ip))) for ip in nginx_ips]),
+                interval=cli.args.watch, services=services)
+            if cli.args.metrics:
+                report_metrics()
+            return
+
+        cache = None if cli.args.no_cache else NginxTopologyCache(filespec=cli.args.cache_file, ttl=cli.args.cache_ttl)
+
+        # For each Nginx API IP that needs to be queried...
+        for ip in nginx_ips:
+
+            # Instantiate API interaction class (store credentials, base_url, etc.)
+            nginx_apis = NginxServerInfo(
+                username=user, password=pswd, base_url=api_base_url.format(ip_address=ip))
+
+            try:
+                update_device(nginx_apis=nginx_apis, ip=ip, cache=cache, services=services, index=index,
+                              target_fields=target_fields, attribute_dict=attribute_dict)
+            except NginxDeviceUnavailable as exc:
+                print(f"***ERROR***: {ip}: {exc}\n\tSkipping {ip}.\n")
+
+        # Let any background topology refreshes finish writing the cache.
+        if cache is not None:
+            cache.wait()
+
+        if cli.args.metrics:
+            report_metrics()
+
+
+if __name__ == '__main__':
+    main()
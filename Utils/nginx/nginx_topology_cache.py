@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+import typing
+
+try:
+    from .nginx_apis import NginxServerInfo
+    from .nginx_flow_control import NginxDeviceUnavailable
+except ImportError:
+    from nginx_apis import NginxServerInfo
+    from nginx_flow_control import NginxDeviceUnavailable
+
+
+class NginxTopologyCache:
+    """
+    Persistent, on-disk cache of the Nginx upstream topology (services --> peer ids + server addresses),
+    stored per device (keyed by the device's API base URL).
+
+    Topology changes rarely, so cached entries are used immediately; entries older than the TTL are
+    refreshed in a background thread, and entries that do not exist yet are fetched synchronously.
+
+    """
+
+    DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.nginx_topology_cache.json')
+    DEFAULT_TTL = 3600
+
+    # Cache file keywords
+    TIMESTAMP = 'timestamp'
+    SERVICES = 'services'
+
+    def __init__(self, filespec: typing.Optional[str] = None, ttl: typing.Optional[float] = None) -> None:
+        """
+        Topology Cache Constructor
+
+        :param filespec: Filespec (path and name) of the cache file. DEFAULT: DEFAULT_CACHE_FILE
+        :param ttl: Number of seconds a cached topology is considered current. DEFAULT: DEFAULT_TTL
+
+        """
+        self.file = filespec or self.DEFAULT_CACHE_FILE
+        self.ttl = self.DEFAULT_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._refreshes = []
+        self.cache = self.read_file()
+
+    def read_file(self) -> typing.Dict[str, dict]:
+        """
+        Read the cache file.
+
+        :return: Dictionary of cached topologies: [base_url][timestamp|services]
+                 (empty if the file does not exist or could not be parsed)
+
+        """
+        if not os.path.exists(self.file):
+            return dict()
+
+        try:
+            with open(self.file, "r") as CACHE:
+                return json.load(CACHE)
+        except (OSError, ValueError) as exc:
+            print(f"\tWARNING: Unable to read topology cache ({self.file}): {exc}. Ignoring the cache.")
+            return dict()
+
+    def write_file(self) -> None:
+        """
+        Write the cache file (written to a temporary file and then moved, so readers never see a partial file).
+
+        :return: None
+
+        """
+        with self._lock:
+            tmp_file = f"{self.file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w") as CACHE:
+                json.dump(self.cache, CACHE, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.file)
+
+    def get_topology(self, nginx: NginxServerInfo) -> typing.Dict[str, typing.List[list]]:
+        """
+        Get the topology for the device. Cached topologies are returned immediately (and refreshed in the
+        background if older than the TTL); uncached topologies are retrieved from the device.
+
+        :param nginx: Instantiated NginxServerInfo client for the device
+
+        :return: Dictionary of services: [service][[server_id, server], [server_id, server], ...]
+
+        """
+        entry = self.cache.get(nginx.base_url)
+        if entry is None:
+            return self.refresh(nginx)
+
+        if time.time() - entry[self.TIMESTAMP] > self.ttl:
+            thread = threading.Thread(target=self.refresh, args=(nginx,), daemon=True)
+            thread.start()
+            self._refreshes.append(thread)
+
+        return entry[self.SERVICES]
+
+    def refresh(self, nginx: NginxServerInfo) -> typing.Dict[str, typing.List[list]]:
+        """
+        Retrieve the topology from the device, and store it in the cache.
+
+        :param nginx: Instantiated NginxServerInfo client for the device
+
+        :return: Dictionary of services: [service][[server_id, server], [server_id, server], ...]
+
+        """
+        try:
+            upstreams = nginx.get_upstream_info()
+        except NginxDeviceUnavailable:
+            # Device unavailable: keep serving the known topology (if any).
+            if nginx.base_url not in self.cache:
+                raise
+            upstreams = {}
+
+        services = dict([(service, [[peer[nginx.ID], peer[nginx.SERVER]] for peer in upstream.get(nginx.PEERS, [])])
+                         for service, upstream in upstreams.items()])
+
+        # An empty topology is a failed query (the API returns {} on errors): never cache it, so the next run
+        # retries, and do not replace a known topology with it.
+        if not services:
+            known = nginx.base_url in self.cache
+            print(f"\tWARNING: Unable to retrieve the upstream topology from {nginx.base_url}. "
+                  f"{'Using the cached topology.' if known else 'The topology has not been cached.'}")
+            return self.cache[nginx.base_url][self.SERVICES] if known else services
+
+        with self._lock:
+            self.cache[nginx.base_url] = {self.TIMESTAMP: time.time(), self.SERVICES: services}
+        self.write_file()
+        return services
+
+    def wait(self) -> None:
+        """
+        Wait for any background refreshes to complete (so the refreshed topology is written before exiting).
+
+        :return: None
+
+        """
+        for thread in self._refreshes:
+            thread.join()
+        self._refreshes = []
+
+    @staticmethod
+    def validate(topology: typing.Dict[str, typing.List[list]], services: typing.Optional[typing.List[str]] = None,
+                 server_index: typing.Optional[int] = None) -> typing.List[str]:
+        """
+        Validate the requested services and server index against a (cached) topology.
+
+        :param topology: Dictionary of services (see get_topology)
+        :param services: (Optional) List of requested services
+        :param server_index: (Optional) Requested server index (only applicable to a single service)
+
+        :return: List of error descriptions; empty if the request is valid.
+
+        """
+        errors = []
+        services = services or list(topology.keys())
+
+        unknown = [service for service in services if service not in topology]
+        if unknown:
+            errors.append(f"Unrecognized service(s): {unknown}. Known services: {sorted(topology.keys())}")
+
+        if server_index is not None and len(services) == 1 and not unknown:
+            number_of_servers = len(topology[services[0]])
+            if not 0 <= server_index < number_of_servers:
+                errors.append(f"Server index ({server_index}) is out of range for '{services[0]}', "
+                              f"which has {number_of_servers} servers.")
+        return errors
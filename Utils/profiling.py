@@ -0,0 +1,119 @@
+import argparse
+import os
+import sys
+import time
+
+DEFAULT_TOP = 20
+PROFILE_EXTENSION = '.profile'
+STATS_EXTENSION = '.pstats'
+
+# Hot function reports: pstats sort key --> description
+SORT_KEYS = [('tottime', 'internal'), ('cumulative', 'cumulative')]
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the common profiling options to a CLI parser.
+
+    :param parser: argparse.ArgumentParser
+
+    :return: None
+
+    """
+    parser.add_argument("--profile", action='store_true',
+                        help=f"Profile the run (cProfile + tracemalloc peak memory): write the report "
+                             f"({PROFILE_EXTENSION}) and raw stats ({STATS_EXTENSION}) next to the log, and print "
+                             f"the hot functions (to stderr).")
+    parser.add_argument("--profile_top", default=DEFAULT_TOP, type=int,
+                        help=f"Number of hot functions to report when profiling. DEFAULT: {DEFAULT_TOP}")
+
+
+def get_profile_file(log_file: str) -> str:
+    """
+    Determine the name of the profile report, based on the name of the log file (e.g. - target.log -> target.profile).
+
+    :param log_file: Name of the log file (if the CLI does not log, the name it would use)
+
+    :return: Name of the profile report
+
+    """
+    return f"{os.path.splitext(log_file)[0]}{PROFILE_EXTENSION}"
+
+
+class RunProfiler:
+    """
+    Context manager that profiles the enclosed block (if enabled):
+        - cProfile stats: written (raw, for pstats/snakeviz) to <profile>.pstats
+        - tracemalloc peak memory
+        - Report (run info, peak memory, hot functions by internal and cumulative time): written to the profile file,
+          and the hot functions are printed to stderr (stdout is left untouched, since it is parsed by the callers).
+
+    """
+
+    def __init__(self, profile_file: str, enabled: bool = True, top: int = DEFAULT_TOP) -> None:
+        """
+        Run Profiler Constructor
+
+        :param profile_file: Name of the profile report (see get_profile_file)
+        :param enabled: True = profile the block; False = do nothing (no profiling overhead)
+        :param top: Number of hot functions to report
+
+        """
+        self.profile_file = profile_file
+        self.stats_file = f"{os.path.splitext(profile_file)[0]}{STATS_EXTENSION}"
+        self.enabled = enabled
+        self.top = top
+        self.profiler = None
+        self.start = None
+
+    def __enter__(self) -> 'RunProfiler':
+        if not self.enabled:
+            return self
+
+        # Deferred: the profilers are only needed when profiling is requested.
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start()
+        self.profiler = cProfile.Profile()
+        self.start = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        if not self.enabled:
+            return False
+
+        self.profiler.disable()
+        elapsed = time.perf_counter() - self.start
+
+        import io
+        import pstats
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.profiler.dump_stats(self.stats_file)
+
+        header = [f"Command: {' '.join(sys.argv)}",
+                  f"Result: {'FAILED (' + exc_type.__name__ + ')' if exc_type is not None else 'completed'}",
+                  f"Wall time: {elapsed:.3f} seconds",
+                  f"Peak memory (tracemalloc): {peak / 1024 / 1024:.2f} MiB (at exit: {current / 1024 / 1024:.2f} MiB)",
+                  f"Raw stats: {self.stats_file}"]
+
+        reports = []
+        for sort_key, description in SORT_KEYS:
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).strip_dirs().sort_stats(sort_key).print_stats(self.top)
+            reports.append((description, stream.getvalue()))
+
+        with open(self.profile_file, "w") as PROFILE:
+            PROFILE.write("\n".join(header) + "\n")
+            for description, report in reports:
+                PROFILE.write(f"\n===== Top {self.top} functions by {description} time =====\n{report}")
+
+        print("\n".join(header), file=sys.stderr)
+        print(f"Hot functions (by {reports[0][0]} time):\n{reports[0][1]}", file=sys.stderr)
+        print(f"Profile written to: {self.profile_file}", file=sys.stderr)
+        return False
@@ -0,0 +1,225 @@
+import configparser
+import os
+import re
+import sys
+import typing
+
+try:
+    from .update_target_ini import TargetIniFile
+except ImportError:
+    from update_target_ini import TargetIniFile
+
+
+class SectionTemplate:
+    """
+    Section template (target_ini_section_template.yaml): option --> value, where values may contain the
+    __build__/__build_lower__ placeholders. A single template instance is shared by all sections.
+
+    """
+
+    __slots__ = ('options',)
+
+    def __init__(self, options: typing.Dict[str, typing.Any]) -> None:
+        """
+        Section Template Constructor
+
+        :param options: Dictionary of option --> value (with placeholders)
+
+        """
+        self.options = dict([(sys.intern(option.upper()), sys.intern(str(value))) for option, value in options.items()])
+
+    @classmethod
+    def from_yaml(cls, template_file: typing.Optional[str] = None) -> 'SectionTemplate':
+        """
+        Read the section template (see TargetIniFile.TARGET_TEMPLATE).
+
+        :param template_file: (Optional) Template file. DEFAULT: the template shipped with update_target_ini.py
+
+        :return: SectionTemplate
+
+        """
+        import yaml
+
+        template_file = template_file or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      TargetIniFile.TARGET_TEMPLATE)
+        with open(template_file, "r") as TEMPLATE:
+            return cls(yaml.load(TEMPLATE, Loader=yaml.SafeLoader)[TargetIniFile.ROOT])
+
+    @staticmethod
+    def render_value(value: str, build: str) -> str:
+        return value.replace(TargetIniFile.INSERT_BUILD_LOWER, build.lower()).replace(TargetIniFile.INSERT_BUILD, build)
+
+    def render(self, build: str) -> typing.Dict[str, str]:
+        return dict([(option, self.render_value(value, build)) for option, value in self.options.items()])
+
+
+class CompactSection:
+    """
+    Section stored as a reference to the (shared) template, the build substituted into the template, and the
+    options that differ from the rendered template (None = template option not defined in this section).
+    Option names and override values are interned, so repeated values (DB servers, IPs, UNC paths) are stored once.
+
+    """
+
+    __slots__ = ('name', 'build', 'template', 'overrides')
+
+    def __init__(self, name: str, options: typing.Dict[str, str], template: typing.Optional[SectionTemplate],
+                 build_option: str = 'LOS_INSTANCE_NAME') -> None:
+        """
+        Compact Section Constructor
+
+        :param name: Name of the section
+        :param options: Dictionary of (uppercase) option --> value
+        :param template: Shared template (None: all options are stored as overrides)
+        :param build_option: Option whose value is substituted for __build__ in the template
+
+        """
+        self.name = name
+        self.build = sys.intern(options[build_option]) if template is not None and build_option in options else None
+        self.template = template if self.build is not None else None
+
+        rendered = self.template.render(self.build) if self.template is not None else {}
+        overrides = dict([(sys.intern(option), sys.intern(value)) for option, value in options.items()
+                          if rendered.get(option) != value])
+        overrides.update(dict([(option, None) for option in rendered if option not in options]))
+        self.overrides = overrides
+
+    def get(self, option: str, fallback: typing.Optional[str] = None) -> typing.Optional[str]:
+        """
+        Get a single option value (without materializing the section).
+
+        :param option: Name of the option (case-insensitive)
+        :param fallback: Value to return if the option is not defined
+
+        :return: Value (or fallback)
+
+        """
+        option = option.upper()
+        if option in self.overrides:
+            value = self.overrides[option]
+        elif self.template is not None and option in self.template.options:
+            value = self.template.render_value(self.template.options[option], self.build)
+        else:
+            value = None
+        return fallback if value is None else value
+
+    def materialize(self) -> typing.Dict[str, str]:
+        """
+        Build the full section.
+
+        :return: Dictionary of uppercase option --> value (options sorted alphabetically)
+
+        """
+        options = self.template.render(self.build) if self.template is not None else {}
+        options.update(self.overrides)
+        return dict([(option, value) for option, value in sorted(options.items(), key=lambda t: t[0].lower())
+                     if value is not None])
+
+
+class CompactTargetIni:
+    """
+    Memory efficient, read-only view of a target INI file: every section is stored as a CompactSection
+    (template + overrides), and only materialized when accessed.
+
+    """
+
+    SECTION = re.compile(r'\[(?P<header>.+)\]')
+    OPTION = re.compile(r'(?P<option>.*?)\s*[=:]\s*(?P<value>.*)$')
+    COMMENT_PREFIXES = ('#', ';')
+
+    def __init__(self, filespec: str, template: typing.Optional[SectionTemplate] = None) -> None:
+        """
+        Compact Target INI Constructor
+
+        :param filespec: Filespec (path and name) of the target INI file
+        :param template: (Optional) Section template. DEFAULT: SectionTemplate.from_yaml()
+
+        """
+        self.file = filespec
+        self.template = template or SectionTemplate.from_yaml()
+        self.compact_sections = dict()
+        self.read_file()
+
+    def read_file(self) -> None:
+        """
+        Read the file one section at a time (the full file is never held as configparser dictionaries).
+        Follows the configparser defaults: '=' or ':' delimiters, full line '#'/';' comments, indented continuation
+        lines, and the last definition of a repeated section/option wins.
+
+        :return: None
+
+        """
+        section, options, option = None, None, None
+        with open(self.file, "r") as INI:
+            for line in INI:
+                stripped = line.strip()
+                if not stripped or stripped.startswith(self.COMMENT_PREFIXES):
+                    option = None if not stripped else option
+                    continue
+
+                if line[0].isspace() and option is not None:
+                    options[option] = f"{options[option]}\n{stripped}"
+                    continue
+
+                match = self.SECTION.match(stripped)
+                if match:
+                    self._add_section(section, options)
+                    section = match.group('header')
+                    options = dict(self.compact_sections.pop(section).materialize()) \
+                        if section in self.compact_sections else dict()
+                    option = None
+                    continue
+
+                match = self.OPTION.match(stripped)
+                if match is None or section is None:
+                    raise configparser.ParsingError(self.file)
+                option = match.group('option').upper()
+                options[option] = match.group('value').strip()
+
+        self._add_section(section, options)
+
+    def _add_section(self, section: typing.Optional[str], options: typing.Optional[dict]) -> None:
+        if section is None:
+            return
+        template = None if section == TargetIniFile.CORE else self.template
+        self.compact_sections[section] = CompactSection(name=section, options=options, template=template)
+
+    def sections(self) -> typing.List[str]:
+        return list(self.compact_sections.keys())
+
+    def get(self, section: str, option: str, fallback: typing.Optional[str] = None) -> typing.Optional[str]:
+        return self.compact_sections[section].get(option, fallback=fallback)
+
+    def __getitem__(self, section: str) -> typing.Dict[str, str]:
+        return self.compact_sections[section].materialize()
+
+    def __contains__(self, section: str) -> bool:
+        return section in self.compact_sections
+
+    def to_config(self) -> configparser.ConfigParser:
+        """
+        Materialize all sections as a ConfigParser (compatible with TargetIniFile.config).
+
+        :return: configParser
+
+        """
+        config = configparser.ConfigParser()
+        for section, compact in self.compact_sections.items():
+            config.add_section(section)
+            config._sections[section].update(
+                dict([(option.lower(), value) for option, value in compact.materialize().items()]))
+        return config
+
+    def get_statistics(self) -> typing.Dict[str, float]:
+        """
+        Describe how well the sections compress against the template.
+
+        :return: Dictionary: sections, templated sections, average overrides per templated section.
+
+        """
+        templated = [compact for compact in self.compact_sections.values() if compact.template is not None]
+        return {
+            'sections': len(self.compact_sections),
+            'templated_sections': len(templated),
+            'average_overrides': sum([len(compact.overrides) for compact in templated]) / max(len(templated), 1),
+        }
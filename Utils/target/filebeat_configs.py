@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import os
+import typing
+
+try:
+    from .log_scanner import LOG_FOLDER, map_path
+    from .update_target_ini import TargetIniFile
+except ImportError:
+    from log_scanner import LOG_FOLDER, map_path
+    from update_target_ini import TargetIniFile
+
+
+ANSIBLE_FILEBEAT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                    'Ansible', 'Ansible', 'filebeat')
+DEFAULT_TEMPLATE = os.path.join(ANSIBLE_FILEBEAT_DIR, 'templates', 'filebeat.cfg.j2')
+DEFAULT_VARS_FILE = os.path.join(ANSIBLE_FILEBEAT_DIR, 'vars', 'logstash_details.yml')
+DEFAULT_LOG_TYPE = 'LOS'
+DEFAULT_GLOB = '*'
+
+
+class CLIArgs:
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(
+            description="Render the Filebeat configuration (filebeat.cfg.j2) for the LOG_FOLDER of every environment "
+                        "in the target INI file, in a single pass.")
+        self.parser.add_argument("source_file", help="Name of target INI file to read.", type=str)
+        self.parser.add_argument("sections", nargs='*', default=[],
+                                 help="Environments (INI sections) to render. DEFAULT: all environments.")
+        self.parser.add_argument("-o", "--output_dir", default='.', type=str,
+                                 help="Directory to write the configurations. DEFAULT: '.'")
+        self.parser.add_argument("-c", "--consolidate", action='store_true',
+                                 help="Render one configuration per server (LOS_SERVER_NAME), with the log paths of "
+                                      "all of the server's environments, instead of one per environment.")
+        self.parser.add_argument("-t", "--template", default=DEFAULT_TEMPLATE, type=str,
+                                 help=f"Filebeat configuration template. DEFAULT: {DEFAULT_TEMPLATE}")
+        self.parser.add_argument("-v", "--vars_file", default=DEFAULT_VARS_FILE, type=str,
+                                 help=f"YAML file with the logstash details (logstash_server, "
+                                      f"logstash_port_<log type>). DEFAULT: {DEFAULT_VARS_FILE}")
+        self.parser.add_argument("-l", "--log_type", default=DEFAULT_LOG_TYPE, type=str,
+                                 help=f"Log type (fields.type, and the logstash port). DEFAULT: {DEFAULT_LOG_TYPE}")
+        self.parser.add_argument("-g", "--glob", default=DEFAULT_GLOB, type=str,
+                                 help=f"Log files (in each LOG_FOLDER) to ship. DEFAULT: '{DEFAULT_GLOB}'")
+        self.parser.add_argument("-m", "--map", default=[], type=str, nargs='+',
+                                 help="Map LOG_FOLDER prefixes to the paths seen by Filebeat: "
+                                      "'D:\\LogsAdvantage=/mnt/logs'")
+        self.parser.add_argument("-n", "--dry_run", action='store_true',
+                                 help="Report the files that would change, without writing them.")
+        self.parser.add_argument("-d", "--debug", help="Enable debug logging.", action='store_true')
+        self.args = self.parser.parse_args()
+
+
+class FilebeatConfigRenderer:
+    """
+    Renders the Filebeat configuration template for the environments of the target INI file. The template is
+    compiled once, and rendered for every environment (<section>.filebeat.yml) or, consolidated, for every server
+    (<server>.filebeat.yml: one input with the log paths of all of the server's environments).
+
+    """
+
+    SERVER_NAME = 'LOS_SERVER_NAME'
+    IP_ADDRESS = 'IP_ADDRESS'
+    OUTPUT_EXTENSION = '.filebeat.yml'
+
+    # Variables provided per rendered configuration (see render)
+    RENDER_VARIABLES = ['log_type', 'log_path', 'log_paths', 'inventory_hostname', 'hostvars']
+
+    def __init__(self, target: TargetIniFile, template_file: str, variables: typing.Dict[str, typing.Any],
+                 log_type: str = DEFAULT_LOG_TYPE, glob: str = DEFAULT_GLOB,
+                 path_map: typing.Optional[typing.List[str]] = None) -> None:
+        """
+        Filebeat Config Renderer Constructor
+
+        :param target: Parsed target INI file
+        :param template_file: Filebeat configuration (Jinja) template
+        :param variables: Template variables (logstash_server, logstash_port_<log type>, ...)
+        :param log_type: Log type (fields.type; selects the logstash_port_<log type> variable)
+        :param glob: Log files (in each LOG_FOLDER) to ship
+        :param path_map: (Optional) List of 'PREFIX=PATH' LOG_FOLDER mappings (see log_scanner.map_path)
+
+        """
+        # Deferred: jinja2 is only needed when rendering (not for --help or argument errors).
+        import jinja2
+        import jinja2.meta
+
+        self.target = target
+        self.log_type = log_type
+        self.glob = glob
+        self.path_map = path_map or []
+        self.log = logging.getLogger(self.__class__.__name__)
+
+        self.variables = dict(variables)
+        port_variable = f"logstash_port_{log_type.lower()}"
+        if port_variable in self.variables:
+            self.variables.setdefault('logstash_port', self.variables[port_variable])
+
+        # Same block handling as the Ansible template module (trim_blocks). The template is compiled once.
+        environment = jinja2.Environment(trim_blocks=True, keep_trailing_newline=True)
+        with open(template_file, "r") as TEMPLATE:
+            source = TEMPLATE.read()
+        self.template = environment.from_string(source)
+
+        # Undefined template variables would silently render as empty strings: check them once, up front.
+        missing = sorted(jinja2.meta.find_undeclared_variables(environment.parse(source)) - set(self.variables) -
+                         set(self.RENDER_VARIABLES))
+        if missing:
+            raise ValueError(f"Template variables not defined (see the vars file): {missing}")
+
+    def get_log_path(self, section: str) -> typing.Optional[str]:
+        """
+        Build the log path (glob) of an environment.
+
+        :param section: Name of section
+
+        :return: Log path: LOG_FOLDER (mapped) + glob; None if the section has no LOG_FOLDER
+
+        """
+        folder = self.target.config.get(section, LOG_FOLDER, fallback='')
+        if not folder:
+            return None
+        folder = map_path(folder, self.path_map)
+        separator = '\\' if '\\' in folder else '/'
+        return f"{folder.rstrip(separator)}{separator}{self.glob}"
+
+    def get_server(self, section: str) -> str:
+        """
+        :return: Short name of the environment's server (LOS_SERVER_NAME's first label, as ansible_hostname)
+        """
+        server = self.target.config.get(section, self.SERVER_NAME, fallback='') or section
+        return server.split('.')[0].lower()
+
+    def render(self, server: str, log_paths: typing.List[str], ip_addresses: typing.List[str]) -> str:
+        """
+        Render the template.
+
+        :param server: Short name of the server (the shipper name)
+        :param log_paths: List of log paths
+        :param ip_addresses: List of the server's IP addresses
+
+        :return: Rendered configuration
+
+        """
+        # The host facts referenced by the template (gathered by Ansible when run from the playbook)
+        facts = {'ansible_hostname': server, 'ansible_all_ipv4_addresses': ip_addresses}
+
+        context = dict(self.variables)
+        context.update({'log_type': self.log_type, 'log_path': log_paths[0], 'log_paths': log_paths,
+                        'inventory_hostname': server, 'hostvars': {server: facts}})
+        return self.template.render(**context)
+
+    def build(self, sections: typing.Optional[typing.List[str]] = None,
+              consolidate: bool = False) -> typing.Dict[str, str]:
+        """
+        Render the configurations in a single pass over the sections.
+
+        :param sections: (Optional) List of sections. DEFAULT: all target sections
+        :param consolidate: True = one configuration per server; False = one configuration per environment
+
+        :return: Dictionary of output file name --> configuration
+
+        """
+        # (_sort_version always lists the Core section first.)
+        sections = sections or [section for section in self.target.get_target_sections(sort=True)
+                                if section != TargetIniFile.CORE]
+
+        outputs = dict()
+        servers = dict()
+        for section in sections:
+            log_path = self.get_log_path(section)
+            if log_path is None:
+                self.log.warning(f"{section}: No {LOG_FOLDER} defined. Skipping.")
+                continue
+
+            server = self.get_server(section)
+            ip_address = self.target.config.get(section, self.IP_ADDRESS, fallback='')
+            ip_addresses = [ip_address] if ip_address else []
+            if consolidate:
+                log_paths, server_ips = servers.setdefault(server, ([], []))
+                log_paths.extend([log_path] if log_path not in log_paths else [])
+                server_ips.extend([ip for ip in ip_addresses if ip not in server_ips])
+            else:
+                outputs[f"{section}{self.OUTPUT_EXTENSION}"] = self.render(
+                    server=server, log_paths=[log_path], ip_addresses=ip_addresses)
+
+        for server, (log_paths, ip_addresses) in servers.items():
+            outputs[f"{server}{self.OUTPUT_EXTENSION}"] = self.render(
+                server=server, log_paths=log_paths, ip_addresses=ip_addresses)
+        return outputs
+
+    def write(self, outputs: typing.Dict[str, str], output_dir: str = '.', dry_run: bool = False) -> typing.List[str]:
+        """
+        Write the configurations that changed.
+
+        :param outputs: Dictionary of output file name --> configuration (see build)
+        :param output_dir: Directory to write the configurations
+        :param dry_run: True = only report the files that would change
+
+        :return: List of files written (or that would be written)
+
+        """
+        if not dry_run:
+            os.makedirs(output_dir, exist_ok=True)
+
+        written = []
+        for filename, content in outputs.items():
+            filespec = os.path.join(output_dir, filename)
+            if os.path.exists(filespec):
+                with open(filespec, "r") as CONFIG:
+                    if CONFIG.read() == content:
+                        self.log.debug(f"Unchanged: {filespec}")
+                        continue
+
+            if not dry_run:
+                tmp_file = f"{filespec}.tmp"
+                with open(tmp_file, "w") as CONFIG:
+                    CONFIG.write(content)
+                os.replace(tmp_file, filespec)
+                self.log.info(f"Wrote {os.path.abspath(filespec)}.")
+            written.append(filespec)
+        return written
+
+
+def main() -> None:
+    cli = CLIArgs()
+    logging.basicConfig(level=logging.DEBUG if cli.args.debug else logging.WARNING,
+                        format='[%(asctime)s.%(msecs)03d]:[%(levelname)-7s]:[%(name)s.%(funcName)s]: %(message)s',
+                        datefmt="%m/%d/%YT%H:%M:%S")
+
+    # Deferred: yaml is only needed to read the logstash details.
+    import yaml
+    with open(cli.args.vars_file, "r") as VARS:
+        variables = yaml.safe_load(VARS) or {}
+
+    target = TargetIniFile(filespec=cli.args.source_file)
+    unknown = [section for section in cli.args.sections if not target.config.has_section(section)]
+    if unknown:
+        cli.parser.error(f"Unknown environment(s): {unknown}")
+
+    try:
+        renderer = FilebeatConfigRenderer(target=target, template_file=cli.args.template, variables=variables,
+                                          log_type=cli.args.log_type, glob=cli.args.glob, path_map=cli.args.map)
+    except ValueError as exc:
+        cli.parser.error(str(exc))
+    outputs = renderer.build(sections=cli.args.sections, consolidate=cli.args.consolidate)
+    written = renderer.write(outputs=outputs, output_dir=cli.args.output_dir, dry_run=cli.args.dry_run)
+
+    verb = "Would write" if cli.args.dry_run else "Wrote"
+    for filespec in written:
+        print(f"{verb}: {filespec}")
+    print(f"{len(written)} of {len(outputs)} Filebeat configurations changed.")
+
+
+if __name__ == '__main__':
+    main()
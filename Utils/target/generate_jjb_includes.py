@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import os
+import typing
+
+try:
+    from .update_target_ini import TargetIniFile
+except ImportError:
+    from update_target_ini import TargetIniFile
+
+
+DEFAULT_DOMAIN = 'mortgagedirector.com'
+DEFAULT_ENVIRONMENT = 'qa'
+
+
+class CLIArgs:
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(
+            description="Generate the Jenkins Job Builder include files (*.yaml.inc) from the target INI file.")
+        self.parser.add_argument("source_file", help="Name of target INI file to read.", type=str)
+        self.parser.add_argument("-o", "--output_dir", default='.', type=str,
+                                 help="Directory to write the include files (e.g. - Jenkins/deploy). DEFAULT: '.'")
+        self.parser.add_argument("--domain", default=DEFAULT_DOMAIN, type=str,
+                                 help=f"Domain of the environment FQDNs. DEFAULT: {DEFAULT_DOMAIN}")
+        self.parser.add_argument("--default_env", default=DEFAULT_ENVIRONMENT, type=str,
+                                 help=f"Environment for sections without an environment tag (e.g. - 'ffbf'). "
+                                      f"DEFAULT: {DEFAULT_ENVIRONMENT}")
+        self.parser.add_argument("-n", "--dry_run", action='store_true',
+                                 help="Report the files that would change, without writing them.")
+        self.parser.add_argument("-d", "--debug", help="Enable debug logging.", action='store_true')
+        self.args = self.parser.parse_args()
+
+
+class JJBIncludeGenerator:
+    """
+    Builds the include files referenced by Jenkins/deploy/deploy_template.yml from a single pass over the target INI
+    sections (in TargetIniFile._sort_version order):
+        url_port_mapping.yaml.inc     --> FQDNs: named environments, separator, versions. The listed FQDNs are kept,
+                                          and the FQDNs of newer versions (with a PORT) are appended
+        environments.yaml.inc         --> Environments: the existing names (Staging, Maintenance, QA, Dev) are kept,
+                                          and environment tags not listed yet (case-insensitive) are appended
+        branches.yaml.inc             --> Branch roots (unsupported branches are written commented out)
+    (target_ini_location.yaml.inc is not generated: it holds the location of the INI file on the Jenkins server.)
+
+    """
+
+    URL_PORT_MAPPING = 'url_port_mapping.yaml.inc'
+    ENVIRONMENTS = 'environments.yaml.inc'
+    BRANCHES = 'branches.yaml.inc'
+
+    BRANCH_ROOTS = ['Feature', 'Maintenance', 'Personal', 'Staging']
+    SUPPORTED_BRANCHES = ['Maintenance']
+    BUILD_NAME = 'LOS_INSTANCE_NAME'
+
+    def __init__(self, target: TargetIniFile, domain: str = DEFAULT_DOMAIN,
+                 default_environment: str = DEFAULT_ENVIRONMENT) -> None:
+        """
+        JJB Include Generator Constructor
+
+        :param target: Parsed target INI file
+        :param domain: Domain of the environment FQDNs
+        :param default_environment: Environment for sections without an environment tag
+
+        """
+        self.target = target
+        self.domain = domain
+        self.default_environment = default_environment
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    def get_environment(self, section: str) -> typing.Tuple[str, str, typing.Optional[tuple]]:
+        """
+        Split the section name into its name and environment tag, using the same parser as the target INI queries
+        (TargetIniFile.get_section_environment: <env>_<version or name>):
+            <env>_<version> => (version, env), <env>_<name> => (name, env), <name> => (name, default environment)
+
+        :param section: Name of section
+
+        :return: Tuple: (name, environment (as tagged in the section name), version (None if not a version section))
+
+        """
+        environment = TargetIniFile.get_section_environment(section)
+        if not environment:
+            return section, self.default_environment, None
+        version, _ = self.target._get_section_version(section)
+        return section[len(environment) + 1:], section[:len(environment)], version
+
+    def build(self, existing_fqdns: typing.Optional[typing.List[str]] = None,
+              existing_environments: typing.Optional[typing.List[str]] = None) -> typing.Dict[str, str]:
+        """
+        Build the content of all include files in a single pass over the sections.
+
+        The target INI file keeps the sections of retired environments, so when the FQDNs are already listed (the
+        environments that are actually routed), the list is merged rather than rebuilt: the listed FQDNs are kept (in
+        their order), and only the FQDNs of versions newer than the newest version already listed are appended.
+        The FQDNs (and environments) of all sections with a PORT are only used when nothing is listed yet.
+
+        :param existing_fqdns: (Optional) FQDNs listed in the current url_port_mapping.yaml.inc (kept, in order)
+        :param existing_environments: (Optional) Environments listed in the current environments.yaml.inc
+                                      (kept, with their names and order)
+
+        :return: Dictionary of include file name --> content
+
+        """
+        # Listed FQDNs: named environments, separator ("===="), version environments
+        existing_fqdns = list(existing_fqdns or [])
+        split = ([index for index, fqdn in enumerate(existing_fqdns) if not fqdn.strip('=')] + [len(existing_fqdns)])[0]
+        listed_named = [fqdn for fqdn in existing_fqdns[:split] if fqdn.strip('=')]
+        listed_versions = [fqdn for fqdn in existing_fqdns[split:] if fqdn.strip('=')]
+        listed_fqdns = set(listed_named + listed_versions)
+        named_fqdns, version_fqdns = [], []
+        has_versions = False
+
+        # FQDN per section with a port defined (as with get_nginx_domains.py): (fqdn, environment, version)
+        candidates = []
+        for section in self.target._sort_version(self.target.config.sections())[1:]:
+            options = self.target.config[section]
+            name, environment, version = self.get_environment(section)
+            has_versions = has_versions or version is not None
+            if not options.get(TargetIniFile.PORT, ''):
+                continue
+            host = options.get(self.BUILD_NAME, name).lower()
+            candidates.append((f"{host}.{environment.lower()}.{self.domain}", environment, version))
+
+        if listed_fqdns:
+            newest_version = max([version for fqdn, _, version in candidates
+                                  if version is not None and fqdn in listed_fqdns], default=None)
+            candidates = [(fqdn, environment, version) for fqdn, environment, version in candidates
+                          if version is not None and newest_version is not None and version > newest_version]
+        environments = list(existing_environments or [])
+
+        for fqdn, environment, version in candidates:
+            if fqdn in listed_fqdns or fqdn in named_fqdns or fqdn in version_fqdns:
+                continue
+            (version_fqdns if version is not None else named_fqdns).append(fqdn)
+            if environment.lower() not in [known.lower() for known in environments]:
+                environments.append(environment)
+
+        named_fqdns = listed_named + named_fqdns
+        version_fqdns = listed_versions + version_fqdns
+        separator = "=" * max([len(fqdn) for fqdn in named_fqdns + version_fqdns], default=0)
+        branches = [branch if branch in self.SUPPORTED_BRANCHES and has_versions else f"# {branch}"
+                    for branch in self.BRANCH_ROOTS]
+
+        return {
+            self.URL_PORT_MAPPING: self._yaml_list(named_fqdns + [separator] + version_fqdns),
+            self.ENVIRONMENTS: self._yaml_list(environments),
+            self.BRANCHES: "".join([f"# - {branch[2:]}\n" if branch.startswith('#') else f"- {branch}\n"
+                                    for branch in branches]),
+        }
+
+    @staticmethod
+    def _yaml_list(items: typing.List[str]) -> str:
+        return "".join([f"- {item}\n" for item in items])
+
+    @staticmethod
+    def _read_yaml_list(filespec: str) -> typing.List[str]:
+        if not os.path.exists(filespec):
+            return []
+        with open(filespec, "r") as INC:
+            return [line.strip()[2:].strip() for line in INC if line.strip().startswith('- ')]
+
+    def write(self, output_dir: str, dry_run: bool = False) -> typing.List[str]:
+        """
+        Write the include files whose content changed (so JJB only updates the affected jobs).
+
+        :param output_dir: Directory to write the include files
+        :param dry_run: Do not write; only report the files that would change
+
+        :return: List of (changed) files written
+        """
+        written = []
+        existing_fqdns = self._read_yaml_list(os.path.join(output_dir, self.URL_PORT_MAPPING))
+        existing_environments = self._read_yaml_list(os.path.join(output_dir, self.ENVIRONMENTS))
+        for filename, content in self.build(existing_fqdns=existing_fqdns,
+                                            existing_environments=existing_environments).items():
+            filespec = os.path.join(output_dir, filename)
+            if os.path.exists(filespec):
+                with open(filespec, "r") as INC:
+                    if INC.read() == content:
+                        self.log.debug(f"Unchanged: {filespec}")
+                        continue
+
+            if not dry_run:
+                tmp_file = f"{filespec}.tmp"
+                with open(tmp_file, "w") as INC:
+                    INC.write(content)
+                os.replace(tmp_file, filespec)
+                self.log.info(f"Wrote {os.path.abspath(filespec)}.")
+            written.append(filespec)
+        return written
+
+
+def main() -> None:
+    cli = CLIArgs()
+    logging.basicConfig(level=logging.DEBUG if cli.args.debug else logging.WARNING,
+                        format='[%(asctime)s.%(msecs)03d]:[%(levelname)-7s]:[%(name)s.%(funcName)s]: %(message)s',
+                        datefmt="%m/%d/%YT%H:%M:%S")
+
+    target = TargetIniFile(filespec=cli.args.source_file)
+    generator = JJBIncludeGenerator(target=target, domain=cli.args.domain, default_environment=cli.args.default_env)
+    written = generator.write(output_dir=cli.args.output_dir, dry_run=cli.args.dry_run)
+
+    verb = "Would write" if cli.args.dry_run else "Wrote"
+    for filespec in written:
+        print(f"{verb}: {filespec}")
+    if not written:
+        print(f"All include files in '{cli.args.output_dir}' are up to date.")
+
+
+if __name__ == '__main__':
+    main()
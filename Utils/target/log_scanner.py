@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import datetime
+import fnmatch
+import json
+import logging
+import mmap
+import os
+import re
+import time
+import typing
+
+try:
+    from .update_target_ini import TargetIniFile
+except ImportError:
+    from update_target_ini import TargetIniFile
+
+
+LOG_FOLDER = 'LOG_FOLDER'
+
+# Filebeat multiline grouping (Ansible/Ansible/filebeat/templates/filebeat.cfg.j2): lines matching '^\>\s+' are
+# joined to the next line that does not match (negate: false, match: before). Line endings are not part of the
+# line matched by Filebeat, so a line ending is not accepted as the whitespace.
+CONTINUATION = re.compile(rb'>[ \t\f\v]+')
+
+DEFAULT_TIME_PATTERN = r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}'
+DEFAULT_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+DEFAULT_GLOB = '*'
+
+
+class CLIArgs:
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(
+            description="Search the LOS environment logs (LOG_FOLDER of each target INI section) for multiline "
+                        "records, grouped as Filebeat does.")
+        self.parser.add_argument("source_file", help="Name of target INI file to read.", type=str)
+        self.parser.add_argument("sections", nargs='*', default=[],
+                                 help="Environments (INI sections) to search. DEFAULT: all environments.")
+        self.parser.add_argument("-r", "--regex", default=None, type=str,
+                                 help="Regular expression to search for (records containing a match are reported).")
+        self.parser.add_argument("--since", default=None, type=datetime.datetime.fromisoformat,
+                                 help="Only report records at/after this time: 'YYYY-MM-DD HH:MM:SS'")
+        self.parser.add_argument("--until", default=None, type=datetime.datetime.fromisoformat,
+                                 help="Only report records at/before this time: 'YYYY-MM-DD HH:MM:SS'")
+        self.parser.add_argument("--time_pattern", default=DEFAULT_TIME_PATTERN, type=str,
+                                 help=f"Regular expression matching a record's timestamp. "
+                                      f"DEFAULT: {DEFAULT_TIME_PATTERN}")
+        self.parser.add_argument("--time_format", default=DEFAULT_TIME_FORMAT, type=str,
+                                 help=f"strptime() format of the timestamp. "
+                                      f"DEFAULT: {DEFAULT_TIME_FORMAT.replace('%', '%%')}")
+        self.parser.add_argument("-g", "--glob", default=DEFAULT_GLOB, type=str,
+                                 help=f"Log files (in each LOG_FOLDER) to search. DEFAULT: '{DEFAULT_GLOB}'")
+        self.parser.add_argument("-m", "--map", default=[], type=str, nargs='+',
+                                 help="Map LOG_FOLDER prefixes to local paths: 'D:\\LogsAdvantage=/mnt/logs'")
+        self.parser.add_argument("-w", "--workers", default=os.cpu_count(), type=int,
+                                 help=f"Number of files scanned in parallel. DEFAULT: {os.cpu_count()}")
+        self.parser.add_argument("-t", "--tail", default=None, type=str,
+                                 help="Offsets file: only scan what was appended since the previous (tail) run, "
+                                      "and save the new offsets.")
+        self.parser.add_argument("-f", "--follow", default=None, type=float,
+                                 help="Keep scanning for appended records every FOLLOW seconds (Ctrl-C to stop).")
+        self.parser.add_argument("--encoding", default='utf-8', type=str, help="Log file encoding. DEFAULT: utf-8")
+        self.parser.add_argument("-j", "--json", action='store_true', help="Report records as JSON (one per line).")
+        self.parser.add_argument("-d", "--debug", help="Enable debug logging.", action='store_true')
+        self.args = self.parser.parse_args()
+
+
+class ScanOptions(typing.NamedTuple):
+    regex: typing.Optional[str] = None
+    since: typing.Optional[datetime.datetime] = None
+    until: typing.Optional[datetime.datetime] = None
+    time_pattern: str = DEFAULT_TIME_PATTERN
+    time_format: str = DEFAULT_TIME_FORMAT
+    encoding: str = 'utf-8'
+
+    @property
+    def time_filtered(self) -> bool:
+        return self.since is not None or self.until is not None
+
+
+class LogRecord(typing.NamedTuple):
+    file: str
+    offset: int
+    timestamp: typing.Optional[str]
+    text: str
+
+
+def _line_start(data: typing.Any, pos: int, floor: int) -> int:
+    index = data.rfind(b'\n', floor, pos)
+    return floor if index < 0 else index + 1
+
+
+def get_record_bounds(data: typing.Any, pos: int, floor: int, end: int) -> typing.Optional[typing.Tuple[int, int]]:
+    """
+    Find the multiline record containing a position: the preceding continuation lines, through the first
+    non-continuation line.
+
+    :param data: Log contents (mmap or bytes)
+    :param pos: Position within the record
+    :param floor: Start of the region being scanned (records do not extend before it)
+    :param end: End of the complete records (see get_complete_end)
+
+    :return: Tuple: (start, end) of the record, or None if the record is incomplete
+
+    """
+    line = _line_start(data, pos, floor)
+    start = line
+    while start > floor:
+        previous = _line_start(data, start - 1, floor)
+        if not CONTINUATION.match(data, previous):
+            break
+        start = previous
+
+    while True:
+        line_end = data.find(b'\n', line, end)
+        if line_end < 0:
+            return None
+        if not CONTINUATION.match(data, line):
+            return start, line_end + 1
+        line = line_end + 1
+
+
+def get_complete_end(data: typing.Any, floor: int, size: int) -> int:
+    """
+    Determine the end of the last complete record: a trailing partial line, or trailing continuation lines without
+    their final line, are still being written.
+
+    :param data: Log contents (mmap or bytes)
+    :param floor: Start of the region being scanned
+    :param size: Size of the data
+
+    :return: Offset just after the last complete record
+
+    """
+    end = data.rfind(b'\n', floor, size) + 1
+    if end <= floor:
+        return floor
+    while end > floor:
+        line = _line_start(data, end - 1, floor)
+        if not CONTINUATION.match(data, line):
+            break
+        end = line
+    return end
+
+
+def scan_file(filespec: str, options: ScanOptions, start_offset: int = 0) -> typing.Tuple[typing.List[LogRecord], int]:
+    """
+    Search a log file (memory-mapped) for the records matching the options. When a regular expression or time
+    range is specified, the file is searched with the (compiled) expression, and only the records around the
+    matches are decoded.
+
+    :param filespec: Name of the log file
+    :param options: ScanOptions
+    :param start_offset: Offset to start scanning from (end of the previous tail scan)
+
+    :return: Tuple: (list of matching LogRecords, offset just after the last complete record)
+
+    """
+    time_regex = re.compile(options.time_pattern.encode(options.encoding))
+    search = re.compile(options.regex.encode(options.encoding)) if options.regex is not None else \
+        time_regex if options.time_filtered else None
+
+    with open(filespec, "rb") as LOG:
+        size = os.fstat(LOG.fileno()).st_size
+        if size <= start_offset:
+            return [], start_offset
+
+        with mmap.mmap(LOG.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            end = get_complete_end(data, start_offset, size)
+            records, pos = [], start_offset
+            while pos < end:
+                if search is not None:
+                    match = search.search(data, pos, end)
+                    if match is None:
+                        break
+                    bounds = get_record_bounds(data, match.start(), pos, end)
+                else:
+                    bounds = get_record_bounds(data, pos, pos, end)
+                if bounds is None:
+                    break
+                record_start, pos = bounds
+
+                timestamp_match = time_regex.search(data, record_start, pos)
+                timestamp = None
+                if timestamp_match is not None:
+                    try:
+                        timestamp = datetime.datetime.strptime(timestamp_match.group().decode(options.encoding),
+                                                               options.time_format)
+                    except ValueError:
+                        timestamp = None
+
+                if options.time_filtered:
+                    if timestamp is None or (options.since is not None and timestamp < options.since) or \
+                            (options.until is not None and timestamp > options.until):
+                        continue
+
+                records.append(LogRecord(file=filespec, offset=record_start,
+                                         timestamp=timestamp.isoformat(sep=' ') if timestamp is not None else None,
+                                         text=data[record_start:pos].decode(options.encoding, errors='replace')
+                                         .rstrip('\r\n')))
+    return records, end
+
+
+class OffsetStore:
+    """
+    Saved scan offsets (JSON), per log file. An offset is discarded if the file was replaced (rotated) or truncated.
+
+    """
+
+    def __init__(self, filespec: typing.Optional[str] = None) -> None:
+        """
+        Offset Store Constructor
+
+        :param filespec: (Optional) Name of the offsets file (None: offsets are kept in memory only)
+
+        """
+        self.file = filespec
+        self.offsets = dict()
+        if filespec is not None and os.path.exists(filespec):
+            with open(filespec, "r") as OFFSETS:
+                self.offsets = json.load(OFFSETS)
+
+    def get_offset(self, log_file: str, stat: os.stat_result) -> int:
+        saved = self.offsets.get(os.path.abspath(log_file))
+        if saved is None or saved['id'] != [stat.st_dev, stat.st_ino] or stat.st_size < saved['offset']:
+            return 0
+        return saved['offset']
+
+    def set_offset(self, log_file: str, stat: os.stat_result, offset: int) -> None:
+        self.offsets[os.path.abspath(log_file)] = {'id': [stat.st_dev, stat.st_ino], 'offset': offset}
+
+    def save(self) -> None:
+        if self.file is None:
+            return
+        tmp_file = f"{self.file}.tmp"
+        with open(tmp_file, "w") as OFFSETS:
+            json.dump(self.offsets, OFFSETS, indent=1)
+        os.replace(tmp_file, self.file)
+
+
+def map_path(folder: str, path_map: typing.List[str]) -> str:
+    """
+    Translate a LOG_FOLDER (Windows path) to a local path: 'PREFIX=LOCAL_PATH' (prefixes are case-insensitive).
+
+    :param folder: LOG_FOLDER value
+    :param path_map: List of 'PREFIX=LOCAL_PATH' mappings
+
+    :return: Local path (unchanged if no prefix matched)
+
+    """
+    for mapping in path_map:
+        prefix, local_path = mapping.split('=', 1)
+        if folder.lower().startswith(prefix.lower()):
+            remainder = folder[len(prefix):].strip('\\/')
+            return os.path.join(local_path, *[part for part in re.split(r'[\\/]', remainder) if part])
+    return folder
+
+
+def resolve_log_folders(target: TargetIniFile, sections: typing.List[str],
+                        path_map: typing.List[str]) -> typing.Dict[str, typing.List[str]]:
+    """
+    Resolve the (local) log folder of each environment. Environments sharing a folder are scanned once.
+
+    :param target: Parsed target INI file
+    :param sections: Environments (INI sections); DEFAULT: all environments
+    :param path_map: List of 'PREFIX=LOCAL_PATH' mappings (see map_path)
+
+    :return: Dictionary of local log folder --> environments
+
+    """
+    sections = sections or target._sort_version(target.config.sections())[1:]
+    folders = dict()
+    for section in sections:
+        if not target.config.has_section(section) or not target.config[section].get(LOG_FOLDER):
+            logging.getLogger().warning(f"'{section}' does not define a {LOG_FOLDER}.")
+            continue
+        folder = map_path(target.config[section][LOG_FOLDER], path_map)
+        folders.setdefault(folder, []).append(section)
+    return folders
+
+
+def list_log_files(folder: str, pattern: str) -> typing.List[typing.Tuple[str, os.stat_result]]:
+    with os.scandir(folder) as entries:
+        return sorted([(entry.path, entry.stat()) for entry in entries
+                       if entry.is_file() and fnmatch.fnmatch(entry.name, pattern)])
+
+
+def scan_environments(folders: typing.Dict[str, typing.List[str]], options: ScanOptions, pattern: str,
+                      offsets: OffsetStore, executor: concurrent.futures.Executor
+                      ) -> typing.Iterator[typing.Tuple[typing.List[str], LogRecord]]:
+    """
+    Scan the log files of all environments in parallel (one task per file), starting at the saved offsets.
+
+    :param folders: Dictionary of log folder --> environments (see resolve_log_folders)
+    :param options: ScanOptions
+    :param pattern: Log file name pattern (glob)
+    :param offsets: Saved offsets (updated with the new offsets)
+    :param executor: Process pool
+
+    :return: Iterator of tuples: (environments, LogRecord), in folder/file order
+
+    """
+    tasks = []
+    for folder, sections in folders.items():
+        if not os.path.isdir(folder):
+            logging.getLogger().warning(f"Log folder '{folder}' ({', '.join(sections)}) was not found.")
+            continue
+        for log_file, stat in list_log_files(folder, pattern):
+            start = offsets.get_offset(log_file, stat)
+            tasks.append((sections, log_file, stat, executor.submit(scan_file, log_file, options, start)))
+
+    for sections, log_file, stat, future in tasks:
+        records, end = future.result()
+        offsets.set_offset(log_file, stat, end)
+        for record in records:
+            yield sections, record
+
+
+def main() -> None:
+    cli = CLIArgs()
+    logging.basicConfig(level=logging.DEBUG if cli.args.debug else logging.WARNING,
+                        format='[%(asctime)s.%(msecs)03d]:[%(levelname)-7s]:[%(name)s.%(funcName)s]: %(message)s',
+                        datefmt="%m/%d/%YT%H:%M:%S")
+
+    target = TargetIniFile(filespec=cli.args.source_file)
+    folders = resolve_log_folders(target=target, sections=cli.args.sections, path_map=cli.args.map)
+    options = ScanOptions(regex=cli.args.regex, since=cli.args.since, until=cli.args.until,
+                          time_pattern=cli.args.time_pattern, time_format=cli.args.time_format,
+                          encoding=cli.args.encoding)
+    offsets = OffsetStore(filespec=cli.args.tail)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=cli.args.workers) as executor:
+        try:
+            while True:
+                for sections, record in scan_environments(folders=folders, options=options, pattern=cli.args.glob,
+                                                          offsets=offsets, executor=executor):
+                    if cli.args.json:
+                        print(json.dumps(dict(record._asdict(), environments=sections)))
+                    else:
+                        print(f"[{', '.join(sections)}] {record.file}:{record.offset}: {record.text}")
+                offsets.save()
+
+                if cli.args.follow is None:
+                    break
+                time.sleep(cli.args.follow)
+        except KeyboardInterrupt:
+            offsets.save()
+
+
+if __name__ == '__main__':
+    main()
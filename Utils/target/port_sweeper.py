@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import errno
+import json
+import sys
+import time
+import typing
+
+try:
+    from .update_target_ini import TargetIniFile
+except ImportError:
+    from update_target_ini import TargetIniFile
+
+
+PORT_OPTIONS = ['PORT', 'SECOND_PORT', 'MONITOR_SERVER_PORT', 'STATUS_SERVER_PORT']
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_CONCURRENCY = 256
+
+
+class CLIArgs:
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(
+            description=f"Check which environments are up: TCP connect to the {', '.join(PORT_OPTIONS)} of every "
+                        f"target INI section, concurrently.")
+        self.parser.add_argument("source_file", help="Name of target INI file to read.", type=str)
+        self.parser.add_argument("sections", nargs='*', default=[],
+                                 help="Environments (INI sections) to check. DEFAULT: all environments.")
+        self.parser.add_argument("-t", "--timeout", default=DEFAULT_TIMEOUT, type=float,
+                                 help=f"Connection timeout (seconds). DEFAULT: {DEFAULT_TIMEOUT}")
+        self.parser.add_argument("-c", "--concurrency", default=DEFAULT_CONCURRENCY, type=int,
+                                 help=f"Maximum number of concurrent connections. DEFAULT: {DEFAULT_CONCURRENCY}")
+        self.parser.add_argument("-s", "--server_name", action='store_true',
+                                 help="Connect to the LOS_SERVER_NAME, rather than the IP_ADDRESS.")
+        self.parser.add_argument("--host", default=None, type=str,
+                                 help="Connect to this host for every environment (e.g. - 127.0.0.1, for testing).")
+        self.parser.add_argument("--down", action='store_true', help="Only report environments with a port down.")
+        self.parser.add_argument("-j", "--json", action='store_true', help="Report the results as JSON.")
+        self.args = self.parser.parse_args()
+
+
+class Probe(typing.NamedTuple):
+    host: str
+    port: int
+
+
+class ProbeResult(typing.NamedTuple):
+    up: bool
+    latency: float
+    error: typing.Optional[str] = None
+
+
+def build_probes(target: TargetIniFile, sections: typing.List[str], use_server_name: bool = False,
+                 host: typing.Optional[str] = None) -> typing.Dict[str, typing.Dict[str, Probe]]:
+    """
+    Build the probe list from the target INI sections.
+
+    :param target: Parsed target INI file
+    :param sections: List of sections
+    :param use_server_name: True = connect to the LOS_SERVER_NAME; False = connect to the IP_ADDRESS
+    :param host: (Optional) Connect to this host for every section (overrides the section's address)
+
+    :return: Dictionary of section --> {port option: Probe} (sections without an address or ports are omitted)
+
+    """
+    address_option = 'LOS_SERVER_NAME' if use_server_name else 'IP_ADDRESS'
+    probes = dict()
+    for section in sections:
+        address = host or target.config.get(section, address_option, fallback='')
+        if not address:
+            continue
+
+        ports = dict()
+        for option in PORT_OPTIONS:
+            value = target.config.get(section, option, fallback='')
+            if value.strip().isdigit():
+                ports[option] = Probe(host=address, port=int(value))
+        if ports:
+            probes[section] = ports
+    return probes
+
+
+async def check_port(probe: Probe, timeout: float, semaphore: asyncio.Semaphore) -> ProbeResult:
+    """
+    Check whether a port accepts TCP connections.
+
+    :param probe: Probe (host, port)
+    :param timeout: Connection timeout (seconds)
+    :param semaphore: Semaphore limiting the number of concurrent connections
+
+    :return: ProbeResult (latency: seconds to connect, or to fail)
+
+    """
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(probe.host, probe.port), timeout=timeout)
+        except asyncio.TimeoutError:
+            return ProbeResult(up=False, latency=time.perf_counter() - start, error='timeout')
+        except OSError as exc:
+            # Compact error: 'refused', or the errno name (EHOSTUNREACH, ...)
+            error = 'refused' if isinstance(exc, ConnectionRefusedError) else errno.errorcode.get(exc.errno)
+            return ProbeResult(up=False, latency=time.perf_counter() - start, error=error or exc.__class__.__name__)
+
+        latency = time.perf_counter() - start
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return ProbeResult(up=True, latency=latency)
+
+
+async def sweep(probes: typing.Iterable[Probe], timeout: float = DEFAULT_TIMEOUT,
+                concurrency: int = DEFAULT_CONCURRENCY) -> typing.Dict[Probe, ProbeResult]:
+    """
+    Check all probes concurrently (each distinct host:port is only checked once).
+
+    :param probes: Probes to check
+    :param timeout: Connection timeout (seconds)
+    :param concurrency: Maximum number of concurrent connections
+
+    :return: Dictionary of Probe --> ProbeResult
+
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    unique = list(dict.fromkeys(probes))
+    results = await asyncio.gather(*[check_port(probe, timeout, semaphore) for probe in unique])
+    return dict(zip(unique, results))
+
+
+def format_result(result: typing.Optional[ProbeResult]) -> str:
+    if result is None:
+        return '-'
+    if result.up:
+        return f"UP {result.latency * 1000:.1f}ms"
+    return f"DOWN ({result.error})"
+
+
+def main() -> None:
+    cli = CLIArgs()
+    if cli.args.concurrency < 1:
+        cli.parser.error(f"--concurrency must be at least 1 (got {cli.args.concurrency})")
+
+    target = TargetIniFile(filespec=cli.args.source_file)
+    unknown = [section for section in cli.args.sections if not target.config.has_section(section)]
+    if unknown:
+        cli.parser.error(f"Unknown environment(s): {unknown}")
+    sections = cli.args.sections or [section for section in target.get_target_sections(sort=True)
+                                      if section != target.CORE]
+    probes = build_probes(target=target, sections=sections, use_server_name=cli.args.server_name,
+                          host=cli.args.host)
+
+    start = time.perf_counter()
+    results = asyncio.run(sweep(probes=[probe for ports in probes.values() for probe in ports.values()],
+                                timeout=cli.args.timeout, concurrency=cli.args.concurrency))
+    elapsed = time.perf_counter() - start
+
+    rows = dict([(section, dict([(option, results[probe]) for option, probe in ports.items()]))
+                 for section, ports in probes.items()])
+    down = [section for section, ports in rows.items() if not all([result.up for result in ports.values()])]
+    if cli.args.down:
+        rows = dict([(section, rows[section]) for section in down])
+
+    if cli.args.json:
+        print(json.dumps(dict([(section, dict([
+            (option, {'host': probes[section][option].host, 'port': probes[section][option].port, 'up': result.up,
+                      'latency_ms': round(result.latency * 1000, 3), 'error': result.error})
+            for option, result in ports.items()])) for section, ports in rows.items()]), indent=2))
+    else:
+        width = max([len(section) for section in rows] + [len('ENVIRONMENT')])
+        print(f"{'ENVIRONMENT':<{width}}  " + "  ".join([f"{option:<22}" for option in PORT_OPTIONS]))
+        for section, ports in rows.items():
+            print(f"{section:<{width}}  " + "  ".join([f"{format_result(ports.get(option)):<22}"
+                                                        for option in PORT_OPTIONS]))
+
+    print(f"{len(probes) - len(down)} of {len(probes)} environments up ({len(results)} host:port pairs checked in "
+          f"{elapsed:.2f} seconds).", file=sys.stderr if cli.args.json else sys.stdout)
+
+    if down:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
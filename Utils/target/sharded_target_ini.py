@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+import argparse
+import configparser
+import glob
+import logging
+import os
+import typing
+
+try:
+    from .update_target_ini import TargetIniFile
+except ImportError:
+    from update_target_ini import TargetIniFile
+
+
+class CLIArgs:
+    SPLIT = 'split'
+    MERGE = 'merge'
+
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(
+            description="Convert the target INI file between the monolithic and sharded (directory) layouts.")
+        self.parser.add_argument("-d", "--debug", help="Enable debug logging.", action='store_true')
+
+        sub_parser = self.parser.add_subparsers(dest='action', help="Layout conversions.")
+        sub_parser.required = True
+
+        split = sub_parser.add_parser(self.SPLIT, help="Split a monolithic INI file into a shard directory.")
+        split.add_argument('source_file', help="Name of monolithic INI file to read.")
+        split.add_argument('shard_dir', help="Name of directory to write the shards.")
+        split.add_argument('-b', '--by', default=ShardedTargetIniFile.BY_VERSION,
+                           choices=ShardedTargetIniFile.SHARD_STRATEGIES,
+                           help=f"Shard the sections by version or environment. "
+                                f"DEFAULT: {ShardedTargetIniFile.BY_VERSION}")
+
+        merge = sub_parser.add_parser(self.MERGE, help="Merge a shard directory into a monolithic INI file.")
+        merge.add_argument('shard_dir', help="Name of shard directory to read.")
+        merge.add_argument('outfile', help="Name of monolithic INI file to write.")
+
+        self.args = self.parser.parse_args()
+
+
+class ShardedTargetIniFile(TargetIniFile):
+    """
+    Target INI file stored as a directory of shards:
+        Core.ini        --> [Core] section (TARGETS lists every section, SHARD_BY records the shard strategy)
+        {shard}.ini     --> The sections belonging to the shard (by version: 20.01.ini, or by environment: qa.ini)
+
+    Only Core.ini is read on instantiation; the shard holding a section is read when the section is accessed
+    (or all shards, for operations spanning all sections), and only modified shards are written.
+
+    """
+
+    CORE_SHARD = 'Core'
+    SHARD_BY = 'SHARD_BY'
+    BY_VERSION = 'version'
+    BY_ENVIRONMENT = 'environment'
+    SHARD_STRATEGIES = [BY_VERSION, BY_ENVIRONMENT]
+    OTHER_SHARD = 'other'
+    EXTENSION = '.ini'
+
+    def __init__(self, filespec: str, outfile: typing.Optional[str] = None) -> None:
+        """
+        Sharded Target Ini File Constructor
+
+        :param filespec: Shard directory
+        :param outfile: (Optional) Name of a monolithic file to write (all shards merged). If not specified,
+                        modified shards are written back to the shard directory.
+
+        """
+        self._loaded_shards = set()
+        self._dirty_shards = set()
+        self._targets = []
+        self.shard_by = self.BY_VERSION
+        super().__init__(filespec=filespec, outfile=outfile)
+
+    def get_shard_name(self, section_name: str) -> str:
+        """
+        Determine the shard that stores the section, based on the shard strategy.
+            version:     <env>_<version> => <version>, otherwise => 'other'
+            environment: <env>_<name> => <env>, otherwise => 'other'
+
+        :param section_name: Name of the section
+
+        :return: Name of the shard
+
+        """
+        if section_name == self.CORE:
+            return self.CORE_SHARD
+
+        if self.shard_by == self.BY_VERSION:
+            version, _ = self._get_section_version(section_name)
+            return section_name.split('_')[1] if version is not None else self.OTHER_SHARD
+
+        parts = section_name.split('_')
+        return parts[0].lower() if len(parts) > 1 else self.OTHER_SHARD
+
+    def _get_shard_file(self, shard: str) -> str:
+        return os.path.join(self.file, f"{shard}{self.EXTENSION}")
+
+    def read_file(self) -> configparser.ConfigParser:
+        """
+        Read the Core shard (the remaining shards are read on demand).
+
+        :return: configParser with the Core section (or empty if the shard directory/Core shard was not found)
+
+        """
+        config = configparser.ConfigParser()
+        core_file = self._get_shard_file(self.CORE_SHARD)
+        if os.path.exists(core_file):
+            config.read(core_file)
+            self.log.debug(f"Parsed '{os.path.abspath(core_file)}' successfully.")
+        elif not os.path.exists(self.file):
+            self.log.info(f"Shard directory ('{self.file}') does not exist; it will be created when written.")
+        else:
+            self.log.error(f"Specified shard directory ('{self.file}') does not have a Core shard ('{core_file}').")
+
+        if config.has_section(self.CORE):
+            self.shard_by = config.get(self.CORE, self.SHARD_BY, fallback=self.BY_VERSION)
+            self._targets = [target.strip() for target in config.get(self.CORE, self.TARGETS, fallback='').split(',')
+                             if target.strip()]
+        self._loaded_shards = {self.CORE_SHARD}
+        return config
+
+    def load_shard(self, shard: str) -> None:
+        """
+        Read a shard into the merged view (if not already read).
+
+        :param shard: Name of the shard
+
+        :return: None
+
+        """
+        if shard in self._loaded_shards:
+            return
+
+        shard_file = self._get_shard_file(shard)
+        if os.path.exists(shard_file):
+            self.config.read(shard_file)
+            self.log.debug(f"Parsed shard '{os.path.abspath(shard_file)}' successfully.")
+        self._loaded_shards.add(shard)
+
+    def load_all_shards(self) -> None:
+        """
+        Read all shards into the merged view.
+
+        :return: None
+
+        """
+        for shard_file in sorted(glob.glob(os.path.join(self.file, f"*{self.EXTENSION}"))):
+            self.load_shard(os.path.basename(shard_file)[:-len(self.EXTENSION)])
+
+    def load_section(self, section_name: str) -> None:
+        """
+        Read the shard that stores the section.
+
+        :param section_name: Name of the section
+
+        :return: None
+
+        """
+        self.load_shard(self.get_shard_name(section_name))
+
+    def get_target_sections(self, sort: bool = False) -> typing.List[str]:
+        """
+        Get all registered sections ([Core][TARGETS]) without reading the shards.
+
+        :param sort: (bool) sort the environment names.
+
+        :return: List of relevant sections.
+
+        """
+        sections = list(self._targets)
+        if sort:
+            sections = self._sort_version(sections)
+        return sections
+
+    def get_section(self, section_name: str) -> typing.Optional[configparser.SectionProxy]:
+        """
+        Get a section (reading only its shard).
+
+        :param section_name: Name of the section
+
+        :return: The section, or None if it is not defined.
+
+        """
+        self.load_section(section_name)
+        return self.config[section_name] if self.config.has_section(section_name) else None
+
+    def get_value(self, section_name: str, option: str) -> typing.Optional[str]:
+        self.load_section(section_name)
+        return super().get_value(section_name, option)
+
+    def remove_section(self, section_name: str) -> bool:
+        self.load_section(section_name)
+        result = super().remove_section(section_name)
+        if result:
+            self._targets.remove(section_name)
+            self._dirty_shards.update([self.get_shard_name(section_name), self.CORE_SHARD])
+        return result
+
+    def update_section(self, section_name: str, option: str, value: typing.Any) -> bool:
+        self.load_section(section_name)
+        self._dirty_shards.add(self.get_shard_name(section_name))
+        return super().update_section(section_name=section_name, option=option, value=value)
+
+    def add_section(self, version_str_text: str, environment: str, primary_port) -> bool:
+        section_name = f"{version_str_text.lower()}_{environment.lower()}"
+        self.load_section(section_name)
+        result = super().add_section(version_str_text=version_str_text, environment=environment,
+                                     primary_port=primary_port)
+        if section_name not in self._targets:
+            self._targets.append(section_name)
+        self._dirty_shards.update([self.get_shard_name(section_name), self.CORE_SHARD])
+        return result
+
+    def verify_targets_are_defined(self) -> bool:
+        self.load_all_shards()
+        core_targets = self._targets
+        try:
+            self._targets = [section for section in self.config.sections() if section != self.CORE]
+            return super().verify_targets_are_defined()
+        finally:
+            self._targets = core_targets
+
+    def verify_all_sections_are_fully_defined(self) -> bool:
+        self.load_all_shards()
+        return super().verify_all_sections_are_fully_defined()
+
+    def _get_value_index(self, option: typing.Optional[str] = None) -> typing.Dict[str, typing.Set[str]]:
+        self.load_all_shards()
+        return super()._get_value_index(option)
+
+    def write_file(self, filename: typing.Optional[str] = None) -> None:
+        """
+        Write the modified shards (and the Core shard, if the registered sections changed). If a filename
+        (other than the shard directory) is specified, all shards are merged and written as a monolithic file.
+
+        :param filename: (Optional) - Monolithic output file.
+
+        :return: None
+
+        """
+        filename = filename or self.outfile
+        if os.path.abspath(filename) != os.path.abspath(self.file):
+            self.write_monolithic_file(filename)
+            return
+
+        for shard in sorted(self._dirty_shards):
+            self.write_shard(shard)
+        self._dirty_shards = set()
+
+    def write_shard(self, shard: str) -> None:
+        """
+        Write a single shard: sections in custom order (TargetIniFile._sort_version), options sorted and uppercase.
+
+        :param shard: Name of the shard
+
+        :return: None
+
+        """
+        shard_file = self._get_shard_file(shard)
+        if shard == self.CORE_SHARD:
+            sections = [self.CORE]
+            self.config.set(self.CORE, self.TARGETS, ", ".join(self.get_target_sections(sort=True)[1:]))
+            self.config.set(self.CORE, self.SHARD_BY, self.shard_by)
+        else:
+            sections = [section for section in self._sort_version(self.config.sections())[1:]
+                        if self.get_shard_name(section) == shard]
+
+        if not sections:
+            if os.path.exists(shard_file):
+                os.remove(shard_file)
+                self.log.info(f"Removed empty shard: {os.path.abspath(shard_file)}.")
+            return
+
+        os.makedirs(self.file, exist_ok=True)
+        write_sections(filename=shard_file, config=self.config, sections=sections)
+        msg = f"Wrote shard to {os.path.abspath(shard_file)}."
+        self.log.info(msg)
+        print(msg)
+
+    def write_monolithic_file(self, filename: str) -> None:
+        """
+        Merge all shards, and write them as a single (monolithic) target INI file.
+
+        :param filename: Output file
+
+        :return: None
+
+        """
+        self.load_all_shards()
+        self.config.remove_option(self.CORE, self.SHARD_BY)
+        TargetIniFile.write_file(self, filename)
+
+    @classmethod
+    def split(cls, source_file: str, shard_dir: str, shard_by: str = BY_VERSION) -> 'ShardedTargetIniFile':
+        """
+        Split a monolithic target INI file into a shard directory.
+
+        :param source_file: Monolithic target INI file
+        :param shard_dir: Shard directory (created if it does not exist)
+        :param shard_by: Shard strategy (see SHARD_STRATEGIES)
+
+        :return: ShardedTargetIniFile for the new shard directory
+
+        """
+        source = TargetIniFile(filespec=source_file)
+
+        # Remove any stale shards from a previous split.
+        for shard_file in glob.glob(os.path.join(shard_dir, f"*{cls.EXTENSION}")):
+            os.remove(shard_file)
+
+        sharded = cls(filespec=shard_dir)
+        sharded.shard_by = shard_by
+        sharded.config = source.config
+        sharded._targets = source.get_target_sections()
+        sharded._loaded_shards = set([sharded.get_shard_name(section) for section in source.config.sections()])
+
+        for shard in sorted(sharded._loaded_shards):
+            sharded.write_shard(shard)
+        return sharded
+
+
+def write_sections(filename: str, config: configparser.ConfigParser, sections: typing.List[str]) -> None:
+    """
+    Write the specified sections using the target INI conventions (see TargetIniFile.write_file): options sorted
+    alphabetically, and option keywords uppercase.
+
+    :param filename: Output file
+    :param config: ConfigParser containing the sections
+    :param sections: Sections to write (in order)
+
+    :return: None
+
+    """
+    output = configparser.RawConfigParser()
+    output.optionxform = str
+    for section in sections:
+        output[section] = dict([(name.upper(), value) for name, value in
+                                sorted(config._sections[section].items(), key=lambda t: t[0])])
+    with open(filename, "w") as INI:
+        output.write(INI)
+
+
+def main() -> None:
+    cli = CLIArgs()
+    logging.basicConfig(level=logging.DEBUG if cli.args.debug else logging.WARNING,
+                        format='[%(asctime)s.%(msecs)03d]:[%(levelname)-7s]:[%(name)s.%(funcName)s]: %(message)s',
+                        datefmt="%m/%d/%YT%H:%M:%S")
+
+    if cli.args.action == cli.SPLIT:
+        ShardedTargetIniFile.split(source_file=cli.args.source_file, shard_dir=cli.args.shard_dir,
+                                   shard_by=cli.args.by)
+    elif cli.args.action == cli.MERGE:
+        ShardedTargetIniFile(filespec=cli.args.shard_dir).write_monolithic_file(cli.args.outfile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+import argparse
+import configparser
+import contextlib
+import logging
+import os
+import typing
+
+try:
+    from .update_target_ini import TargetIniFile
+except ImportError:
+    from update_target_ini import TargetIniFile
+
+
+class CLIArgs:
+    IMPORT = 'import'
+    EXPORT = 'export'
+
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(
+            description="Convert the target INI file to/from the SQLite environment store.")
+        self.parser.add_argument("-d", "--debug", help="Enable debug logging.", action='store_true')
+
+        sub_parser = self.parser.add_subparsers(dest='action', help="Conversions.")
+        sub_parser.required = True
+
+        import_parser = sub_parser.add_parser(self.IMPORT, help="Import a target INI file into a SQLite database.")
+        import_parser.add_argument('source_file', help="Name of target INI file to read.")
+        import_parser.add_argument('database', help="Name of SQLite database to write (replaced if it exists).")
+
+        export_parser = sub_parser.add_parser(self.EXPORT, help="Export a SQLite database as a target INI file.")
+        export_parser.add_argument('database', help="Name of SQLite database to read.")
+        export_parser.add_argument('outfile', help="Name of target INI file to write.")
+
+        self.args = self.parser.parse_args()
+
+
+class SqliteTargetIniFile(TargetIniFile):
+    """
+    Target INI file stored in a local SQLite database (sections indexed by name, version and environment; options
+    keyed by section + uppercase option name). Lookups and updates only touch the affected rows; the full
+    configparser view (self.config) is only built for whole-file operations (validation, value queries, export).
+
+    """
+
+    EXTENSIONS = ['.db', '.sqlite', '.sqlite3']
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sections (
+            name TEXT PRIMARY KEY,
+            environment TEXT NOT NULL,
+            version TEXT,
+            version_major INTEGER,
+            version_minor INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS sections_environment ON sections (environment);
+        CREATE INDEX IF NOT EXISTS sections_version ON sections (version_major, version_minor);
+        CREATE TABLE IF NOT EXISTS options (
+            section TEXT NOT NULL REFERENCES sections (name) ON DELETE CASCADE,
+            option TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (section, option)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS options_value ON options (option, value);
+    """
+
+    def __init__(self, filespec: str, outfile: typing.Optional[str] = None) -> None:
+        """
+        SQLite Target Ini File Constructor
+
+        :param filespec: Filespec (path and name) of the SQLite database (created if it does not exist).
+        :param outfile: (Optional) Name of a target INI file to export to on write_file().
+                        If not specified, changes are only committed to the database.
+
+        """
+        self._transaction_depth = 0
+        self.connection = None
+        super().__init__(filespec=filespec, outfile=outfile)
+
+    @classmethod
+    def is_database(cls, filespec: str) -> bool:
+        return os.path.splitext(filespec)[1].lower() in cls.EXTENSIONS
+
+    def read_file(self) -> configparser.ConfigParser:
+        """
+        Open (or create) the database. The configparser view is empty until load_config() is called.
+
+        :return: Empty configParser
+
+        """
+        if not os.path.exists(self.file):
+            self.log.info(f"Database '{self.file}' does not exist; it will be created.")
+
+        # Deferred: sqlite3 is only needed for a database (update_target_ini.py checks is_database() for every file).
+        import sqlite3
+
+        self.connection = sqlite3.connect(self.file, isolation_level=None)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(self.SCHEMA)
+        self.log.debug(f"Opened '{os.path.abspath(self.file)}' successfully.")
+        return configparser.ConfigParser()
+
+    def load_config(self) -> configparser.ConfigParser:
+        """
+        (Re)build the configparser view of all sections from the database.
+
+        :return: configParser with the database contents
+
+        """
+        config = configparser.ConfigParser()
+        for (section,) in self.connection.execute("SELECT name FROM sections ORDER BY rowid"):
+            config.add_section(section)
+        for section, option, value in self.connection.execute("SELECT section, option, value FROM options"):
+            config._sections[section][option.lower()] = value
+        self.config = config
+        return config
+
+    @contextlib.contextmanager
+    def transaction(self) -> typing.Iterator['sqlite3.Connection']:
+        """
+        Execute the enclosed statements as a single transaction (nested transactions join the outer transaction).
+        On an exception, all changes made within the (outermost) transaction are rolled back.
+
+        :return: Context manager yielding the database connection
+
+        """
+        outermost = self._transaction_depth == 0
+        if outermost:
+            self.connection.execute("BEGIN IMMEDIATE")
+        self._transaction_depth += 1
+        try:
+            yield self.connection
+        except BaseException:
+            self._transaction_depth -= 1
+            if outermost:
+                self.connection.execute("ROLLBACK")
+            raise
+        else:
+            self._transaction_depth -= 1
+            if outermost:
+                self.connection.execute("COMMIT")
+
+    def _insert_section(self, section_name: str, options: typing.Dict[str, str]) -> None:
+        version, environment = self._get_section_version(section_name)
+        if version is None:
+            version_text, major, minor = None, None, None
+            environment = self.get_section_environment(section_name)
+        else:
+            version_text, major, minor = section_name.split('_')[1], version[0], (version[1:] or (0,))[0]
+
+        with self.transaction() as db:
+            db.execute("INSERT OR REPLACE INTO sections (name, environment, version, version_major, version_minor) "
+                       "VALUES (?, ?, ?, ?, ?)", (section_name, environment.lower(), version_text, major, minor))
+            db.execute("DELETE FROM options WHERE section = ?", (section_name,))
+            db.executemany("INSERT INTO options (section, option, value) VALUES (?, ?, ?)",
+                           [(section_name, option.upper(), str(value)) for option, value in options.items()])
+        self._invalidate_indexes()
+
+    def import_ini(self, source_file: str) -> int:
+        """
+        Import (replace the database contents with) a target INI file. Raw values are stored (no interpolation).
+
+        :param source_file: Name of the target INI file
+
+        :return: Number of sections imported
+
+        """
+        source = TargetIniFile(filespec=source_file)
+        with self.transaction() as db:
+            db.execute("DELETE FROM sections")
+            for section in source.config.sections():
+                self._insert_section(section, source.config._sections[section])
+        count = len(source.config.sections())
+        self.log.info(f"Imported {count} sections from '{os.path.abspath(source_file)}'.")
+        return count
+
+    def export_ini(self, filename: str) -> None:
+        """
+        Export the database as a target INI file (identical to TargetIniFile.write_file: sections in custom order,
+        options sorted and uppercase, [Core][TARGETS] listing all environments).
+
+        :param filename: Name of the target INI file
+
+        :return: None
+
+        """
+        self.load_config()
+        TargetIniFile.write_file(self, filename)
+
+    def get_value(self, section_name: str, option: str) -> typing.Optional[str]:
+        """
+        Get a single option value (single indexed row lookup).
+
+        :param section_name: Name of the section
+        :param option: Name of the option
+
+        :return: Value, or None if not defined
+
+        """
+        row = self.connection.execute("SELECT value FROM options WHERE section = ? AND option = ?",
+                                      (section_name, option.upper())).fetchone()
+        return None if row is None else row[0]
+
+    def get_section_options(self, section_name: str) -> typing.Dict[str, str]:
+        """
+        Get all options for a section.
+
+        :param section_name: Name of the section
+
+        :return: Dictionary of uppercase option --> value (empty if the section is not defined)
+
+        """
+        return dict(self.connection.execute("SELECT option, value FROM options WHERE section = ? ORDER BY option",
+                                            (section_name,)).fetchall())
+
+    def get_target_sections(self, sort: bool = False) -> typing.List[str]:
+        sections = [section for (section,) in self.connection.execute(
+            "SELECT name FROM sections WHERE name != ? ORDER BY rowid", (self.CORE,))]
+        if sort:
+            sections = self._sort_version(sections)
+        return sections
+
+    def get_sections_in_version_range(
+            self, min_version: typing.Optional[str] = None, max_version: typing.Optional[str] = None,
+            environment: typing.Optional[str] = None) -> typing.List[str]:
+        # The indexed columns narrow the rows by major version (and environment); the full version (all components)
+        # is compared, and the sections ordered, as in TargetIniFile: (version, environment, section).
+        low = None if min_version is None else self._parse_version(min_version)
+        high = None if max_version is None else self._parse_version(max_version) + (float('inf'),)
+        clauses, params = ["version IS NOT NULL"], []
+        if low is not None:
+            clauses.append("version_major >= ?")
+            params.append(low[0])
+        if high is not None:
+            clauses.append("version_major <= ?")
+            params.append(high[0])
+        if environment is not None:
+            clauses.append("environment = ?")
+            params.append(environment.lower())
+
+        rows = sorted([(self._parse_version(version), env, section) for section, env, version in
+                       self.connection.execute(f"SELECT name, environment, version FROM sections "
+                                               f"WHERE {' AND '.join(clauses)}", params)])
+        return [section for version, _, section in rows
+                if (low is None or version >= low) and (high is None or version < high)]
+
+    def update_section(self, section_name: str, option: str, value: typing.Any) -> bool:
+        self.log.info(f"Update ENV '{section_name}': Updating '{option}' to '{value}'")
+        self.update_sections({section_name: {option: value}})
+        return self.get_value(section_name, option) == value
+
+    def update_sections(self, updates: typing.Dict[str, typing.Dict[str, typing.Any]]) -> None:
+        """
+        Update multiple sections in a single transaction: either all updates are applied, or none are.
+
+        :param updates: Dictionary of section --> {option: value}
+
+        :return: None (configparser.NoSectionError is raised, as by TargetIniFile, and nothing is updated, if any
+                 section is not defined)
+
+        """
+        with self.transaction() as db:
+            for section_name, options in updates.items():
+                if db.execute("SELECT 1 FROM sections WHERE name = ?", (section_name,)).fetchone() is None:
+                    raise configparser.NoSectionError(section_name)
+                db.executemany("INSERT OR REPLACE INTO options (section, option, value) VALUES (?, ?, ?)",
+                               [(section_name, option.upper(), str(value)) for option, value in options.items()])
+        self._invalidate_indexes()
+
+    def remove_section(self, section_name: str) -> bool:
+        with self.transaction() as db:
+            removed = db.execute("DELETE FROM sections WHERE name = ?", (section_name,)).rowcount > 0
+        self._invalidate_indexes()
+
+        if removed:
+            self.log.info(f"Validation: Environment '{section_name}' has been removed.")
+        else:
+            msg = f"Requested section to be removed: '{section_name}' was not found in the defined sections."
+            self.log.warning(msg)
+            self.log.info(f"Environment '{section_name}' has NOT been removed.")
+            print(msg)
+        return removed
+
+    def add_section(self, version_str_text: str, environment: str, primary_port) -> bool:
+        section_name = f"{version_str_text.lower()}_{environment.lower()}"
+        options = self._define_new_environment(version_string=version_str_text)
+        options[self.MONITOR_SERVER_PORT] = str(int(primary_port) + 2)
+        options[self.STATUS_SERVER_PORT] = str(int(primary_port) + 3)
+        self._insert_section(section_name, options)
+        self.log.info(f"Add ENV '{section_name}': using primary port as basis: {primary_port}")
+        return section_name in self.get_target_sections()
+
+    def verify_targets_are_defined(self) -> bool:
+        self.load_config()
+        return super().verify_targets_are_defined()
+
+    def verify_all_sections_are_fully_defined(self) -> bool:
+        self.load_config()
+        return super().verify_all_sections_are_fully_defined()
+
+    def _get_value_index(self, option: typing.Optional[str] = None) -> typing.Dict[str, typing.Set[str]]:
+        if not self._value_indexes:
+            self.load_config()
+        return super()._get_value_index(option)
+
+    def write_file(self, filename: typing.Optional[str] = None) -> None:
+        """
+        Changes are committed to the database as they are made; if an INI filename (or outfile) other than the
+        database is specified, export the database to it.
+
+        :param filename: (Optional) - Target INI file to export.
+
+        :return: None
+
+        """
+        filename = filename or self.outfile
+        if os.path.abspath(filename) != os.path.abspath(self.file):
+            self.export_ini(filename)
+
+
+def main() -> None:
+    cli = CLIArgs()
+    logging.basicConfig(level=logging.DEBUG if cli.args.debug else logging.WARNING,
+                        format='[%(asctime)s.%(msecs)03d]:[%(levelname)-7s]:[%(name)s.%(funcName)s]: %(message)s',
+                        datefmt="%m/%d/%YT%H:%M:%S")
+
+    if cli.args.action == cli.IMPORT:
+        count = SqliteTargetIniFile(filespec=cli.args.database).import_ini(cli.args.source_file)
+        print(f"Imported {count} sections into {os.path.abspath(cli.args.database)}.")
+    elif cli.args.action == cli.EXPORT:
+        SqliteTargetIniFile(filespec=cli.args.database).export_ini(cli.args.outfile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# NOTE: Intentionally does not import update_target_ini (or parse the INI file), to keep startup fast.
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 5.0
+
+
+class CLIArgs:
+    ENVIRONMENTS = 'environments'
+    SETTINGS = 'settings'
+    NEXT_PORT = 'next_port'
+    RELOAD = 'reload'
+
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(description="Query the target INI service (target_ini_service.py).")
+        self.parser.add_argument("--host", default=DEFAULT_HOST, type=str,
+                                 help=f"Address of the target INI service. DEFAULT: {DEFAULT_HOST}")
+        self.parser.add_argument("-p", "--port", default=DEFAULT_PORT, type=int,
+                                 help=f"Port of the target INI service. DEFAULT: {DEFAULT_PORT}")
+        self.parser.add_argument("-t", "--timeout", default=DEFAULT_TIMEOUT, type=float,
+                                 help=f"Request timeout (seconds). DEFAULT: {DEFAULT_TIMEOUT}")
+        self.parser.add_argument("-j", "--json", action='store_true', help="Print the raw JSON response.")
+
+        sub_parser = self.parser.add_subparsers(dest='query', help="Queries.")
+        sub_parser.required = True
+        sub_parser.add_parser(self.ENVIRONMENTS, help="List the defined environments.")
+        settings = sub_parser.add_parser(self.SETTINGS, help="Get an environment's settings (or a single setting).")
+        settings.add_argument('env', help="Name of the environment.")
+        settings.add_argument('option', nargs='?', default=None, help="Name of the option.")
+        next_port = sub_parser.add_parser(self.NEXT_PORT, help="Get the next free primary port.")
+        next_port.add_argument('-s', '--start', default=None, type=int, help="Port to start searching from.")
+        sub_parser.add_parser(self.RELOAD, help="Force the service to reload the INI file.")
+        self.args = self.parser.parse_args()
+
+    def get_resource(self) -> str:
+        """
+        Build the service URL resource for the selected query.
+
+        :return: URL resource (path + query string)
+
+        """
+        if self.args.query == self.SETTINGS:
+            parts = [self.SETTINGS, self.args.env] + ([self.args.option] if self.args.option is not None else [])
+            return '/' + '/'.join([urllib.parse.quote(part, safe='') for part in parts])
+        if self.args.query == self.NEXT_PORT and self.args.start is not None:
+            return f"/{self.NEXT_PORT}?start={self.args.start}"
+        return f"/{self.args.query}"
+
+
+def main() -> None:
+    cli = CLIArgs()
+    url = f"http://{cli.args.host}:{cli.args.port}{cli.get_resource()}"
+
+    try:
+        with urllib.request.urlopen(url, timeout=cli.args.timeout) as resp:
+            data = json.loads(resp.read())
+    except urllib.error.HTTPError as exc:
+        # Service errors are JSON ({'error': ...}); anything else (e.g. - a proxy error page) is reported as is.
+        try:
+            error = json.loads(exc.read()).get('error', exc)
+        except (ValueError, AttributeError):
+            error = exc
+        print(f"ERROR: {error}", file=sys.stderr)
+        exit(1)
+    except (urllib.error.URLError, OSError) as exc:
+        print(f"ERROR: Unable to reach the target INI service ({url}): {exc}", file=sys.stderr)
+        exit(2)
+
+    # Plain output is intended for shell consumption (e.g. - Jenkins 'sh(returnStdout: true)')
+    if cli.args.json:
+        print(json.dumps(data, indent=2))
+    elif isinstance(data, dict):
+        for option, value in data.items():
+            print(f"{option}={value}")
+    elif isinstance(data, list):
+        print("\n".join(data))
+    else:
+        print(data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+import argparse
+import http.server
+import json
+import logging
+import os
+import threading
+import time
+import typing
+import urllib.parse
+
+try:
+    from .update_target_ini import TargetIniFile
+except ImportError:
+    from update_target_ini import TargetIniFile
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class CLIArgs:
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(
+            description="Resident service answering environment metadata queries from the target INI file.")
+        self.parser.add_argument("source_file", help="Name of target INI file to serve.", type=str)
+        self.parser.add_argument("--host", default=DEFAULT_HOST, type=str,
+                                 help=f"Address to listen on. DEFAULT: {DEFAULT_HOST}")
+        self.parser.add_argument("-p", "--port", default=DEFAULT_PORT, type=int,
+                                 help=f"Port to listen on. DEFAULT: {DEFAULT_PORT}")
+        self.parser.add_argument("-i", "--interval", default=DEFAULT_POLL_INTERVAL, type=float,
+                                 help=f"Number of seconds between checks for changes to the INI file. "
+                                      f"DEFAULT: {DEFAULT_POLL_INTERVAL}")
+        self.parser.add_argument("-d", "--debug", help="Enable debug logging.", action='store_true')
+        self.args = self.parser.parse_args()
+
+
+class TargetIniIndex:
+    """
+    In-memory index of the target INI file sections, reloaded (per changed section) when the file changes.
+
+    """
+
+    PORT_SUFFIX = 'PORT'
+    PORT_BLOCK = 10
+    PORTS_PER_ENVIRONMENT = 4
+
+    def __init__(self, filespec: str) -> None:
+        """
+        Target INI Index Constructor
+
+        :param filespec: Filespec (path and name) of the target INI file.
+
+        """
+        self.file = filespec
+        self.log = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._file_signature = None
+        self.sections = dict()
+        self.environments = []
+        self.used_ports = set()
+        self.reload()
+
+    def _get_file_signature(self) -> typing.Optional[tuple]:
+        try:
+            stat = os.stat(self.file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self, force: bool = True) -> typing.List[str]:
+        """
+        Re-read the INI file (if it changed), and update only the sections that were added, changed or removed.
+
+        :param force: (bool) Reload even if the file modification time and size are unchanged.
+
+        :return: List of sections that were updated.
+
+        """
+        signature = self._get_file_signature()
+        if not force and signature == self._file_signature:
+            return []
+
+        target = TargetIniFile(filespec=self.file)
+        sections = dict([(section, dict([(option.upper(), value) for option, value in target.config[section].items()]))
+                         for section in target.config.sections()])
+
+        with self._lock:
+            initial_load = not self.sections
+            section_names_changed = set(sections) != set(self.sections)
+            changed = [section for section, options in sections.items() if self.sections.get(section) != options]
+            removed = [section for section in self.sections if section not in sections]
+
+            # The request handler threads read the index without the lock: build the new index (reusing the
+            # unchanged sections) and swap it in with a single assignment, rather than updating it in place.
+            if changed or removed:
+                self.sections = dict([(section, options if section in changed else self.sections[section])
+                                      for section, options in sections.items()])
+                self.used_ports = set([int(value) for options in sections.values()
+                                       for option, value in options.items()
+                                       if option.endswith(self.PORT_SUFFIX) and value.isdigit()])
+            if section_names_changed:
+                self.environments = target.get_target_sections(sort=True)[1:]
+            self._file_signature = signature
+
+        if initial_load:
+            self.log.info(f"Loaded '{self.file}': {len(changed)} sections.")
+        elif changed or removed:
+            self.log.info(f"Reloaded '{self.file}': Updated sections: {changed}, Removed sections: {removed}")
+        return changed + removed
+
+    def watch(self, interval: float) -> threading.Thread:
+        """
+        Start a (daemon) thread that checks the INI file for changes every interval seconds.
+
+        :param interval: Number of seconds between checks
+
+        :return: The started thread
+
+        """
+        def _watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload(force=False)
+                except Exception as exc:
+                    self.log.error(f"Unable to reload '{self.file}': {exc}")
+
+        thread = threading.Thread(target=_watch, daemon=True)
+        thread.start()
+        return thread
+
+    def get_settings(self, environment: str, option: typing.Optional[str] = None) -> typing.Any:
+        """
+        Get the settings (or a single setting) for an environment. Environment names are matched exactly first,
+        and then case-insensitively.
+
+        :param environment: Name of the environment (INI section)
+        :param option: (Optional) Name of the option
+
+        :return: Dictionary of settings, the option value, or None if not found.
+
+        """
+        sections = self.sections
+        settings = sections.get(environment)
+        if settings is None:
+            matches = [name for name in sections if name.lower() == environment.lower()]
+            settings = sections.get(matches[0]) if matches else None
+
+        if settings is None or option is None:
+            return settings
+        return settings.get(option.upper())
+
+    def get_next_free_port(self, start: typing.Optional[int] = None) -> int:
+        """
+        Find the next free primary port: the first port block (PORT_BLOCK aligned) at or after start, where none of
+        the environment's ports (primary, second, monitor, status: primary + 0..3) are already in use.
+
+        :param start: (Optional) Port to start searching from. DEFAULT: the block after the highest primary port.
+
+        :return: (int) Port number
+
+        """
+        used_ports = self.used_ports
+        if start is None:
+            sections = self.sections
+            primary_ports = [int(options[TargetIniFile.PORT]) for options in sections.values()
+                             if options.get(TargetIniFile.PORT, '').isdigit()]
+            start = max(primary_ports, default=0) + 1
+
+        port = -(-start // self.PORT_BLOCK) * self.PORT_BLOCK
+        while any([port + offset in used_ports for offset in range(self.PORTS_PER_ENVIRONMENT)]):
+            port += self.PORT_BLOCK
+        return port
+
+
+class TargetIniRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Query API (JSON responses):
+        GET /environments                     --> List of environments (sorted)
+        GET /settings/{environment}           --> Dictionary of the environment's settings
+        GET /settings/{environment}/{option}  --> Value of the environment's option
+        GET /next_port[?start={port}]         --> Next free primary port
+        GET /reload                           --> Force a reload; list of updated sections
+
+    """
+
+    index = None
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlparse(self.path)
+        parts = [urllib.parse.unquote(part) for part in url.path.split('/') if part]
+        query = urllib.parse.parse_qs(url.query)
+
+        if parts == ['environments']:
+            self._respond(200, self.index.environments)
+
+        elif len(parts) in [2, 3] and parts[0] == 'settings':
+            result = self.index.get_settings(*parts[1:])
+            if result is None:
+                self._respond(404, {'error': f"Not found: {'/'.join(parts[1:])}"})
+            else:
+                self._respond(200, result)
+
+        elif parts == ['next_port']:
+            try:
+                start = int(query['start'][0]) if 'start' in query else None
+            except ValueError:
+                self._respond(400, {'error': f"Invalid start port: {query['start'][0]}"})
+            else:
+                self._respond(200, self.index.get_next_free_port(start=start))
+
+        elif parts == ['reload']:
+            self._respond(200, self.index.reload())
+
+        else:
+            self._respond(404, {'error': f"Unknown query: {url.path}"})
+
+    def _respond(self, status: int, data: typing.Any) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        logging.getLogger(self.__class__.__name__).debug(format % args)
+
+
+def main() -> None:
+    cli = CLIArgs()
+
+    # Set up logging
+    log_file = f"{'.'.join(cli.args.source_file.split('.')[:-1])}.service.log"
+    log_level = logging.DEBUG if cli.args.debug else logging.INFO
+    logging.basicConfig(filename=log_file, level=log_level,
+                        format='[%(asctime)s.%(msecs)03d]:[%(levelname)-7s]:[%(name)s.%(funcName)s]: %(message)s',
+                        datefmt="%m/%d/%YT%H:%M:%S")
+    log = logging.getLogger()
+
+    TargetIniRequestHandler.index = TargetIniIndex(filespec=cli.args.source_file)
+    TargetIniRequestHandler.index.watch(interval=cli.args.interval)
+
+    server = http.server.ThreadingHTTPServer((cli.args.host, cli.args.port), TargetIniRequestHandler)
+    msg = f"Serving '{os.path.abspath(cli.args.source_file)}' on http://{cli.args.host}:{cli.args.port}/"
+    log.info(msg)
+    print(msg)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Service stopped.")
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
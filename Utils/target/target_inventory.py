@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import typing
+
+DEFAULT_INI_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'target.update.ini')
+DEFAULT_CACHE_FILE = os.path.join('~', '.target_inventory_cache.json')
+
+# Environment variables (Ansible only passes --list/--host to inventory scripts)
+INI_FILE_VARIABLE = 'MD_TARGET_INI'
+CACHE_FILE_VARIABLE = 'MD_TARGET_INVENTORY_CACHE'
+
+
+class CLIArgs:
+    def __init__(self):
+        """
+        CLI Arg Parser: Constructor
+        """
+        self.parser = argparse.ArgumentParser(
+            description="Ansible dynamic inventory built from the target INI file: groups per version, environment "
+                        "and server, with host vars (_meta).")
+        group = self.parser.add_mutually_exclusive_group(required=True)
+        group.add_argument("--list", action='store_true', help="List the groups (and all host vars, in _meta).")
+        group.add_argument("--host", default=None, type=str, help="Get the host vars of a single host.")
+        self.parser.add_argument("-i", "--ini", default=os.environ.get(INI_FILE_VARIABLE, DEFAULT_INI_FILE), type=str,
+                                 help=f"Name of the target INI file. DEFAULT: ${INI_FILE_VARIABLE}, "
+                                      f"or {os.path.basename(DEFAULT_INI_FILE)} (next to this script)")
+        self.parser.add_argument("-c", "--cache_file", type=str,
+                                 default=os.environ.get(CACHE_FILE_VARIABLE, DEFAULT_CACHE_FILE),
+                                 help=f"Name of the inventory cache file. DEFAULT: ${CACHE_FILE_VARIABLE}, "
+                                      f"or {DEFAULT_CACHE_FILE}")
+        self.parser.add_argument("-n", "--no_cache", action='store_true',
+                                 help="Do not use the inventory cache; always build the inventory from the INI file.")
+        self.parser.add_argument("--indent", default=None, type=int, help="Indent the JSON output. DEFAULT: compact")
+        self.args = self.parser.parse_args()
+
+
+class TargetInventory:
+    """
+    Builds an Ansible inventory from the target INI file. Hosts are the environment servers (LOS_SERVER_NAME, or the
+    IP_ADDRESS if no server name is defined); groups:
+        env_<environment>    --> Servers hosting an environment tag (env_dev, env_qa, ...)
+        version_<version>    --> Servers hosting a version (version_20_01, ...)
+        target_<section>     --> Server hosting the target section (target_qa_20_01, ...); the section's options are
+                                 the group vars (lowercase: los_instance_name, port, db_server, log_folder, ...)
+        server_<host>        --> Server (by the first label of its name: server_pclqaapp01, ...)
+    Host vars (_meta): ansible_host (IP_ADDRESS), and md_targets: {section: {option: value}} of all sections hosted
+    on the server (since a server may host several sections, the group vars of their target_* groups overlap).
+
+    """
+
+    SERVER_NAME = 'LOS_SERVER_NAME'
+    IP_ADDRESS = 'IP_ADDRESS'
+    TARGETS_VAR = 'md_targets'
+
+    def __init__(self, target: typing.Any) -> None:
+        """
+        Target Inventory Constructor
+
+        :param target: Parsed target INI file (TargetIniFile)
+
+        """
+        self.target = target
+
+    @staticmethod
+    def get_group_name(prefix: str, name: str) -> str:
+        """
+        Build a valid Ansible group name (letters, digits and underscores).
+
+        :param prefix: Group type prefix (env, version, target, server)
+        :param name: Name of the group
+
+        :return: Group name: <prefix>_<name>
+
+        """
+        return f"{prefix}_{re.sub(r'[^0-9a-zA-Z_]', '_', name).lower()}"
+
+    def build(self) -> typing.Dict[str, typing.Any]:
+        """
+        Build the inventory in a single pass over the target sections.
+
+        :return: Dictionary in the Ansible --list format: {group: {hosts, vars}, ..., _meta: {hostvars}}
+
+        """
+        try:
+            from .generate_jjb_includes import JJBIncludeGenerator
+        except ImportError:
+            from generate_jjb_includes import JJBIncludeGenerator
+        generator = JJBIncludeGenerator(target=self.target)
+
+        inventory = dict()
+        hostvars = dict()
+
+        def add_host(group: str, host: str, group_vars: typing.Optional[dict] = None) -> None:
+            entry = inventory.setdefault(group, {'hosts': []})
+            if host not in entry['hosts']:
+                entry['hosts'].append(host)
+            if group_vars:
+                entry['vars'] = group_vars
+
+        for section in self.target.get_target_sections(sort=True):
+            options = dict([(option.lower(), value) for option, value in self.target.config[section].items()])
+            host = (options.get(self.SERVER_NAME.lower()) or options.get(self.IP_ADDRESS.lower()) or '').lower()
+            if not host:
+                continue
+
+            name, environment, is_version = generator.get_environment(section)
+            add_host(self.get_group_name('env', environment), host)
+            if is_version:
+                add_host(self.get_group_name('version', name), host)
+            add_host(self.get_group_name('target', section), host, group_vars=options)
+            add_host(self.get_group_name('server', host.split('.')[0]), host)
+
+            host_vars = hostvars.setdefault(host, {self.TARGETS_VAR: {}})
+            if options.get(self.IP_ADDRESS.lower()) and 'ansible_host' not in host_vars:
+                host_vars['ansible_host'] = options[self.IP_ADDRESS.lower()]
+            host_vars[self.TARGETS_VAR][section] = options
+
+        inventory['all'] = {'children': sorted([group for group in inventory])}
+        inventory['_meta'] = {'hostvars': hostvars}
+        return inventory
+
+
+class InventoryCache:
+    """
+    Cache of the inventory (JSON file), keyed by the INI file's absolute path:
+        - Same size and mtime --> the cached inventory is returned without reading the INI file.
+        - Otherwise, the INI file is hashed; the same hash (e.g. - the file was touched/re-copied) --> the cached
+          inventory is returned (and the cached mtime is updated), without parsing the INI file.
+
+    """
+
+    MTIME = 'mtime_ns'
+    SIZE = 'size'
+    DIGEST = 'sha256'
+    INVENTORY = 'inventory'
+
+    def __init__(self, filespec: str) -> None:
+        """
+        Inventory Cache Constructor
+
+        :param filespec: Name of the cache file
+
+        """
+        self.filespec = os.path.expanduser(filespec)
+        self.cache = self.read_file()
+
+    def read_file(self) -> typing.Dict[str, dict]:
+        try:
+            with open(self.filespec, "r") as CACHE:
+                return json.load(CACHE)
+        except (OSError, ValueError):
+            return {}
+
+    def write_file(self) -> None:
+        tmp_file = f"{self.filespec}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, "w") as CACHE:
+                json.dump(self.cache, CACHE, separators=(',', ':'))
+            os.replace(tmp_file, self.filespec)
+        except OSError as exc:
+            print(f"WARNING: Unable to write the inventory cache ({self.filespec}): {exc}", file=sys.stderr)
+
+    @staticmethod
+    def get_digest(filespec: str) -> str:
+        with open(filespec, "rb") as INI:
+            return hashlib.sha256(INI.read()).hexdigest()
+
+    def get_inventory(self, ini_file: str,
+                      build: typing.Callable[[], typing.Dict[str, typing.Any]]) -> typing.Dict[str, typing.Any]:
+        """
+        Get the inventory of the INI file, from the cache if the INI file has not changed.
+
+        :param ini_file: Name of the target INI file
+        :param build: Callable() --> inventory (called if the INI file has changed)
+
+        :return: Inventory (see TargetInventory.build)
+
+        """
+        key = os.path.abspath(ini_file)
+        stat = os.stat(ini_file)
+        entry = self.cache.get(key)
+        if entry is not None and entry[self.MTIME] == stat.st_mtime_ns and entry[self.SIZE] == stat.st_size:
+            return entry[self.INVENTORY]
+
+        digest = self.get_digest(ini_file)
+        if entry is None or entry[self.DIGEST] != digest:
+            entry = {self.DIGEST: digest, self.INVENTORY: build()}
+        entry.update({self.MTIME: stat.st_mtime_ns, self.SIZE: stat.st_size})
+        self.cache[key] = entry
+        self.write_file()
+        return entry[self.INVENTORY]
+
+
+def build_inventory(ini_file: str) -> typing.Dict[str, typing.Any]:
+    # Deferred: the INI file is only parsed when the cached inventory is out of date.
+    try:
+        from .update_target_ini import TargetIniFile
+    except ImportError:
+        from update_target_ini import TargetIniFile
+    return TargetInventory(target=TargetIniFile(filespec=ini_file)).build()
+
+
+def main() -> None:
+    cli = CLIArgs()
+
+    if not os.path.isfile(cli.args.ini):
+        cli.parser.error(f"Target INI file not found: '{cli.args.ini}'")
+
+    if cli.args.no_cache:
+        inventory = build_inventory(cli.args.ini)
+    else:
+        inventory = InventoryCache(filespec=cli.args.cache_file).get_inventory(
+            ini_file=cli.args.ini, build=lambda: build_inventory(cli.args.ini))
+
+    if cli.args.list:
+        result = inventory
+    else:
+        result = inventory['_meta']['hostvars'].get(cli.args.host.lower(), {})
+    print(json.dumps(result, indent=cli.args.indent))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,38 @@
 #!/usr/bin/env python
 import argparse
+import bisect
 import configparser
+import json
 import logging
 import os
 import re
 import typing
 
-import yaml
+try:
+    from ..profiling import RunProfiler, add_profile_arguments, get_profile_file
+except ImportError:
+    from md_cicd_utils.profiling import RunProfiler, add_profile_arguments, get_profile_file
+
+
+def version_arg(value: str) -> str:
+    """
+    argparse type: validate a numeric version (20.3, 20.03.1).
+
+    :param value: Version string
+
+    :return: The version string (argparse.ArgumentTypeError is raised if the version is not numeric)
+
+    """
+    try:
+        TargetIniFile._parse_version(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid version: '{value}' (expected a numeric version: 20.3)")
+    return value
 
 
 class CLIArgs:
     ADD = 'add'
+    QUERY = 'query'
     REMOVE = 'remove'
     UPDATE = 'update'
     VALIDATE = 'validate'
@@ -23,7 +45,9 @@ class CLIArgs:
         self.parser = argparse.ArgumentParser()
 
         # Global required options
-        self.parser.add_argument("source_file", help="Name of file to read. ", type=str)
+        self.parser.add_argument("source_file", type=str,
+                                 help="Name of file to read. (A directory is read as a sharded target INI file, "
+                                      "and a .db/.sqlite file as a SQLite environment store.)")
 
         # Global Optional Options
         self.parser.add_argument("-o", "--outfile", help="Name of file to write output. "
@@ -33,12 +57,14 @@ class CLIArgs:
                                  action='store_true')
         self.parser.add_argument("-d", "--debug", help="Enable debug logging.",
                                  action='store_true')
+        add_profile_arguments(self.parser)
 
         # Add subparsers (options for specific operations)
         sub_parser = self.parser.add_subparsers(dest='file_action', help="INI File Operations.")
         for action in [self.ADD, self.UPDATE, self.REMOVE]:
             self._add_options(verb=action, sub_parser=sub_parser)
         self.add_validate(sub_parser=sub_parser)
+        self.add_query(sub_parser=sub_parser)
 
         # Read the args
         self.args = self.parser.parse_args()
@@ -70,6 +96,28 @@ class CLIArgs:
         verb = self.VALIDATE
         sub_parser.add_parser(verb, help=f"{verb.lower().capitalize()} INI file format.")
 
+    def add_query(self, sub_parser: typing.Any) -> None:
+        """
+        Defines the 'query' arg sub-option.
+        :param sub_parser: instantiated subparser (see argparse.ArgumentParser.add_subparsers())
+
+        :return: None
+        """
+        verb = self.QUERY
+        parser = sub_parser.add_parser(verb, help=f"{verb.lower().capitalize()} the environments (JSON output).")
+        parser.add_argument('-o', '--option', default=None,
+                            help="Option to match the value against. DEFAULT: match against all options.")
+        parser.add_argument('-v', '--value', default=None,
+                            help="Value to match (case-insensitive). Host names also match the FQDNs and "
+                                 "UNC paths that reference them: PCLDEVAPP01 => \\\\PCLDEVAPP01.domain\\d$")
+        parser.add_argument('-e', '--env', default=None, help="Environment (section prefix): dev, qa, etc.")
+        parser.add_argument('--min_version', default=None, type=version_arg,
+                            help="Minimum version (inclusive): 20.3")
+        parser.add_argument('--max_version', default=None, type=version_arg,
+                            help="Maximum version (inclusive): 20.7")
+        parser.add_argument('-s', '--show', default=None, nargs='+',
+                            help="Options to report for each matching environment.")
+
 
 class IniFile:
     def __init__(self, filespec: str, outfile: typing.Optional[str] = None) -> None:
@@ -111,11 +159,36 @@ class TargetIniFile(IniFile):
     ROOT = 'env_name'
     INSERT_BUILD = '__build__'
     INSERT_BUILD_LOWER = '__build_lower__'
+    PORT = 'PORT'
     STATUS_SERVER_PORT = 'STATUS_SERVER_PORT'
     MONITOR_SERVER_PORT = 'MONITOR_SERVER_PORT'
 
+    # Host names referenced by values (FQDNs or UNC paths): group(1) is the host's first label.
+    HOST_PATTERN = re.compile(r'(?:^|\\\\)([a-z][\w-]*)\.[a-z][\w.-]*')
+
+    def __init__(self, filespec: str, outfile: typing.Optional[str] = None) -> None:
+        """
+        Target Ini File Constructor
+
+        :param filespec: Filespec (path and name) of INI file to read.
+        :param outfile: Name of file to write config. (If none, original filespec will be overwritten)
+
+        """
+        # Query indexes: built lazily (on first query), and discarded whenever a section is modified.
+        self._value_indexes = dict()
+        self._version_index = None
+        super().__init__(filespec=filespec, outfile=outfile)
+
     def _define_new_environment(self, version_string: str):
-        with open(self.TARGET_TEMPLATE, "r") as TEMPLATE:
+        # Deferred: yaml is only needed when adding an environment.
+        import yaml
+
+        # Use the template in the current directory if present, otherwise the template shipped with this module.
+        template_file = self.TARGET_TEMPLATE
+        if not os.path.exists(template_file):
+            template_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), self.TARGET_TEMPLATE)
+
+        with open(template_file, "r") as TEMPLATE:
             template_struct = yaml.load(TEMPLATE, Loader=yaml.SafeLoader)
 
         template = template_struct[self.ROOT]
@@ -180,8 +253,9 @@ class TargetIniFile(IniFile):
             return False
 
         self.config.remove_section(section_name)
+        self._invalidate_indexes()
 
-        result = section_name not in self.get_target_sections()
+        result = not self.config.has_section(section_name)
         if result:
             self.log.info(f"Validation: Environment '{section_name}' has been removed.")
         else:
@@ -202,6 +276,7 @@ class TargetIniFile(IniFile):
         """
         self.log.info(f"Update ENV '{section_name}': Updating '{option}' to '{value}'")
         self.config.set(section=section_name, option=option.lower(), value=value)
+        self._invalidate_indexes()
         self.log.debug(f"Value check: ENV: {section_name} Option: '{option.lower()}' --> "
                        f"Value: '{self.config.get(section=section_name, option=option)}'")
         return self.config.get(section=section_name, option=option.lower()) == value
@@ -218,11 +293,24 @@ class TargetIniFile(IniFile):
         """
         section_name = f"{version_str_text.lower()}_{environment.lower()}"
         self.config[section_name] = self._define_new_environment(version_string=version_str_text)
+        self._invalidate_indexes()
         self.config.set(section_name, self.MONITOR_SERVER_PORT, str(int(primary_port) + 2))
         self.config.set(section_name, self.STATUS_SERVER_PORT, str(int(primary_port) + 3))
         self.log.info(f"Add ENV '{section_name}': using primary port as basis: {primary_port}")
         return self.config.has_section(section_name)
 
+    def get_value(self, section_name: str, option: str) -> typing.Optional[str]:
+        """
+        Get a single option value.
+
+        :param section_name: Name of the section
+        :param option: Name of the option
+
+        :return: Value, or None if not defined
+
+        """
+        return self.config.get(section_name, option, fallback=None)
+
     def get_target_sections(self, sort: bool = False) -> typing.List[str]:
         """
         Get all defined sections that are not the CORE section.
@@ -274,6 +362,148 @@ class TargetIniFile(IniFile):
         self.log.info(f"All sections in the {self.file} file are fully defined: {overall_match}")
         return overall_match
 
+    def query_sections(self, option: typing.Optional[str] = None, value: typing.Optional[str] = None,
+                       environment: typing.Optional[str] = None, min_version: typing.Optional[str] = None,
+                       max_version: typing.Optional[str] = None) -> typing.List[str]:
+        """
+        Find the sections matching ALL of the specified criteria (using the lazily built indexes).
+
+        :param option: (Optional) Option to match the value against. If not specified, all options are searched.
+        :param value: (Optional) Value to match (case-insensitive; host names also match FQDNs and UNC paths).
+        :param environment: (Optional) Environment (section prefix): dev, qa, etc. (case-insensitive)
+        :param min_version: (Optional) Minimum version (inclusive), e.g. - 20.3
+        :param max_version: (Optional) Maximum version (inclusive), e.g. - 20.7
+
+        :return: List of matching sections (sorted: see _sort_version).
+
+        """
+        matches = set(self.get_target_sections())
+
+        if value is not None:
+            matches &= self._get_value_index(option).get(value.lower(), set())
+
+        if environment is not None:
+            matches = set([section for section in matches
+                           if self.get_section_environment(section) == environment.lower()])
+
+        # Only sections with a numeric version are in the version range.
+        if min_version is not None or max_version is not None:
+            matches &= set(self.get_sections_in_version_range(min_version=min_version, max_version=max_version))
+
+        return self._sort_version(list(matches))[1:]
+
+    def get_sections_in_version_range(
+            self, min_version: typing.Optional[str] = None, max_version: typing.Optional[str] = None,
+            environment: typing.Optional[str] = None) -> typing.List[str]:
+        """
+        Get the sections with a numeric version (<env>_<version>) within the (inclusive) range.
+
+        :param min_version: (Optional) Minimum version, e.g. - 20.3. If not specified, there is no lower bound.
+        :param max_version: (Optional) Maximum version, e.g. - 20.7. If not specified, there is no upper bound.
+        :param environment: (Optional) Only include sections for the environment: dev, qa, etc.
+
+        :return: List of sections, in version order.
+
+        """
+        if self._version_index is None:
+            self._version_index = sorted([(version, env.lower(), section) for section in self.get_target_sections()
+                                          for version, env in [self._get_section_version(section)]
+                                          if version is not None])
+
+        start = 0 if min_version is None else bisect.bisect_left(
+            self._version_index, (self._parse_version(min_version),))
+        end = len(self._version_index) if max_version is None else bisect.bisect_left(
+            self._version_index, (self._parse_version(max_version) + (float('inf'),),))
+
+        return [section for _, env, section in self._version_index[start:end]
+                if environment is None or env == environment.lower()]
+
+    def _get_value_index(self, option: typing.Optional[str] = None) -> typing.Dict[str, typing.Set[str]]:
+        """
+        Get (building it on first use) the value --> sections index for an option (or all options).
+
+        :param option: (Optional) Name of the option. If not specified, index the values of all options.
+
+        :return: Dictionary of index key (lowercase value, or referenced host name) --> set of sections
+
+        """
+        option = None if option is None else option.lower()
+        if option not in self._value_indexes:
+            self.log.debug(f"Building value index for option: '{option or '*'}'")
+            index = dict()
+            for section in self.get_target_sections():
+                items = self.config[section].items() if option is None else [
+                    (option, self.config.get(section, option))] if self.config.has_option(section, option) else []
+                for _, data_value in items:
+                    for key in self._get_index_keys(data_value):
+                        index.setdefault(key, set()).add(section)
+            self._value_indexes[option] = index
+        return self._value_indexes[option]
+
+    def _get_index_keys(self, data_value: str) -> typing.Set[str]:
+        """
+        Determine the index keys for a value: the lowercase value, and the first label of any referenced hosts.
+
+        :param data_value: Option value
+
+        :return: Set of index keys
+
+        """
+        data_value = data_value.lower()
+        return set([data_value] + self.HOST_PATTERN.findall(data_value))
+
+    @staticmethod
+    def get_section_environment(section: str) -> str:
+        """
+        Determine the environment of a section: the section prefix (<env>_<version or name>, e.g. - qa_20.01,
+        qa_staging), lowercase.
+
+        :param section: Name of section
+
+        :return: Environment ('' if the section has no prefix)
+
+        """
+        return section.split('_')[0].lower() if '_' in section else ''
+
+    def _get_section_version(self, section: str) -> typing.Tuple[typing.Optional[tuple], str]:
+        """
+        Determine the numeric version and environment of a section (<env>_<version>, e.g. - qa_20.01).
+
+        :param section: Name of section
+
+        :return: Tuple: (version as a tuple of ints (None if the section has no numeric version), environment)
+
+        """
+        parts = section.split('_')
+        if len(parts) != 2:
+            return None, ''
+        try:
+            return self._parse_version(parts[1]), parts[0]
+        except ValueError:
+            return None, ''
+
+    @staticmethod
+    def _parse_version(version: str) -> tuple:
+        """
+        Convert a version string to a comparable tuple of ints: '20.01' => (20, 1)
+
+        :param version: Version string
+
+        :return: tuple of ints (ValueError is raised if the version is not numeric)
+
+        """
+        return tuple([int(part) for part in version.split('.')])
+
+    def _invalidate_indexes(self) -> None:
+        """
+        Discard the query indexes (they will be rebuilt on the next query).
+
+        :return: None
+
+        """
+        self._value_indexes = dict()
+        self._version_index = None
+
     def write_file(self, filename: typing.Optional[str] = None) -> None:
         """
         Writes the file with the Core section first, and then in a custom order (TargetIniFile._sort_version)
@@ -310,9 +540,12 @@ class TargetIniFile(IniFile):
         self.config._sections[self.CORE] = dict([(name.upper(), value) for name, value in
                                                  self.config._sections[self.CORE].items()])
 
-        # Write the file
-        with open(filename, "w") as INI:
+        # Write the file (to a temporary file, and then moved), so readers (e.g. - target_ini_service.py, which reloads
+        # the file when it changes) never see a truncated or partial file.
+        tmp_file = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as INI:
             self.config.write(INI)
+        os.replace(tmp_file, filename)
         msg = f"Wrote output to {os.path.abspath(filename)}."
         self.log.info(msg)
         print(msg)
@@ -327,6 +560,7 @@ class TargetIniFile(IniFile):
            else if the target has a <name> tag, sort by name
 
            This sorts by version (qe and dev are kept together per version), then sort all non-version tags.
+           Sections with the same sort key (dev_18, Dev_18) are all kept, ordered by name.
 
         :param version_list: List of ini file sections
 
@@ -344,29 +578,33 @@ class TargetIniFile(IniFile):
 
             # If there was no "_" to split on..
             if len(parts) == 1:
-                order[version.lower()] = version
+                order[(version.lower(), version)] = version
 
             # If there was a "_", if the second part element of the split has letters,
             # the version will be the first part of the split.
             elif parts[1].isalpha():
-                order[f"{parts[0].lower()}-{parts[1]}"] = version
+                order[(f"{parts[0].lower()}-{parts[1]}", version)] = version
 
             # Otherwise, the version will be the second part of the split,
             # and the domain will be the first part of the split.
             else:
-                order[f"{parts[1]}-{parts[0].lower()}"] = version
+                order[(f"{parts[1]}-{parts[0].lower()}", version)] = version
 
-        # Sort by dictionary key name
+        # Sort by dictionary key (sort key, then name: sections with the same sort key must not be dropped)
         reordered.extend([version for key, version in sorted(order.items(), key=lambda v: v[0])])
         return reordered
 
 
-if __name__ == '__main__':
+def main() -> None:
     border = "=" * 120
     cli = CLIArgs()
 
     # Set up logging
-    log_file = f"{'.'.join(cli.args.source_file.split('.')[:-1])}.log"
+    is_sharded = os.path.isdir(cli.args.source_file)
+    if is_sharded:
+        log_file = f"{cli.args.source_file.rstrip(os.sep)}.log"
+    else:
+        log_file = f"{'.'.join(cli.args.source_file.split('.')[:-1])}.log"
     log_level = logging.DEBUG if cli.args.debug else logging.INFO
     logging.basicConfig(filename=log_file, level=log_level,
                         format='[%(asctime)s.%(msecs)03d]:[%(levelname)-7s]:[%(name)s.%(funcName)s]: %(message)s',
@@ -377,47 +615,81 @@ if __name__ == '__main__':
 
     log.debug(f"CLI Args: {cli.args}")
 
-    # Parse the target INI file
-    target = TargetIniFile(filespec=cli.args.source_file, outfile=cli.args.outfile)
-
-    # Based on the global options selected...
-    if cli.args.list:
-        # NOTE: Do no print the zeroth (first) element [Core] because it is not an environment.
-        print(target.get_target_sections(sort=True)[1:])
-        exit()
-
-    # Based on the sub-parser selected...
-    if cli.args.file_action == cli.REMOVE:
-        log.info(f"Removing environment: '{cli.args.env}'")
-        target.remove_section(cli.args.env)
-        target.write_file()
-
-    elif cli.args.file_action == cli.UPDATE:
-        log.info(f"Updating {cli.args.env}: {cli.args.values}")
-        for kv_pair in cli.args.values:
-            option, value = kv_pair.split(':')
-            target.update_section(section_name=cli.args.env, option=option.lower(), value=value)
-        target.write_file()
-
-    elif cli.args.file_action == cli.ADD:
-        env_name = f"{cli.args.version_str.lower()}_{cli.args.env.lower()}"
-        log.info(f"Adding {env_name}: {cli.args.primary_port}")
-        target.add_section(version_str_text=cli.args.version_str, primary_port=cli.args.primary_port,
-                           environment=cli.args.env)
-        env_was_added =env_name in target.get_target_sections()
-        log.debug(f"Section {env_name} was added? {env_was_added}")
-        if not env_was_added:
-            log.error(f"Section {env_name} was NOT added.")
-        target.write_file()
-
-    elif cli.args.file_action == cli.VALIDATE:
-        log.info(f"Validating {os.path.abspath(cli.args.source_file)}")
-        msgs = [f"All targets defined: {target.verify_targets_are_defined()}",
-                f"All targets are fully defined: {target.verify_all_sections_are_fully_defined()}"]
-
-        for msg in msgs:
-            log.info(msg)
-            print(msg)
+    with RunProfiler(profile_file=get_profile_file(log_file), enabled=cli.args.profile, top=cli.args.profile_top):
+        # Parse the target INI file (a directory is a sharded target INI file: see sharded_target_ini.py)
+        if is_sharded:
+            try:
+                from .sharded_target_ini import ShardedTargetIniFile
+            except ImportError:
+                from sharded_target_ini import ShardedTargetIniFile
+            target = ShardedTargetIniFile(filespec=cli.args.source_file, outfile=cli.args.outfile)
+        else:
+            try:
+                from .sqlite_target_ini import SqliteTargetIniFile
+            except ImportError:
+                from sqlite_target_ini import SqliteTargetIniFile
+            if SqliteTargetIniFile.is_database(cli.args.source_file):
+                target = SqliteTargetIniFile(filespec=cli.args.source_file, outfile=cli.args.outfile)
+            else:
+                target = TargetIniFile(filespec=cli.args.source_file, outfile=cli.args.outfile)
+
+        # Based on the global options selected...
+        if cli.args.list:
+            # NOTE: Do no print the zeroth (first) element [Core] because it is not an environment.
+            print(target.get_target_sections(sort=True)[1:])
+            return
+
+        # Based on the sub-parser selected...
+        if cli.args.file_action == cli.REMOVE:
+            log.info(f"Removing environment: '{cli.args.env}'")
+            target.remove_section(cli.args.env)
+            target.write_file()
+
+        elif cli.args.file_action == cli.UPDATE:
+            log.info(f"Updating {cli.args.env}: {cli.args.values}")
+            for kv_pair in cli.args.values:
+                option, value = kv_pair.split(':')
+                target.update_section(section_name=cli.args.env, option=option.lower(), value=value)
+            target.write_file()
+
+        elif cli.args.file_action == cli.ADD:
+            env_name = f"{cli.args.version_str.lower()}_{cli.args.env.lower()}"
+            log.info(f"Adding {env_name}: {cli.args.primary_port}")
+            target.add_section(version_str_text=cli.args.version_str, primary_port=cli.args.primary_port,
+                               environment=cli.args.env)
+            env_was_added =env_name in target.get_target_sections()
+            log.debug(f"Section {env_name} was added? {env_was_added}")
+            if not env_was_added:
+                log.error(f"Section {env_name} was NOT added.")
+            target.write_file()
+
+        elif cli.args.file_action == cli.QUERY:
+            log.info(f"Querying: option={cli.args.option}, value={cli.args.value}, env={cli.args.env}, "
+                     f"versions=[{cli.args.min_version}, {cli.args.max_version}]")
+            sections = target.query_sections(
+                option=cli.args.option, value=cli.args.value, environment=cli.args.env,
+                min_version=cli.args.min_version, max_version=cli.args.max_version)
+            log.info(f"Matching environments: {len(sections)}")
+
+            if cli.args.show:
+                results = dict([(section, dict([(option.upper(), target.get_value(section, option))
+                                                for option in cli.args.show])) for section in sections])
+            else:
+                results = sections
+            print(json.dumps(results, indent=2))
+
+        elif cli.args.file_action == cli.VALIDATE:
+            log.info(f"Validating {os.path.abspath(cli.args.source_file)}")
+            msgs = [f"All targets defined: {target.verify_targets_are_defined()}",
+                    f"All targets are fully defined: {target.verify_all_sections_are_fully_defined()}"]
+
+            for msg in msgs:
+                log.info(msg)
+                print(msg)
 
     log.info("Execution complete.")
     log.info(border)
+
+
+if __name__ == '__main__':
+    main()